@@ -0,0 +1,420 @@
+"""
+The asyncio API of gtrends: collectTrendsAsync(), collectRawTrendsAsync(),
+and the AsyncDownloader and AsyncHttpTransport beneath them. Requires
+Python 3.5 or later; import it through gtrends.
+
+Downloads run on the event loop over a fixed number of connections per
+account, and parsing and stitching run in an executor, so that many jobs
+can be in flight at once without blocking the loop.
+"""
+import ssl
+import asyncio
+import logging
+import functools
+import email.parser
+import http.client
+import urllib.parse as urlparse
+import urllib.request as urllib2
+from urllib.error import HTTPError
+
+from _login import Downloader, SessionPool, sessionPool
+from _limit import isThrottled
+from _cache import _normalize
+from _transport import REDIRECTS, _Response, _decode
+from _metrics import metrics
+
+class AsyncHttpTransport(object):
+    """
+    Sends requests with asyncio streams instead of urllib, keeping at most
+    `connections` connections open, which are reused between requests.
+    Responses are requested gzip-compressed, and decoded.
+    """
+
+    def __init__(self, host=None, connections=8, timeout=60):
+        """
+        Args:
+            host: A string such as "http://127.0.0.1:8000". If given, it
+                replaces the scheme and host of every url, as for
+                HttpTransport.
+            connections: The most requests sent at once. Later requests wait
+                for a free connection.
+            timeout: The seconds to wait for a connection to open, and for
+                each response, before raising asyncio.TimeoutError.
+        """
+        self.host = host
+        self.connections = connections
+        self.timeout = timeout
+        self.cj = None
+        self.headers = []
+        self._loop = None
+        self._slots = None
+        self._idle = {}
+
+    def prepare(self, cookieJar, headers):
+        self.cj = cookieJar
+        self.headers = headers
+
+    async def open(self, url, data=None):
+        """
+        Sends a GET request, or a POST of the encoded form data if given,
+        following redirects, and returns the body of the response as bytes.
+        Raises HTTPError for error statuses, like urllib.
+        """
+        self._bind()
+        url = self._rewrite(url)
+        for i in range(10):
+            request = urllib2.Request(url, data, dict(self.headers))
+            self.cj.add_cookie_header(request)
+            status, reason, headers, body = await self._send(request)
+            self.cj.extract_cookies(_Response(url, headers), request)
+            if status in REDIRECTS and headers.get("Location"):
+                url = self._rewrite(urlparse.urljoin(url, headers["Location"]))
+                if status in (301, 302, 303):
+                    data = None
+                continue
+            if status >= 400:
+                raise HTTPError(url, status, reason, headers, None)
+            return body
+        raise HTTPError(url, status, "Too many redirects", headers, None)
+
+    def _bind(self):
+        """Starts over with the connections of the running event loop."""
+        loop = asyncio.get_event_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.connections)
+            self._idle = {}
+
+    async def _send(self, request):
+        parts = urlparse.urlsplit(request.full_url)
+        https = parts.scheme == "https"
+        key = (parts.scheme, parts.hostname, parts.port or (443 if https else 80))
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        lines = ["%s %s HTTP/1.1" % (request.get_method(), path),
+                 "Host: " + parts.netloc, "Accept-Encoding: gzip"]
+        for name, value in request.header_items():
+            lines.append(name + ": " + value)
+        body = request.data or b""
+        if request.data is not None:
+            lines.append("Content-Length: %d" % len(body))
+        message = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+        async with self._slots:
+            idle = self._idle.setdefault(key, [])
+            #a reused connection may have been closed by the server since.
+            for reused in (True, False):
+                if reused and not idle:
+                    continue
+                if reused:
+                    reader, writer = idle.pop()
+                else:
+                    reader, writer = await asyncio.wait_for(asyncio.open_connection(
+                        key[1], key[2], ssl=ssl.create_default_context() if https else None),
+                        self.timeout)
+                try:
+                    writer.write(message)
+                    response = await asyncio.wait_for(_readResponse(reader), self.timeout)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    writer.close()
+                    if reused:
+                        continue
+                    raise
+                except asyncio.TimeoutError:
+                    writer.close()
+                    raise
+                status, reason, headers, data, keepAlive = response
+                if keepAlive:
+                    idle.append((reader, writer))
+                else:
+                    writer.close()
+                return status, reason, headers, _decode(data, headers.get("Content-Encoding"))
+
+    def _rewrite(self, url):
+        if self.host is None:
+            return url
+        parts = urlparse.urlsplit(url)
+        host = urlparse.urlsplit(self.host)
+        return urlparse.urlunsplit((host.scheme, host.netloc) + tuple(parts[2:]))
+
+
+
+
+class AsyncDownloader(Downloader):
+    """
+    A Downloader whose login() and downloadReport() are coroutines, for use
+    with an AsyncHttpTransport. Cookies, the RateLimiter and the cache work
+    as for Downloader, and downloads are shared through an AsyncSingleFlight.
+    """
+
+    def __init__(self, username, password, cookiePath=None, transport=None,
+                 limiter=None, flight=None):
+        Downloader.__init__(self, username, password, cookiePath,
+                            transport if transport is not None else AsyncHttpTransport(),
+                            limiter, flight)
+        self._alock = None
+        self._loop = None
+
+    async def _connect(self):
+        self.cj.clear()
+        resp = str(await self.transport.open(self.url_ServiceLoginBoxAuth))
+        self.login_params['GALX'] = self._galx(resp)
+        params = urlparse.urlencode(self.login_params).encode("utf-8")
+        await self.transport.open(self.url_ServiceLoginBoxAuth, params)
+        await self.transport.open(self.url_CookieCheck)
+        await self.transport.open(self.url_PrefCookie)
+        self.logged_in = True
+        self.logins += 1
+        self._saveCookies()
+
+    async def login(self, stale=None):
+        """
+        Logs in unless already logged in. Safe to call from several tasks.
+        """
+        loop = asyncio.get_event_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._alock = asyncio.Lock()
+        async with self._alock:
+            if not self.logged_in or stale == self.logins:
+                with metrics.timer("login"):
+                    await self._connect()
+                metrics.count("logins")
+
+    async def downloadReport(self, query, cache=None):
+        """
+        Returns original raw csv file as a one large string. See
+        Downloader.downloadReport().
+        """
+        if cache is not None:
+            data = cache.get(query)
+            if data is not None:
+                metrics.count("cache_hits")
+                return data
+
+        if self.flight is not None:
+            return await self.flight.do(query, lambda: self._download(query, cache), self)
+        return await self._download(query, cache)
+
+    async def _download(self, query, cache):
+        await self.login()
+        seen = self.logins
+        data = await self._limitedOpen(query)
+
+        #saved cookies may have been revoked by Google before they expired,
+        #so log in again once before giving up.
+        if self._signedOut(data):
+            await self.login(stale=seen)
+            data = await self._limitedOpen(query)
+
+        if self._signedOut(data):
+            logging.error('You must be signed in to export data from Google Trends')
+            raise Exception(data)
+
+        if cache is not None:
+            cache.put(query, data)
+        return data
+
+    async def _limitedOpen(self, query):
+        for attempt in range(self.limiter.retries + 1):
+            wait = self.limiter.acquire(sleep=False)
+            await asyncio.sleep(wait)
+            metrics.observe("rateLimit", wait)
+            try:
+                data = await self._open(query)
+            except Exception as e:
+                if not isThrottled(error=e):
+                    raise
+                data = None
+            if data is not None and not isThrottled(data):
+                self.limiter.succeeded()
+                return data
+            metrics.count("throttles")
+            if attempt < self.limiter.retries:
+                await asyncio.sleep(self.limiter.throttled(attempt, sleep=False))
+
+        logging.error('Google Trends is throttling requests, giving up on '+query)
+        raise Exception('Throttled by Google Trends: '+query)
+
+    async def _open(self, query):
+        with metrics.timer("fetch", url=query) as timer:
+            try:
+                data = await self.transport.open(query)
+            except Exception as e:
+                timer.info["status"] = getattr(e, "code", "error")
+                metrics.count("requests", status=timer.info["status"])
+                raise
+            timer.info.update(status=200, bytes=len(data))
+        metrics.count("requests", status=200)
+        metrics.count("response_bytes", len(data))
+        return data.decode()
+
+
+
+
+class AsyncSingleFlight(object):
+    """
+    A SingleFlight for coroutines: tasks asking for a report which another
+    task is already downloading await that download instead.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._flights = {}
+
+    async def do(self, query, download, account=None):
+        """
+        Returns the result of awaiting download(), unless a download of the
+        same query for the same account is already running, whose result is
+        then returned.
+        """
+        key = (account, _normalize(query))
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.coalesced += 1
+            metrics.count("coalesced")
+            #shield, so that a cancelled follower doesn't cancel the download.
+            return await asyncio.shield(flight)
+
+        flight = self._flights[key] = asyncio.ensure_future(download())
+        self.calls += 1
+        try:
+            return await asyncio.shield(flight)
+        finally:
+            if flight.done():
+                del self._flights[key]
+            else:
+                flight.add_done_callback(lambda f: self._flights.pop(key, None))
+
+    def stats(self):
+        """See SingleFlight.stats()."""
+        return {"calls": self.calls, "coalesced": self.coalesced,
+                "inFlight": len(self._flights)}
+
+
+
+
+#Shares the RateLimiter of gtrends.sessionPool, so that threads and tasks
+#are limited together.
+asyncSessionPool = SessionPool(AsyncHttpTransport, sessionPool.limiter, AsyncDownloader,
+                               AsyncSingleFlight())
+
+
+async def collectTrendsAsync(username, password, terms, startDt, endDt, granularity='d',
+                             geo='', cat='', gprops='', tz='', sum=False, savePath=None,
+                             cookiePath=None, cache=None, engine='python', frame=False,
+                             packing='fixed', popularity=None, window=None, executor=None):
+    """
+    A coroutine downloading normalized Google trend data between
+    [startDt, endDt), like collectTrends().
+
+    Args:
+        username, password, terms, startDt, endDt, granularity, geo, cat,
+        gprops, tz, sum, savePath, cookiePath, cache, engine, frame, packing,
+        popularity, window: As for collectTrends(). There is no workers
+            argument: every file is requested at once, and the connections of
+            the AsyncHttpTransport limit how many are downloaded at a time.
+        executor: The concurrent.futures executor parsing and stitching the
+            files. Defaults to the event loop's. A ProcessPoolExecutor keeps
+            this work off the loop's process entirely. With
+            packing='planned', the popularity probes are downloaded in the
+            loop's default executor, through gtrends.sessionPool.
+
+    Returns:
+        The same as collectTrends().
+    """
+    if not gtrends._checkArgs(terms, startDt, endDt, granularity, engine, frame,
+                              packing, window):
+        return []
+
+    loop = asyncio.get_event_loop()
+    groups = None
+    if packing == 'planned':
+        terms, groups = await loop.run_in_executor(None, functools.partial(
+            gtrends._planTerms, username, password, terms, startDt, endDt, geo, cat,
+            gprops, tz, cookiePath, 1, cache, popularity))
+    queries, numSegs, numFiles, countMonth = gtrends._planQueries(terms, startDt,
+        endDt, granularity, geo, cat, gprops, tz, groups, window)
+    dloader = asyncSessionPool.get(username, password, cookiePath)
+    rawReports = await _fetchAll(dloader, queries, cache)
+
+    params = gtrends._params(granularity, geo, cat, gprops, tz, sum)
+    return await loop.run_in_executor(executor, functools.partial(_finish,
+        rawReports, numSegs, startDt, numFiles, countMonth, granularity, terms,
+        endDt, sum, engine, frame, savePath, groups, params))
+
+
+async def collectRawTrendsAsync(username, password, terms, startDt, endDt, geo='', cat='',
+                                gprops='', tz='', savePath=None, cookiePath=None, cache=None):
+    """
+    A coroutine downloading raw Google Trends data, like
+    collectRawTrends(), which see for the arguments.
+
+    Returns:
+        A list of 1 string representing the entire downloaded csv.
+    """
+    if not gtrends._checkRawArgs(terms, startDt, endDt):
+        return []
+
+    queries = gtrends._buildQueries(terms, startDt, 1, 0, gtrends._rawFreq(startDt, endDt),
+                                    geo, cat, gprops, tz)
+    dloader = asyncSessionPool.get(username, password, cookiePath)
+    report = await _fetchAll(dloader, queries, cache)
+    if savePath != None:
+        gtrends._save(savePath, report)
+    return report
+
+
+async def _fetchAll(dloader, queries, cache):
+    """Downloads every query at once, keeping their order."""
+    def fetch(query):
+        logging.info("Downloading "+query)
+        return dloader.downloadReport(query, cache)
+
+    return await asyncio.gather(*[fetch(query) for query in queries])
+
+
+def _finish(rawReports, numSegs, startDt, numFiles, countMonth, granularity, terms,
+            endDt, sum, engine, frame, savePath, groups, params):
+    """Parses and stitches the files of collectTrendsAsync(), in the executor."""
+    reportData = gtrends._parseReports(rawReports, numSegs, startDt, numFiles,
+                                       countMonth, granularity, groups is None)
+    if not reportData:
+        return []
+    return gtrends._finishTrends(reportData, terms, endDt, sum, engine, frame,
+                                 savePath, groups, params)
+
+
+async def _readResponse(reader):
+    """
+    Reads one response. Returns its status, reason, headers and body, and
+    whether the connection can be reused.
+    """
+    head = await reader.readuntil(b"\r\n\r\n")
+    statusLine, rest = head.decode("latin-1").split("\r\n", 1)
+    version, status, reason = (statusLine.split(" ", 2) + [""])[:3]
+    headers = email.parser.Parser(_class=http.client.HTTPMessage).parsestr(rest)
+
+    keepAlive = version == "HTTP/1.1" and \
+        (headers.get("Connection") or "").lower() != "close"
+    if (headers.get("Transfer-Encoding") or "").lower() == "chunked":
+        chunks = []
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            chunks.append(await reader.readexactly(size + 2))
+            if size == 0:
+                break
+        body = b"".join(chunk[:-2] for chunk in chunks)
+    elif headers.get("Content-Length") is not None:
+        body = await reader.readexactly(int(headers["Content-Length"]))
+    else:
+        body = await reader.read()
+        keepAlive = False
+    return int(status), reason, headers, body, keepAlive
+
+
+#gtrends imports this module at its end, so it is imported last here, once
+#everything gtrends needs from this module is defined.
+import gtrends
@@ -0,0 +1,218 @@
+"""
+Runs a manifest of collectTrends() jobs with a pool of workers sharing one
+login, and writes each job's data to its own file, with a summary of the run.
+
+    gtrends-batch MANIFEST [--out DIR] [--workers 4] [--downloads 2]
+                  [--cache DIR] [--checkpoint DIR] [--rate N] [--check]
+
+The manifest is either a .jsonl file with one job per line, or a .json file
+holding a list of jobs, or an object {"defaults": {...}, "jobs": [...]}
+whose defaults apply to every job. A job is an object such as:
+
+    {"id": "fruit", "terms": ["banana", "pie"], "start": "2014-01",
+     "end": "2015-01", "granularity": "d", "geo": "US", "cat": "",
+     "gprops": "", "tz": "", "sum": false, "output": "fruit.csv"}
+
+Only terms, start and end are required. Jobs without an output are written
+to DIR/NNN/ID.csv, with --shard-size jobs per NNN directory. The Google
+account is read from GTRENDS_USERNAME and GTRENDS_PASSWORD, or from
+--username and --password.
+
+Nothing but the standard library is imported until the jobs start, so that
+checking a manifest (--check) or asking for --help is quick.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import datetime
+import threading
+try:
+    _string = basestring
+except NameError:   #Py3
+    _string = str
+
+#The fields of a job, and their defaults. None means required.
+FIELDS = {"id": None, "terms": None, "start": None, "end": None, "granularity": "d",
+          "geo": "", "cat": "", "gprops": "", "tz": "", "sum": False, "output": None}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="gtrends-batch", description=__doc__.strip().split("\n\n")[0])
+    parser.add_argument("manifest", help="the .json or .jsonl file of jobs")
+    parser.add_argument("--out", default="gtrends-out",
+                        help="directory for the outputs and summary.json (default gtrends-out)")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="jobs run at the same time (default 4)")
+    parser.add_argument("--downloads", type=int, default=2,
+                        help="files each job downloads at the same time (default 2)")
+    parser.add_argument("--shard-size", type=int, default=1000,
+                        help="jobs per output directory (default 1000)")
+    parser.add_argument("--cache", help="directory of a ResponseCache shared by the jobs")
+    parser.add_argument("--checkpoint",
+                        help="directory of the jobs' checkpoints, to resume a failed run")
+    parser.add_argument("--rate", type=float, default=None,
+                        help="requests per second allowed (default: unlimited until "
+                             "throttled)")
+    parser.add_argument("--engine", default="python", choices=["python", "numpy"],
+                        help="stitching engine (default python)")
+    parser.add_argument("--cookie-path", help="file keeping the login cookies between runs")
+    parser.add_argument("--username", default=os.environ.get("GTRENDS_USERNAME"))
+    parser.add_argument("--password", default=os.environ.get("GTRENDS_PASSWORD"))
+    parser.add_argument("--check", action="store_true",
+                        help="only check the manifest, without downloading anything")
+    args = parser.parse_args(argv)
+
+    try:
+        jobs = loadManifest(args.manifest)
+    except (IOError, OSError, ValueError) as e:
+        sys.stderr.write("gtrends-batch: %s\n" % e)
+        return 2
+    if args.check:
+        print("%d jobs OK" % len(jobs))
+        return 0
+    if not args.username or not args.password:
+        sys.stderr.write("gtrends-batch: set GTRENDS_USERNAME and GTRENDS_PASSWORD, or pass "
+                         "--username and --password\n")
+        return 2
+
+    summary = runJobs(jobs, args.username, args.password, args.out, args.workers,
+                      args.downloads, args.shard_size, args.cache, args.checkpoint,
+                      args.rate, args.engine, args.cookie_path)
+    print("%d jobs, %d failed, in %.1fs: %.2f jobs/s, %d requests, %.1f requests/s" % (
+        summary["jobs"], len(summary["failed"]), summary["seconds"],
+        summary["jobsPerSecond"], summary["requests"], summary["requestsPerSecond"]))
+    for failure in summary["failed"]:
+        print("  failed %s: %s" % (failure["id"], failure["error"]))
+    return 1 if summary["failed"] else 0
+
+
+def loadManifest(path):
+    """
+    Reads the jobs of a manifest, filling in the defaults. Raises ValueError,
+    naming the job, if one is invalid.
+    """
+    with open(path) as f:
+        if path.endswith(".jsonl"):
+            items = []
+            for n, line in enumerate(f):
+                if line.strip():
+                    try:
+                        items.append(json.loads(line))
+                    except ValueError as e:
+                        raise ValueError("%s line %d: %s" % (path, n+1, e))
+            defaults = {}
+        else:
+            data = json.load(f)
+            if isinstance(data, dict):
+                defaults = data.get("defaults", {})
+                items = data.get("jobs", [])
+            else:
+                defaults = {}
+                items = data
+
+    jobs = []
+    ids = set()
+    for n, item in enumerate(items):
+        job = dict(FIELDS)
+        job["id"] = "job%05d" % n
+        job.update(defaults)
+        job.update(item)
+        name = "job %s" % job["id"]
+        unknown = set(job) - set(FIELDS)
+        if unknown:
+            raise ValueError("%s has unknown fields: %s" % (name, ", ".join(sorted(unknown))))
+        for field in ("terms", "start", "end"):
+            if job[field] is None:
+                raise ValueError("%s has no %s" % (name, field))
+        if isinstance(job["terms"], _string):
+            job["terms"] = [term.strip() for term in job["terms"].split(",")]
+        job["startDt"] = _parseDate(job["start"], name)
+        job["endDt"] = _parseDate(job["end"], name)
+        if job["id"] in ids:
+            raise ValueError("%s is repeated" % name)
+        ids.add(job["id"])
+        jobs.append(job)
+    return jobs
+
+
+def runJobs(jobs, username, password, outDir, workers=4, downloads=2, shardSize=1000,
+            cache=None, checkpoint=None, rate=None, engine="python", cookiePath=None):
+    """
+    Runs the jobs from loadManifest() on `workers` threads, all sharing the
+    login of gtrends.sessionPool, and writes summary.json to outDir.
+    Returns the summary: the number of jobs, the failed ones with their
+    error, the seconds taken, the throughput, and the time of each job.
+    """
+    import gtrends
+    from multiprocessing.pool import ThreadPool
+    from _metrics import _percentile
+
+    if rate is not None:
+        gtrends.sessionPool.setLimiter(gtrends.RateLimiter(rate=rate))
+    if cache is not None:
+        cache = gtrends.ResponseCache(cache)
+    requests = gtrends.sessionPool.limiter.stats()["requests"]
+    lock = threading.Lock()
+
+    def run(indexed):
+        index, job = indexed
+        path = job["output"] or os.path.join(outDir, "%03d" % (index // shardSize),
+                                             job["id"] + ".csv")
+        with lock:
+            if os.path.dirname(path) and not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+        start = time.time()
+        try:
+            trends = gtrends.collectTrends(username, password, job["terms"], job["startDt"],
+                job["endDt"], job["granularity"], job["geo"], job["cat"], job["gprops"],
+                job["tz"], job["sum"], path, cookiePath, downloads, cache, engine,
+                checkpoint=os.path.join(checkpoint, job["id"]) if checkpoint else None)
+            error = None if trends else "no data, see the log for why"
+        except Exception as e:
+            trends = []
+            error = "%s: %s" % (type(e).__name__, e)
+        return {"id": job["id"], "output": path, "rows": max(len(trends) - 1, 0),
+                "seconds": time.time() - start, "error": error}
+
+    start = time.time()
+    pool = ThreadPool(max(1, min(workers, len(jobs))))
+    try:
+        results = pool.map(run, list(enumerate(jobs)))
+    finally:
+        pool.close()
+        pool.join()
+    seconds = time.time() - start
+    requests = gtrends.sessionPool.limiter.stats()["requests"] - requests
+
+    times = sorted(result["seconds"] for result in results)
+    summary = {"jobs": len(jobs),
+               "succeeded": len([r for r in results if r["error"] is None]),
+               "failed": [{"id": r["id"], "error": r["error"]} for r in results
+                          if r["error"] is not None],
+               "seconds": seconds,
+               "jobsPerSecond": len(jobs) / seconds if seconds else 0.0,
+               "requests": requests,
+               "requestsPerSecond": requests / seconds if seconds else 0.0,
+               "rows": sum(r["rows"] for r in results),
+               "p50": _percentile(times, 50), "p95": _percentile(times, 95),
+               "results": results}
+    if not os.path.isdir(outDir):
+        os.makedirs(outDir)
+    with open(os.path.join(outDir, "summary.json"), "w") as f:
+        json.dump(summary, f, indent=1)
+    return summary
+
+
+def _parseDate(text, name):
+    for fmt in ("%Y-%m-%d", "%Y-%m"):
+        try:
+            return datetime.datetime.strptime(str(text), fmt)
+        except ValueError:
+            pass
+    raise ValueError("%s has a bad date: %r, use YYYY-MM or YYYY-MM-DD" % (name, text))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
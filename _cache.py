@@ -0,0 +1,199 @@
+import os
+import time
+import hashlib
+import datetime
+import threading
+import six
+try:
+    import urllib.parse as urlparse
+except ImportError:
+    import urlparse
+
+class ResponseCache(object):
+    """
+    Keeps raw Google Trends csv responses on disk.
+
+    Each response is stored in its own file, named after a hash of the
+    normalized query, so the same query always maps to the same file no
+    matter how its url was written. Files for windows that ended before the
+    current month never change on Google's side and are kept until evicted.
+    Files for windows that reach into the current month expire after ttl
+    seconds. When the directory grows past maxBytes, the least recently used
+    files are removed first.
+    """
+
+    def __init__(self, path, ttl=6*60*60, maxBytes=256*1024*1024):
+        """
+        Args:
+            path: A string for the directory holding the cached files. It is
+                created if it does not exist.
+            ttl: The number of seconds a response for a window that is not
+                over yet stays valid.
+            maxBytes: The size the cache directory is allowed to reach before
+                old files are evicted.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = maxBytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        self._size = self._scan()[1]
+
+    def get(self, query):
+        """
+        Returns the cached response for the query, or None if there is no
+        valid one.
+        """
+        name = self._file(query)
+        try:
+            with open(name, "rb") as f:
+                expires = int(f.readline())
+                data = f.read()
+        except (IOError, OSError, ValueError):
+            self._count(hit=False)
+            return None
+
+        if expires and expires < time.time():
+            self._remove(name)
+            self._count(hit=False)
+            return None
+
+        #touching the file keeps it at the end of the eviction order.
+        try:
+            os.utime(name, None)
+        except OSError:
+            pass
+        self._count(hit=True)
+        if six.PY3:
+            data = data.decode("utf-8")
+        return data
+
+    def put(self, query, data):
+        """
+        Stores the response for the query. Responses which are not trend
+        reports (error and login pages) are ignored.
+        """
+        if not _isReport(data):
+            return
+        if _isClosed(query):
+            expires = 0
+        else:
+            expires = int(time.time() + self.ttl)
+        if isinstance(data, six.text_type):
+            data = data.encode("utf-8")
+        content = str(expires).encode("ascii") + b"\n" + data
+
+        name = self._file(query)
+        tmp = name + "." + str(threading.current_thread().ident) + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(content)
+        #a response cached before is replaced, and no longer counts.
+        try:
+            old = os.path.getsize(name)
+        except OSError:
+            old = 0
+        getattr(os, "replace", os.rename)(tmp, name)
+
+        with self._lock:
+            self._size += len(content) - old
+            full = self._size > self.max_bytes
+        if full:
+            self._evict()
+
+    def clear(self):
+        """Removes every cached response."""
+        for name in self._scan()[0]:
+            self._remove(name[2])
+        with self._lock:
+            self._size = 0
+
+    def _file(self, query):
+        return os.path.join(self.path, _key(query))
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _scan(self):
+        """Returns [(mtime, size, name)] of the cached files, and their total size."""
+        files = []
+        total = 0
+        for entry in os.listdir(self.path):
+            name = os.path.join(self.path, entry)
+            if entry.endswith(".tmp"):
+                continue
+            try:
+                st = os.stat(name)
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, name))
+            total += st.st_size
+        return files, total
+
+    def _evict(self):
+        """Removes the least recently used files until under max_bytes."""
+        with self._lock:
+            files, total = self._scan()
+            files.sort()
+            target = self.max_bytes * 0.9
+            for mtime, size, name in files:
+                if total <= target:
+                    break
+                self._remove(name)
+                total -= size
+            self._size = total
+
+    def _remove(self, name):
+        try:
+            os.remove(name)
+        except OSError:
+            pass
+
+
+
+
+def _normalize(query):
+    """
+    Reduces a query url to its parameters in a fixed order, leaving out the
+    empty ones. The order of the terms is kept, since it sets the order of
+    the columns in the response.
+    """
+    params = urlparse.parse_qsl(urlparse.urlsplit(query).query)
+    params = sorted((k, v.strip()) for k, v in params if v.strip())
+    return "&".join(k+"="+v for k, v in params)
+
+
+def _key(query):
+    key = _normalize(query)
+    if isinstance(key, six.text_type):
+        key = key.encode("utf-8")
+    return hashlib.sha1(key).hexdigest()
+
+
+def _isClosed(query, today=None):
+    """
+    Checks if the query's date window, ex: "3/2010 2m", ended before the
+    current month. Queries without a recognizable window are never closed.
+    """
+    if today is None:
+        today = datetime.date.today()
+    params = dict(urlparse.parse_qsl(urlparse.urlsplit(query).query))
+    try:
+        start, length = params["date"].split()
+        month, year = start.split("/")
+        lastMonth = int(year)*12 + int(month)-1 + int(length.rstrip("m"))-1
+    except (KeyError, ValueError):
+        return False
+    return lastMonth < today.year*12 + today.month-1
+
+
+def _isReport(data):
+    """Checks that the response has the "Day" or "Week" column header of a report."""
+    lines = data.split("\n", 5)
+    return len(lines) > 5 and lines[4].split(",")[0] in ("Day", "Week", "Month")
@@ -0,0 +1,160 @@
+import os
+import re
+import json
+import threading
+import six
+
+from _cache import _isReport
+
+#The file describing the job whose files a checkpoint holds.
+JOB_FILE = "job.json"
+#The file holding the parse status of each file.
+STATUS_FILE = "status.json"
+#The names of the files of a job, and of their temporary files.
+_OWN_FILE = re.compile(r"^(s\d{3}-w\d{4}\.csv|job\.json|status\.json)(\.\d+)?(\.tmp)?$")
+
+class Checkpoint(object):
+    """
+    Keeps the files of one collectTrends() job in a directory, so that a job
+    which failed part of the way can be run again without downloading the
+    files it already has.
+
+    Each file is saved as soon as it is downloaded, named after its term
+    segment and window, and the result of parsing it is recorded in
+    status.json. A file which could not be parsed is removed, so that the
+    next run downloads it again. The job itself is identified by its export
+    urls: running a job with different terms, dates or parameters in the
+    same directory starts it over.
+
+    Unlike a ResponseCache, a checkpoint also keeps files for windows that
+    are not over yet, so that every part of the job sees the same data.
+    Only the files it writes itself are ever removed, so other files in the
+    directory are left alone.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path: A string for the directory holding the job's files. It is
+                created if it does not exist.
+        """
+        self.path = path
+        self.restored = 0
+        self.saved = 0
+        self._files = {}
+        self._status = {}
+        self._lock = threading.Lock()
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        job = self._load(JOB_FILE)
+        if job is not None:
+            self._index(job["queries"], job["numFiles"])
+
+    def begin(self, queries, numFiles):
+        """
+        Starts, or resumes, the job downloading the queries, which are
+        numFiles windows for each segment in turn, as from _planQueries.
+        Returns the number of files already saved.
+        """
+        job = {"queries": list(queries), "numFiles": numFiles}
+        if self._load(JOB_FILE) != job:
+            self.clear()
+            self._dump(JOB_FILE, job)
+        self._index(queries, numFiles)
+        return len([name for name in set(self._files.values())
+                    if os.path.exists(self._name(name))])
+
+    def get(self, query):
+        """Returns the saved file for the query, or None."""
+        name = self._files.get(query)
+        if name is None:
+            return None
+        try:
+            with open(self._name(name), "rb") as f:
+                data = f.read()
+        except (IOError, OSError):
+            return None
+        with self._lock:
+            self.restored += 1
+        if six.PY3:
+            data = data.decode("utf-8")
+        return data
+
+    def put(self, query, data):
+        """Saves the file for the query. Error and login pages are ignored."""
+        name = self._files.get(query)
+        if name is None or not _isReport(data):
+            return
+        if isinstance(data, six.text_type):
+            data = data.encode("utf-8")
+        tmp = self._name(name + "." + str(threading.current_thread().ident) + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(data)
+        getattr(os, "replace", os.rename)(tmp, self._name(name))
+        with self._lock:
+            self.saved += 1
+
+    def mark(self, segment, window, parsed):
+        """
+        Records whether the window'th file of the segment could be parsed,
+        removing it if not.
+        """
+        name = "s%03d-w%04d.csv" % (segment, window)
+        with self._lock:
+            self._status[name] = "parsed" if parsed else "failed"
+            status = dict(self._status)
+        if not parsed:
+            try:
+                os.remove(self._name(name))
+            except OSError:
+                pass
+        self._dump(STATUS_FILE, status)
+
+    def status(self):
+        """
+        Returns a dict with the number of files of the job, and how many of
+        them are saved, parsed and failed.
+        """
+        names = set(self._files.values())
+        with self._lock:
+            status = dict(self._status)
+        return {"files": len(names),
+                "saved": len([name for name in names if os.path.exists(self._name(name))]),
+                "parsed": len([name for name in names if status.get(name) == "parsed"]),
+                "failed": len([name for name in names if status.get(name) == "failed"])}
+
+    def clear(self):
+        """Removes every file of the job, leaving any other file alone."""
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+        for name in os.listdir(self.path):
+            if _OWN_FILE.match(name):
+                try:
+                    os.remove(self._name(name))
+                except OSError:
+                    pass
+        with self._lock:
+            self._status = {}
+
+    def _index(self, queries, numFiles):
+        self._files = {}
+        for n, query in enumerate(queries):
+            self._files[query] = "s%03d-w%04d.csv" % (n // numFiles, n % numFiles)
+        with self._lock:
+            self._status = self._load(STATUS_FILE) or {}
+
+    def _name(self, name):
+        return os.path.join(self.path, name)
+
+    def _load(self, name):
+        try:
+            with open(self._name(name)) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def _dump(self, name, data):
+        tmp = self._name(name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        getattr(os, "replace", os.rename)(tmp, self._name(name))
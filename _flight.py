@@ -0,0 +1,83 @@
+import threading
+
+from _cache import _normalize
+from _metrics import metrics
+
+class SingleFlight(object):
+    """
+    Lets concurrent requests for the same report share one download.
+
+    The first caller of do() for a query downloads it, and every caller
+    asking for the same query while that download is running waits for it
+    and gets the same response (or the same exception) instead of sending a
+    request of its own. Queries are compared by their normalized url (see
+    ResponseCache), so the order and spelling of the parameters don't
+    matter. Nothing is kept once a download is over, so this needs no
+    cache and never serves stale data. Only the response is shared: each
+    caller parses it itself, since how a file is parsed depends on the
+    window it is used for.
+
+    A SessionPool shares one SingleFlight between all of its Downloaders,
+    so that collectTrends() calls on different threads coalesce. Only calls
+    for the same account share a download, so that the report or the
+    exception of one login never reaches another.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, query, download, account=None):
+        """
+        Returns download(), unless a download of the same query for the same
+        account is already running, in which case its result is waited for
+        and returned. account can be any hashable, such as the Downloader.
+        """
+        key = (account, _normalize(query))
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            metrics.count("coalesced")
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = download()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+    def stats(self):
+        """
+        Returns a dict of the number of downloads done, the number of
+        requests which shared another's download instead, and the number of
+        downloads running.
+        """
+        with self._lock:
+            return {"calls": self.calls, "coalesced": self.coalesced,
+                    "inFlight": len(self._flights)}
+
+
+
+
+class _Flight(object):
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
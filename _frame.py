@@ -0,0 +1,221 @@
+import csv
+import datetime
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class TrendFrame(object):
+    """
+    Holds trend data as one array of dates and one float64 matrix of values,
+    with a column per term.
+
+    This takes a fraction of the memory of the list format returned by
+    collectTrends(), and columns and date ranges can be taken out of it
+    without copying. NumPy must be installed to use it.
+    """
+
+    def __init__(self, dates, values, terms):
+        """
+        Args:
+            dates: A sequence of datetime objects (or a datetime64 array),
+                in ascending order.
+            values: Anything convertible to a float64 array with one row per
+                date and one column per term.
+            terms: A sequence of strings naming the columns.
+        """
+        if np is None:
+            raise ImportError("TrendFrame requires NumPy to be installed")
+        self.dates = np.asarray(dates, dtype="datetime64[D]")
+        self.values = np.ascontiguousarray(values, dtype=np.float64)
+        self.terms = list(terms)
+        if self.values.ndim != 2 or self.values.shape != (len(self.dates), len(self.terms)):
+            raise ValueError("values must have one row per date and one column per term")
+        self._columns = dict((term, j) for j, term in enumerate(self.terms))
+
+    @classmethod
+    def fromList(cls, data):
+        """
+        Creates a TrendFrame from the list format of collectTrends(), header
+        included.
+        """
+        header = data[0]
+        rows = data[1:]
+        values = [line[1:] for line in rows]
+        terms = header[1:]
+        #summed data only has one column, but the header lists every term.
+        if rows and len(rows[0]) != len(header):
+            terms = [" ".join(terms)]
+        return cls([line[0] for line in rows], np.array(values, dtype=np.float64).reshape(len(rows), len(terms)), terms)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def __getitem__(self, term):
+        """Returns the column of values for the term, without copying."""
+        return self.values[:, self._columns[term]]
+
+    def __contains__(self, term):
+        return term in self._columns
+
+    def __repr__(self):
+        return "TrendFrame(%d dates x %d terms)" % self.values.shape
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def between(self, startDt, endDt):
+        """
+        Returns a TrendFrame of the dates in [startDt, endDt), sharing memory
+        with this one.
+        """
+        start, end = np.searchsorted(self.dates, _day([startDt, endDt]))
+        return self._slice(slice(start, end))
+
+    def select(self, terms):
+        """Returns a TrendFrame holding only the given terms, in that order."""
+        cols = [self._columns[term] for term in terms]
+        return TrendFrame(self.dates, self.values[:, cols], terms)
+
+    def toNumpy(self):
+        """Returns (dates, values) as a datetime64 array and a float64 matrix."""
+        return self.dates, self.values
+
+    def toPandas(self):
+        """Returns a pandas DataFrame indexed by date. pandas must be installed."""
+        import pandas
+        return pandas.DataFrame(self.values, index=pandas.DatetimeIndex(self.dates, name="date"),
+                                columns=self.terms)
+
+    def toList(self):
+        """Returns the data in the list format of collectTrends(), header included."""
+        data = [["date"] + self.terms]
+        for dt, line in zip(self.dates.tolist(), self.values.tolist()):
+            data.append([datetime.datetime(dt.year, dt.month, dt.day)] + line)
+        return data
+
+    def toCsv(self, path, header=None):
+        """
+        Writes the data to a csv file in the same format as savePath. header
+        replaces the header line of ["date"] + terms, as for summed data,
+        whose header lists every term summed above its single column.
+        """
+        try:
+            file = open(path, "w", newline="")
+        except TypeError:   #Py2 has no newline argument, and needs "wb"
+            file = open(path, "wb")
+        writer = csv.writer(file, delimiter=",")
+        writer.writerow(header if header is not None else ["date"] + self.terms)
+        dates = np.datetime_as_string(self.dates, unit="D").tolist()
+        for dt, line in zip(dates, self.values.tolist()):
+            writer.writerow([dt] + line)
+        file.close()
+
+    def _slice(self, rows):
+        frame = TrendFrame.__new__(TrendFrame)
+        frame.dates = self.dates[rows]
+        frame.values = self.values[rows]
+        frame.terms = self.terms
+        frame._columns = self._columns
+        return frame
+
+
+
+
+class TrendCube(object):
+    """
+    Holds the trend data of the same terms in several geos, as one array of
+    dates and one float64 array of values indexed by [geo, date, term], as
+    returned by collectTrendsGeo().
+
+    Each geo is normalized on its own, as Google does, so values compare the
+    shape of the series between geos but not their search volume. Dates a
+    geo has no data for, and every date of a geo that failed, are NaN.
+    """
+
+    def __init__(self, geos, dates, values, terms, failed=()):
+        """
+        Args:
+            geos: A sequence of strings naming the geos, in the order of the
+                first axis of values.
+            dates: A sequence of datetime objects (or a datetime64 array),
+                in ascending order.
+            values: Anything convertible to a float64 array of shape
+                (geos, dates, terms).
+            terms: A sequence of strings naming the columns.
+            failed: The geos whose data could not be collected.
+        """
+        if np is None:
+            raise ImportError("TrendCube requires NumPy to be installed")
+        self.geos = list(geos)
+        self.dates = np.asarray(dates, dtype="datetime64[D]")
+        self.values = np.ascontiguousarray(values, dtype=np.float64)
+        self.terms = list(terms)
+        self.failed = list(failed)
+        if self.values.shape != (len(self.geos), len(self.dates), len(self.terms)):
+            raise ValueError("values must have the shape (geos, dates, terms)")
+        self._geos = dict((geo, i) for i, geo in enumerate(self.geos))
+
+    @classmethod
+    def fromFrames(cls, geos, frames):
+        """
+        Creates a TrendCube from a TrendFrame per geo, on the union of their
+        dates. A frame of None marks a geo that failed. All the frames must
+        have the same terms.
+        """
+        found = [frame for frame in frames if frame is not None]
+        if not found:
+            raise ValueError("no geo has any data")
+        terms = found[0].terms
+        dates = found[0].dates
+        for frame in found[1:]:
+            if frame.terms != terms:
+                raise ValueError("every geo must have the same terms")
+            if not np.array_equal(frame.dates, dates):
+                dates = np.union1d(dates, frame.dates)
+        values = np.full((len(geos), len(dates), len(terms)), np.nan)
+        failed = []
+        for i, (geo, frame) in enumerate(zip(geos, frames)):
+            if frame is None:
+                failed.append(geo)
+            elif len(frame.dates) == len(dates):
+                values[i] = frame.values
+            else:
+                values[i, np.searchsorted(dates, frame.dates)] = frame.values
+        return cls(geos, dates, values, terms, failed)
+
+    def __len__(self):
+        return len(self.geos)
+
+    def __getitem__(self, geo):
+        """Returns the data of the geo as a TrendFrame, without copying."""
+        frame = TrendFrame.__new__(TrendFrame)
+        frame.dates = self.dates
+        frame.values = self.values[self._geos[geo]]
+        frame.terms = self.terms
+        frame._columns = dict((term, j) for j, term in enumerate(self.terms))
+        return frame
+
+    def __contains__(self, geo):
+        return geo in self._geos
+
+    def __repr__(self):
+        return "TrendCube(%d geos x %d dates x %d terms)" % self.values.shape
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def term(self, term):
+        """Returns the (geos, dates) matrix of values for the term, without copying."""
+        return self.values[:, :, self.terms.index(term)]
+
+    def toNumpy(self):
+        """Returns (dates, values) as a datetime64 array and a float64 array."""
+        return self.dates, self.values
+
+
+
+def _day(dts):
+    return np.array([datetime.date(dt.year, dt.month, dt.day) for dt in dts], dtype="datetime64[D]")
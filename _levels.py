@@ -0,0 +1,120 @@
+import time
+import threading
+from collections import OrderedDict
+
+from _metrics import metrics
+
+class LevelCache(object):
+    """
+    Keeps the chained levels of collectTrends() results in memory, before
+    they are summed and normalized, so that later calls which only ask for
+    part of a result are answered without downloading anything.
+
+    Summing and normalizing are linear in the levels, so a call for the same
+    query parameters is answered from any entry whose terms include the
+    terms asked for and whose months cover [startDt, endDt): its columns and
+    dates are picked out, and then summed and normalized as usual. A call
+    for exactly the same terms and dates gives exactly what a download
+    would. Other calls are consistent with the cached result, but can differ
+    slightly from a download of their own, which Google would pack and
+    round differently.
+
+    Entries whose files reach into the current month expire after ttl
+    seconds, like in a ResponseCache. When there are more than maxEntries,
+    the least recently used entries are dropped first.
+    """
+
+    def __init__(self, maxEntries=64, ttl=6*60*60):
+        """
+        Args:
+            maxEntries: The number of results kept.
+            ttl: The number of seconds a result whose files include the
+                current month stays valid.
+        """
+        self.max_entries = maxEntries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, params, terms, startDt, endDt):
+        """
+        Returns (dates, levels) for the terms between startDt and endDt,
+        where levels has a row per date with a column per term in the order
+        given, or None if no entry for the query parameters covers them.
+        Like the levels of collectTrends(), the rows run up to and including
+        the first one in endDt's month, or to the end of the entry's rows if
+        it ends in the same month.
+        """
+        start = (startDt.year, startDt.month)
+        end = (endDt.year, endDt.month)
+        now = time.time()
+        with self._lock:
+            #the entry of exactly this call comes first, then the newest.
+            exact = (params, tuple(terms), start, end)
+            idents = [ident for ident in reversed(self._entries) if ident != exact]
+            if exact in self._entries:
+                idents.insert(0, exact)
+            for ident in idents:
+                entry = self._entries[ident]
+                if ident[0] != params:
+                    continue
+                if entry["expires"] and entry["expires"] < now:
+                    del self._entries[ident]
+                    continue
+                if entry["start"] > start or entry["end"] < end:
+                    continue
+                columns = entry["columns"]
+                if not all(term in columns for term in terms):
+                    continue
+                self._entries.pop(ident)
+                self._entries[ident] = entry
+                self.hits += 1
+                break
+            else:
+                self.misses += 1
+                return None
+        metrics.count("level_hits")
+
+        dates = entry["dates"]
+        first = 0
+        if start != entry["start"]:
+            while first < len(dates) and (dates[first].year, dates[first].month) < start:
+                first += 1
+        last = len(dates)
+        if end != entry["end"]:
+            last = first
+            while last < len(dates) and (dates[last].year, dates[last].month) < end:
+                last += 1
+            last = min(last + 1, len(dates))
+        cols = [columns[term] for term in terms]
+        levels = [[line[j] for j in cols] for line in entry["levels"][first:last]]
+        return dates[first:last], levels
+
+    def put(self, params, terms, startDt, endDt, dates, levels, closed=True):
+        """
+        Stores the levels of a result, as returned by get(). params are the
+        query parameters other than the terms and dates, and closed tells
+        whether all the files of the result are of months that are over.
+        """
+        entry = {"start": (startDt.year, startDt.month), "end": (endDt.year, endDt.month),
+                 "columns": dict((term, j) for j, term in reversed(list(enumerate(terms)))),
+                 "dates": list(dates), "levels": [list(line) for line in levels],
+                 "expires": 0 if closed else time.time() + self.ttl}
+        ident = (params, tuple(terms), entry["start"], entry["end"])
+        with self._lock:
+            self._entries.pop(ident, None)
+            self._entries[ident] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        """Returns a dict of the number of entries, hits and misses."""
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        """Drops every entry."""
+        with self._lock:
+            self._entries.clear()
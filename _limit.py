@@ -0,0 +1,159 @@
+import time
+import random
+import threading
+import collections
+try:
+    from urllib.error import HTTPError
+except ImportError:
+    from urllib2 import HTTPError
+
+#HTTP statuses Google answers with when a client sends too many requests.
+THROTTLE_STATUSES = (429, 503)
+#Pages Google serves instead of a report once the quota is used up.
+QUOTA_MESSAGES = ("You have reached your quota limit",
+                  "Our systems have detected unusual traffic")
+
+class RateLimiter(object):
+    """
+    Spaces out the report requests of every Downloader sharing it.
+
+    Requests take tokens from a bucket which refills at `rate` tokens per
+    second and holds at most `burst` of them. When Google throttles a request
+    (see isThrottled), the rate is multiplied by `decrease`, and the request
+    is retried after a random delay of up to baseDelay*2**attempt seconds.
+    Every successful request raises the rate again by increase/rate, so that
+    it grows by about `increase` requests per second each second, up to
+    maxRate. The rate therefore settles just below the quota instead of
+    running into it.
+
+    With rate=None, requests are not limited until the first throttling,
+    after which the rate starts from the rate of the last 10 seconds.
+
+    The time callers spend waiting, both for tokens and before retries, is
+    kept in the counters returned by stats().
+    """
+
+    def __init__(self, rate=None, burst=1, maxRate=None, minRate=0.05,
+                 increase=0.1, decrease=0.5, retries=4, baseDelay=1.0,
+                 maxDelay=60.0, seed=None):
+        """
+        Args:
+            rate: Requests per second, or None not to limit requests until
+                Google throttles them.
+            burst: The number of requests which can be sent at once after a
+                pause.
+            maxRate: The rate is never raised past this. None for no limit.
+            minRate: The rate is never lowered below this.
+            increase: Requests per second added to the rate each second
+                without throttling.
+            decrease: The factor the rate is multiplied by when throttled.
+            retries: How many times a throttled request is retried before
+                giving up.
+            baseDelay: Seconds to wait, at most, before the first retry. The
+                limit doubles with every retry.
+            maxDelay: The longest wait before a retry, in seconds.
+            seed: Seeds the random delays, so runs can be repeated.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_rate = maxRate
+        self.min_rate = minRate
+        self.increase = increase
+        self.decrease = decrease
+        self.retries = retries
+        self.base_delay = baseDelay
+        self.max_delay = maxDelay
+        self.requests = 0
+        self.throttles = 0
+        self.waited = 0.0
+        self.backed_off = 0.0
+        self.max_wait = 0.0
+        self._tokens = float(burst)
+        self._stamp = time.time()
+        self._recent = collections.deque()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def acquire(self, sleep=True):
+        """
+        Blocks until a request may be sent. Returns the seconds waited. With
+        sleep=False, returns at once, and the caller must wait that long
+        itself (as the asyncio API does).
+        """
+        with self._lock:
+            now = time.time()
+            self._refill(now)
+            self.requests += 1
+            self._recent.append(now)
+            while self._recent[0] < now - 10.0:
+                self._recent.popleft()
+            if self.rate is None:
+                return 0.0
+            #the token is taken now, so that threads queue up in order.
+            self._tokens -= 1.0
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            self.waited += wait
+            self.max_wait = max(self.max_wait, wait)
+        if sleep and wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def succeeded(self):
+        """Raises the rate after a request which was not throttled."""
+        with self._lock:
+            if self.rate is None:
+                return
+            self.rate += self.increase / self.rate
+            if self.max_rate is not None:
+                self.rate = min(self.rate, self.max_rate)
+
+    def throttled(self, attempt, sleep=True):
+        """
+        Lowers the rate after the attempt'th try of a request was throttled,
+        then waits before the next try. Returns the seconds waited, which
+        with sleep=False the caller must wait itself.
+        """
+        with self._lock:
+            self.throttles += 1
+            if self.rate is None:
+                now = time.time()
+                self._refill(now)
+                self.rate = len(self._recent) / 10.0
+            self.rate = max(self.rate*self.decrease, self.min_rate)
+            #drop saved up tokens, so the next requests follow the new rate.
+            self._tokens = min(self._tokens, 0.0)
+            limit = min(self.base_delay * 2**attempt, self.max_delay)
+            delay = self._random.uniform(0, limit)
+            self.backed_off += delay
+        if sleep:
+            time.sleep(delay)
+        return delay
+
+    def stats(self):
+        """
+        Returns a dict of the current rate, the number of requests and
+        throttlings, and the seconds spent waiting for tokens and before
+        retries.
+        """
+        with self._lock:
+            return {"rate": self.rate, "requests": self.requests,
+                    "throttles": self.throttles, "waited": self.waited,
+                    "maxWait": self.max_wait, "backedOff": self.backed_off}
+
+    def _refill(self, now):
+        if self.rate is not None:
+            self._tokens = min(self._tokens + (now - self._stamp)*self.rate,
+                               float(self.burst))
+        self._stamp = now
+
+
+
+
+def isThrottled(data=None, error=None):
+    """
+    Tells whether a response, or the HTTPError raised instead of one, means
+    that Google is throttling requests.
+    """
+    if error is not None:
+        return isinstance(error, HTTPError) and error.code in THROTTLE_STATUSES
+    return any(message in data[:2000] for message in QUOTA_MESSAGES)
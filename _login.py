@@ -1,18 +1,21 @@
 import six
 import re
+import os
 import logging
-try:
-    import urllib.request as urllib2
-except ImportError:
-    import urllib2
+import threading
 try:
     import urllib.parse as urllib
 except ImportError:
     import urllib
 try:
-    from http.cookiejar import CookieJar
+    from http.cookiejar import CookieJar, LWPCookieJar, LoadError
 except ImportError:
-    from cookielib import CookieJar
+    from cookielib import CookieJar, LWPCookieJar, LoadError
+
+from _transport import HttpTransport
+from _limit import RateLimiter, isThrottled
+from _flight import SingleFlight
+from _metrics import metrics
  
 class Downloader(object):
     """
@@ -21,10 +24,25 @@ class Downloader(object):
     This code is modified from the original snippet by Greg Roberts at
     https://gist.github.com/gregroberts/11001277, discovered through the useful
     reddit post here http://www.reddit.com/r/Python/comments/233a0c/trying_to_download_google_trends_data/.
+
+    Logging in is deferred until the first report is requested, and happens
+    only once per object. If cookiePath is given, the session cookies are
+    saved there after logging in and reloaded by later processes, so that the
+    login is skipped until the cookies expire.
+
+    All requests go through a Transport, by default an HttpTransport to
+    Google. Others can record and replay responses, or send the requests to
+    a stand-in server.
+
+    Report requests are spaced out by a RateLimiter, and retried when Google
+    throttles them. With a SingleFlight, a report which another thread is
+    already downloading through the same Downloader is not requested again,
+    and its response is shared.
     """
 
     
-    def __init__(self, username, password):
+    def __init__(self, username, password, cookiePath=None, transport=None,
+                 limiter=None, flight=None):
         """
         Sets various object parameters.
         """      
@@ -43,42 +61,228 @@ class Downloader(object):
         self.url_CookieCheck = 'https://www.google.com/accounts/CheckCookie?chtml=LoginDoneHtml'
         self.url_PrefCookie = 'http://www.google.com'
         self.header_dictionary = {}
-        self._connect()
+        self.cookie_path = cookiePath
+        self.transport = transport if transport is not None else HttpTransport()
+        self.limiter = limiter if limiter is not None else RateLimiter()
+        self.flight = flight
+        self.logged_in = False
+        self.logins = 0
+        self._lock = threading.Lock()
+        self._build()
+
+    def _build(self):
+        """
+        Creates the cookie jar, reusing saved cookies if possible.
+        """
+        if self.cookie_path is None:
+            self.cj = CookieJar()
+        else:
+            self.cj = LWPCookieJar(self.cookie_path)
+            if os.path.exists(self.cookie_path):
+                try:
+                    #expired cookies are dropped while loading
+                    self.cj.load(ignore_discard=True)
+                except (LoadError, IOError):
+                    logging.warning('Unable to read cookies from '+self.cookie_path)
+                    self.cj.clear()
+                self.logged_in = len(self.cj) > 0
+        self.transport.prepare(self.cj, self.headers)
         
     def _connect(self):
         """
         Connects to Google Trends.
         """
-        self.cj = CookieJar()
-        cook = urllib2.HTTPCookieProcessor(self.cj)
-        self.opener = urllib2.build_opener(cook)
-        self.opener.addheaders = self.headers
-        
+        self.cj.clear()
+        resp = str(self.transport.open(self.url_ServiceLoginBoxAuth))
+        self.login_params['GALX'] = self._galx(resp)
+        params = urllib.urlencode(self.login_params).encode("utf-8")
+        self.transport.open(self.url_ServiceLoginBoxAuth, params)
+        self.transport.open(self.url_CookieCheck)
+        self.transport.open(self.url_PrefCookie)
+        self.logged_in = True
+        self.logins += 1
+        self._saveCookies()
+
+    def _galx(self, resp):
+        """
+        Returns the GALX token of the login form.
+        """
         galx = re.compile('<input type="hidden"[\s]+name="GALX"[\s]+value="(?P<galx>[a-zA-Z0-9_-]+)">')
-        resp = str(self.opener.open(self.url_ServiceLoginBoxAuth).read())
         resp = re.sub(r'\s\s+', ' ', resp)
         m = galx.search(resp)
+        return m.group('galx')
 
-        self.login_params['GALX'] = m.group('galx')
-        params = urllib.urlencode(self.login_params).encode("utf-8")
-        self.opener.open(self.url_ServiceLoginBoxAuth, params)
-        self.opener.open(self.url_CookieCheck)
-        self.opener.open(self.url_PrefCookie)
+    def _saveCookies(self):
+        """
+        Writes the session cookies to cookie_path, readable only by the owner.
+        """
+        if self.cookie_path is None:
+            return
+        self.cj.save(ignore_discard=True)
+        os.chmod(self.cookie_path, 0o600)
+
+    def login(self, stale=None):
+        """
+        Logs in unless already logged in. Safe to call from several threads.
+
+        If stale is given, it is the value of self.logins seen with a session
+        that Google rejected. The login is then redone, unless another thread
+        has already done so in the meantime.
+        """
+        with self._lock:
+            if not self.logged_in or stale == self.logins:
+                with metrics.timer("login"):
+                    self._connect()
+                metrics.count("logins")
  
         
-    def downloadReport(self, query):
+    def downloadReport(self, query, cache=None):
         """
         Returns original raw csv file as a one large string.
+
+        If a ResponseCache is given, a valid cached copy is returned without
+        contacting Google (or logging in), and new downloads are added to it.
+        """
+        if cache is not None:
+            data = cache.get(query)
+            if data is not None:
+                metrics.count("cache_hits")
+                return data
+
+        if self.flight is not None:
+            return self.flight.do(query, lambda: self._download(query, cache), self)
+        return self._download(query, cache)
+
+    def _download(self, query, cache):
+        """Logs in if needed and downloads the report, adding it to the cache."""
+        self.login()
+        seen = self.logins
+        data = self._limitedOpen(query)
+
+        #saved cookies may have been revoked by Google before they expired,
+        #so log in again once before giving up.
+        if self._signedOut(data):
+            self.login(stale=seen)
+            data = self._limitedOpen(query)
+
+        if self._signedOut(data):
+            logging.error('You must be signed in to export data from Google Trends')
+            raise Exception(data)
+
+        if cache is not None:
+            cache.put(query, data)
+        return data
+
+    def _limitedOpen(self, query):
+        """
+        Opens the query once the limiter allows it, retrying as long as Google
+        throttles it and the limiter allows retries.
         """
-        data = self.opener.open(query).read()
+        for attempt in range(self.limiter.retries + 1):
+            metrics.observe("rateLimit", self.limiter.acquire())
+            try:
+                data = self._open(query)
+            except Exception as e:
+                if not isThrottled(error=e):
+                    raise
+                data = None
+            if data is not None and not isThrottled(data):
+                self.limiter.succeeded()
+                return data
+            metrics.count("throttles")
+            if attempt < self.limiter.retries:
+                self.limiter.throttled(attempt)
+
+        logging.error('Google Trends is throttling requests, giving up on '+query)
+        raise Exception('Throttled by Google Trends: '+query)
+
+    def _open(self, query):
+        with metrics.timer("fetch", url=query) as timer:
+            try:
+                data = self.transport.open(query)
+            except Exception as e:
+                timer.info["status"] = getattr(e, "code", "error")
+                metrics.count("requests", status=timer.info["status"])
+                raise
+            timer.info.update(status=200, bytes=len(data))
+        metrics.count("requests", status=200)
+        metrics.count("response_bytes", len(data))
         #This is because in Py3 data is returned as bytes, and we want str
         #This is an issue when in Py2 data is already an str, and doesn't
         #have the decode method.
         if not isinstance(data, six.string_types):
             data = data.decode()
-        
-        if data in ['You must be signed in to export data from Google Trends']:
-            logging.error('You must be signed in to export data from Google Trends')
-            raise Exception(data)
+        return data
+
+    def _signedOut(self, data):
+        return data in ['You must be signed in to export data from Google Trends']
+
+
+
+
+class SessionPool(object):
+    """
+    Hands out one shared Downloader per account, so that every segment and
+    every collectTrends call in the process reuses the same login.
+    """
+
+    def __init__(self, transport=HttpTransport, limiter=None, downloader=Downloader,
+                 flight=None):
+        """
+        Args:
+            transport: A callable returning a new Transport for each
+                Downloader created.
+            limiter: The RateLimiter shared by all the Downloaders. A new one
+                is created if None.
+            downloader: The Downloader class to create, such as the
+                AsyncDownloader of the asyncio API.
+            flight: The SingleFlight shared by all the Downloaders. A new one
+                is created if None.
+        """
+        self.transport = transport
+        self.limiter = limiter if limiter is not None else RateLimiter()
+        self.downloader = downloader
+        self.flight = flight if flight is not None else SingleFlight()
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get(self, username, password, cookiePath=None):
+        """
+        Returns the Downloader for the account, creating it if needed.
+        """
+        key = (username, password, cookiePath)
+        with self._lock:
+            dloader = self._sessions.get(key)
+            if dloader is None:
+                dloader = self.downloader(username, password, cookiePath,
+                                          self.transport(), self.limiter, self.flight)
+                self._sessions[key] = dloader
+        return dloader
+
+    def clear(self):
+        """
+        Forgets all sessions, forcing the next request to log in again.
+        """
+        with self._lock:
+            self._sessions = {}
+
+    def setTransport(self, transport):
+        """
+        Makes later Downloaders use transports from the given callable, and
+        forgets the existing sessions.
+        """
+        with self._lock:
+            self.transport = transport
+            self._sessions = {}
+
+    def setLimiter(self, limiter):
+        """
+        Makes every Downloader share the given RateLimiter, and forgets the
+        existing sessions.
+        """
+        with self._lock:
+            self.limiter = limiter
+            self._sessions = {}
+
 
-        return data 
+sessionPool = SessionPool()
@@ -0,0 +1,187 @@
+import time
+import logging
+import threading
+
+#Upper bounds, in seconds, of the buckets of every stage histogram.
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+#The counters kept, with their help text for the Prometheus export.
+COUNTERS = {
+    "requests": "Report requests sent to Google, by HTTP status.",
+    "response_bytes": "Bytes of the report responses received.",
+    "cache_hits": "Reports answered from a ResponseCache.",
+    "level_hits": "Results answered from a LevelCache.",
+    "coalesced": "Report requests which shared a download already running.",
+    "logins": "Logins to Google.",
+    "throttles": "Report requests throttled by Google.",
+}
+
+class Metrics(object):
+    """
+    Times the stages of collectTrends() and counts its requests.
+
+    Every timed stage is added to a histogram of its durations, and passed
+    to the hooks as hook(stage, seconds, info), where info is a dict with
+    details of the stage (for "fetch": url, status and bytes). Hooks run on
+    the thread doing the work, so they should return quickly.
+
+    The stages are "login", "fetch", "rateLimit" (time spent waiting in the
+    RateLimiter), "prepTrends", "scaleRep", "merge", "calcPerc",
+    "reformTrend", "normalize" and "save". With engine='numpy', "stitch"
+    takes the place of the four stages from "scaleRep" to "reformTrend".
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        """
+        Args:
+            buckets: The upper bounds of the histogram buckets, in seconds,
+                in ascending order.
+        """
+        self.buckets = tuple(buckets)
+        self._counters = {}
+        self._histograms = {}
+        self._hooks = []
+        self._lock = threading.Lock()
+
+    def addHook(self, hook):
+        """Calls hook(stage, seconds, info) after every timed stage."""
+        with self._lock:
+            self._hooks = self._hooks + [hook]
+
+    def removeHook(self, hook):
+        with self._lock:
+            self._hooks = [h for h in self._hooks if h is not hook]
+
+    def timer(self, stage, **info):
+        """
+        Returns a context manager timing its block as the stage. Details can
+        be added to its info dict inside the block.
+        """
+        return _Timer(self, stage, info)
+
+    def observe(self, stage, seconds, info=None):
+        """Records that the stage took the given number of seconds."""
+        with self._lock:
+            hist = self._histograms.get(stage)
+            if hist is None:
+                hist = self._histograms[stage] = [0]*len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    hist[i] += 1
+            hist[-2] += seconds
+            hist[-1] += 1
+            hooks = self._hooks
+        for hook in hooks:
+            try:
+                hook(stage, seconds, info or {})
+            except Exception:
+                logging.exception("Metrics hook failed for stage "+stage)
+
+    def count(self, name, value=1, **labels):
+        """Adds value to the counter, for the given labels."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def counter(self, name, **labels):
+        """Returns the value of the counter for the given labels."""
+        with self._lock:
+            return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def histogram(self, stage):
+        """
+        Returns a dict with the number of times the stage was timed, the
+        total seconds, and the cumulative count of each bucket, as a list of
+        (upper bound, count) pairs.
+        """
+        with self._lock:
+            hist = self._histograms.get(stage) or [0]*len(self.buckets) + [0.0, 0]
+            return {"count": hist[-1], "sum": hist[-2],
+                    "buckets": list(zip(self.buckets, hist[:-2]))}
+
+    def stages(self):
+        """Returns the names of the stages timed so far."""
+        with self._lock:
+            return sorted(self._histograms)
+
+    def reset(self):
+        """Clears every counter and histogram. Hooks are kept."""
+        with self._lock:
+            self._counters = {}
+            self._histograms = {}
+
+    def toPrometheus(self):
+        """Returns every counter and histogram in the Prometheus text format."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((stage, list(hist)) for stage, hist in self._histograms.items())
+
+        lines = []
+        names = []
+        for (name, labels), value in counters:
+            metric = "gtrends_" + name + "_total"
+            if name not in names:
+                names.append(name)
+                lines.append("# HELP " + metric + " " + COUNTERS.get(name, name))
+                lines.append("# TYPE " + metric + " counter")
+            lines.append(metric + _labels(labels) + " " + _number(value))
+
+        if histograms:
+            lines.append("# HELP gtrends_stage_seconds Time spent in each stage of a download.")
+            lines.append("# TYPE gtrends_stage_seconds histogram")
+        for stage, hist in histograms:
+            for bound, count in zip(self.buckets, hist[:-2]):
+                lines.append("gtrends_stage_seconds_bucket" +
+                             _labels([("stage", stage), ("le", _number(bound))]) + " " + str(count))
+            lines.append("gtrends_stage_seconds_bucket" +
+                         _labels([("stage", stage), ("le", "+Inf")]) + " " + str(hist[-1]))
+            lines.append("gtrends_stage_seconds_sum" + _labels([("stage", stage)]) + " " +
+                         _number(hist[-2]))
+            lines.append("gtrends_stage_seconds_count" + _labels([("stage", stage)]) + " " +
+                         str(hist[-1]))
+        return "\n".join(lines) + "\n"
+
+
+
+
+class _Timer(object):
+
+    def __init__(self, metrics, stage, info):
+        self.metrics = metrics
+        self.stage = stage
+        self.info = info
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, excType, exc, tb):
+        self.metrics.observe(self.stage, time.time() - self.start, self.info)
+        return False
+
+
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join('%s="%s"' % (name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+                          for name, value in labels) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _percentile(values, pct):
+    """
+    Nearest-rank percentile of sorted values, as reported by the batch runner
+    and benchmark.py. 0.0 if there are no values.
+    """
+    if not values:
+        return 0.0
+    rank = max(int(-(-pct * len(values) // 100)), 1)
+    return values[rank-1]
+
+
+#The Metrics every download in the process reports to.
+metrics = Metrics()
@@ -0,0 +1,224 @@
+import os
+import csv
+import json
+import bisect
+import datetime
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from _frame import TrendFrame
+
+#Suffix of the index file kept next to a csv file.
+INDEX_EXTENSION = ".idx"
+#Rows between two entries of the index.
+STRIDE = 256
+
+class TrendReader(object):
+    """
+    Reads date ranges and columns out of a csv file saved by collectTrends(),
+    without parsing the rest of the file.
+
+    The rows of a saved file are in date order, so a sparse index of the byte
+    offset of every STRIDE'th row is enough to seek close to any date. The
+    index is built on the first read and kept in a small file next to the
+    csv (path + ".idx"), and is rebuilt whenever the csv has changed since.
+    If the index file cannot be written, it is only kept in memory.
+
+    Rows before the requested range are skipped by comparing their date
+    text, and only the requested columns are converted to float.
+    """
+
+    def __init__(self, path, stride=STRIDE, index=True):
+        """
+        Args:
+            path: A string for the path of a csv file saved by collectTrends().
+            stride: The number of rows between two entries of the index.
+            index: False to keep the index in memory only, without an index
+                file.
+        """
+        self.path = path
+        self.stride = stride
+        self.index_path = path + INDEX_EXTENSION if index else None
+        self._index = None
+
+    @property
+    def header(self):
+        """The header line of the file, as saved."""
+        return self._load()["header"]
+
+    @property
+    def terms(self):
+        """
+        The names of the value columns. Summed data has a single column, named
+        after all of its terms joined by spaces, as in TrendFrame.
+        """
+        index = self._load()
+        if index["columns"] != len(index["header"]) - 1:
+            return [" ".join(index["header"][1:])]
+        return index["header"][1:]
+
+    def __len__(self):
+        return self._load()["rows"]
+
+    def __repr__(self):
+        return "TrendReader(%r)" % self.path
+
+    def rows(self, startDt=None, endDt=None, terms=None):
+        """
+        Yields (datetime, [values]) for every row in [startDt, endDt), reading
+        the file only from the nearest indexed row before startDt, and up to
+        the first row past endDt.
+
+        Args:
+            startDt: A datetime object for the first date, or None to start
+                from the first row.
+            endDt: A datetime object for the end of the range (exclusive), or
+                None to read to the last row.
+            terms: A list of the terms whose values are yielded, in that
+                order, or None for every column.
+        """
+        index = self._load()
+        cols = self._columns(terms)
+        start = _text(startDt)
+        end = _text(endDt)
+
+        offset = index["start"]
+        if start is not None:
+            i = bisect.bisect_right(index["dates"], start) - 1
+            if i >= 0:
+                offset = index["offsets"][i]
+
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                fields = line.decode("utf-8").rstrip("\r\n").split(",")
+                date = fields[0]
+                if not date:
+                    continue
+                if start is not None and date < start:
+                    continue
+                if end is not None and date >= end:
+                    break
+                if cols is None:
+                    values = [float(value) for value in fields[1:]]
+                else:
+                    values = [float(fields[j]) for j in cols]
+                yield _parse(date), values
+
+    def read(self, startDt=None, endDt=None, terms=None):
+        """
+        Returns the rows in [startDt, endDt) in the list format of
+        collectTrends(), header included. See rows() for the arguments.
+        """
+        header = self.header if terms is None else ["date"] + list(terms)
+        data = [header]
+        for dt, values in self.rows(startDt, endDt, terms):
+            data.append([dt] + values)
+        return data
+
+    def frame(self, startDt=None, endDt=None, terms=None):
+        """
+        Returns the rows in [startDt, endDt) as a TrendFrame. NumPy must be
+        installed.
+        """
+        dates = []
+        values = []
+        for dt, line in self.rows(startDt, endDt, terms):
+            dates.append(dt)
+            values.append(line)
+        names = self.terms if terms is None else list(terms)
+        if np is None:
+            raise ImportError("TrendFrame requires NumPy to be installed")
+        return TrendFrame(dates, np.array(values, dtype=np.float64).reshape(len(dates), len(names)),
+                          names)
+
+    def _columns(self, terms):
+        if terms is None:
+            return None
+        names = self.terms
+        cols = []
+        for term in terms:
+            if term not in names:
+                raise KeyError(term)
+            cols.append(names.index(term) + 1)
+        return cols
+
+    def _load(self):
+        """Returns the index, reading or building it if it is missing or stale."""
+        st = os.stat(self.path)
+        stamp = [st.st_size, st.st_mtime]
+        if self._index is not None and self._index["stamp"] == stamp:
+            return self._index
+
+        index = None
+        if self.index_path is not None:
+            try:
+                with open(self.index_path) as f:
+                    index = json.load(f)
+            except (IOError, OSError, ValueError):
+                index = None
+            if index is not None and (index.get("stamp") != stamp or
+                                      index.get("stride") != self.stride or
+                                      not self._matches(index)):
+                index = None
+
+        if index is None:
+            index = self._build(stamp)
+            if self.index_path is not None:
+                try:
+                    tmp = self.index_path + ".tmp"
+                    with open(tmp, "w") as f:
+                        json.dump(index, f)
+                    getattr(os, "replace", os.rename)(tmp, self.index_path)
+                except (IOError, OSError):
+                    pass
+        self._index = index
+        return index
+
+    def _build(self, stamp):
+        """Scans the whole file once for the offset of every stride'th row."""
+        dates = []
+        offsets = []
+        rows = 0
+        columns = 0
+        with open(self.path, "rb") as f:
+            first = f.readline()
+            header = next(csv.reader([first.decode("utf-8")]))
+            offset = start = len(first)
+            for line in f:
+                fields = line.split(b",", 1)
+                if fields[0].strip():
+                    if rows % self.stride == 0:
+                        dates.append(fields[0].decode("ascii"))
+                        offsets.append(offset)
+                    if rows == 0:
+                        columns = line.count(b",")
+                    rows += 1
+                offset += len(line)
+        return {"stamp": stamp, "stride": self.stride, "header": header, "rows": rows,
+                "columns": columns, "start": start, "dates": dates, "offsets": offsets}
+
+    def _matches(self, index):
+        """
+        Checks that the last indexed row is where the index says, in case the
+        file was rewritten within the resolution of its mtime.
+        """
+        if not index["offsets"]:
+            return True
+        with open(self.path, "rb") as f:
+            f.seek(index["offsets"][-1])
+            return f.readline().split(b",", 1)[0].decode("ascii", "replace") == index["dates"][-1]
+
+
+
+
+def _text(dt):
+    if dt is None:
+        return None
+    return "%04d-%02d-%02d" % (dt.year, dt.month, dt.day)
+
+
+def _parse(text):
+    return datetime.datetime(int(text[0:4]), int(text[5:7]), int(text[8:10]))
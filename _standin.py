@@ -0,0 +1,299 @@
+"""
+A local stand-in for the parts of Google used by gtrends: the login pages and
+the trendsReport csv export. The data is synthetic, but deterministic, and
+formatted like Google's, so that the whole download path can be tested and
+benchmarked offline.
+
+Run it on its own with:
+
+    python _standin.py [port [latency [jitter [errorRate]]]]
+
+and point gtrends at it with:
+
+    gtrends.sessionPool.setTransport(lambda: HttpTransport("http://127.0.0.1:port"))
+"""
+import sys
+import math
+import time
+import zlib
+import random
+import datetime
+import threading
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+try:
+    import urllib.parse as urlparse
+except ImportError:
+    import urlparse
+
+from _transport import HttpTransport
+
+GEOS = {"": "Worldwide", "US": "United States", "GB": "United Kingdom",
+        "DE": "Germany", "FR": "France", "IT": "Italy", "ES": "Spain",
+        "JP": "Japan", "BR": "Brazil", "IN": "India"}
+CATS = {"0-7": "Finance", "0-71": "Food & Drink", "0-20": "Sports"}
+GPROPS = {"": "Web", "images": "Image", "news": "News", "froogle": "Product",
+          "youtube": "YouTube"}
+REGIONS = ["California", "Texas", "New York", "Lombardy", "Bavaria", "Ontario",
+           "Kanto", "Sao Paulo", "Maharashtra", "Catalonia"]
+SIGNED_OUT = "You must be signed in to export data from Google Trends"
+LOGIN_PAGE = ('<html><body><form action="/ServiceLoginBoxAuth" method="post">'
+              '<input type="hidden"  name="GALX"  value="standin-galx">'
+              '</form></body></html>')
+
+class StandInServer(object):
+    """
+    Serves the stand-in on a background thread.
+
+    Example:
+        server = StandInServer()
+        server.start()
+        gtrends.sessionPool.setTransport(server.transport)
+        ...
+        server.stop()
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, username=None, password=None,
+                 latency=0.0, jitter=0.0, errorRate=0.0, seed=0):
+        """
+        Args:
+            host: The address to listen on.
+            port: The port to listen on. 0 picks a free one.
+            username: If given with password, the only login accepted.
+                Otherwise any login is accepted.
+            password: See username.
+            latency: Seconds every response is delayed by.
+            jitter: Up to this many more seconds, picked at random, are added
+                to the delay of each response.
+            errorRate: The fraction of report requests answered with a 429
+                "Too Many Requests" error, as Google does when throttling.
+            seed: Seeds the jitter and errors, so runs can be repeated.
+        """
+        self.username = username
+        self.password = password
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = errorRate
+        self.requests = 0
+        self.logins = 0
+        self.errors = 0
+        self.connections = 0
+        self.compressed = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.httpd = _ThreadingServer((host, port), _Handler)
+        self.httpd.standin = self
+        self.url = "http://%s:%d" % self.httpd.server_address[:2]
+        self._thread = None
+
+    def start(self):
+        """Starts serving in a daemon thread."""
+        #a short poll interval, so that stop() returns quickly.
+        self._thread = threading.Thread(target=self.httpd.serve_forever, args=(0.05,))
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops serving and closes the socket."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self._thread.join()
+
+    def transport(self):
+        """Returns a new HttpTransport sending its requests to this server."""
+        return HttpTransport(self.url)
+
+    def _count(self, login=False, report=False):
+        """
+        Counts a request, and returns whether to fail it and how long to
+        delay it. Only report requests are failed.
+        """
+        with self._lock:
+            self.requests += 1
+            if login:
+                self.logins += 1
+            delay = self.latency + self.jitter*self._random.random()
+            fail = self._random.random() < self.error_rate and report
+            if fail:
+                self.errors += 1
+        return fail, delay
+
+
+
+
+class _ThreadingServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    #keeps connections open between requests, as Google does.
+    protocol_version = "HTTP/1.1"
+    #the headers and body are sent separately, which would otherwise wait
+    #for the client's delayed ACK on a kept connection.
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        with self.server.standin._lock:
+            self.server.standin.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server.standin
+        path, query = self._split()
+        fail, delay = server._count(report=path == "/trends/trendsReport")
+        time.sleep(delay)
+        if path == "/ServiceLoginBoxAuth":
+            self._send(LOGIN_PAGE, "text/html")
+        elif path == "/trends/trendsReport":
+            if fail:
+                self._send("Too Many Requests", status=429)
+                return
+            if "SID=" not in (self.headers.get("Cookie") or ""):
+                self._send(SIGNED_OUT)
+                return
+            try:
+                body = report(dict(urlparse.parse_qsl(query)))
+            except (KeyError, ValueError):
+                self._send("Bad request", status=400)
+                return
+            self._send(body, "text/csv")
+        else:
+            #CheckCookie, the PrefCookie page, and anything else.
+            self._send("OK", "text/html")
+
+    def do_POST(self):
+        server = self.server.standin
+        fail, delay = server._count(login=True)
+        time.sleep(delay)
+        length = int(self.headers.get("Content-Length") or 0)
+        form = dict(urlparse.parse_qsl(self.rfile.read(length).decode("utf-8")))
+        accepted = server.username is None or (form.get("Email") == server.username
+                                                and form.get("Passwd") == server.password)
+        cookie = None
+        if accepted and form.get("GALX") == "standin-galx":
+            cookie = "SID=standin-%08x; Path=/" % (zlib.crc32(form.get("Email", "").encode("utf-8")) & 0xffffffff)
+        self._send("OK", "text/html", cookie=cookie)
+
+    def _split(self):
+        parts = urlparse.urlsplit(self.path)
+        return parts.path, parts.query
+
+    def _send(self, body, contentType="text/plain", status=200, cookie=None):
+        body = body.encode("utf-8")
+        gzip = "gzip" in (self.headers.get("Accept-Encoding") or "")
+        if gzip:
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            body = compressor.compress(body) + compressor.flush()
+            with self.server.standin._lock:
+                self.server.standin.compressed += 1
+        self.send_response(status)
+        self.send_header("Content-Type", contentType+"; charset=utf-8")
+        if gzip:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        if cookie is not None:
+            self.send_header("Set-Cookie", cookie)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+
+
+def report(params):
+    """
+    Returns the csv export for the query parameters of a trendsReport url.
+    Windows of up to 3 months are daily, longer ones weekly, like on Google.
+    """
+    terms = [term for term in params["q"].split(",") if term]
+    if not terms:
+        raise ValueError("No terms")
+    geo = params.get("geo", "")
+    cat = params.get("cat", "")
+    gprop = params.get("gprop", "")
+    start, length = params["date"].split()
+    month, year = start.split("/")
+    startDt = datetime.date(int(year), int(month), 1)
+    months = int(length.rstrip("m"))
+    endMonth = startDt.month - 1 + months
+    endDt = datetime.date(startDt.year + endMonth // 12, endMonth % 12 + 1, 1)
+    weekly = months > 3
+
+    dates = []
+    if weekly:
+        #weeks run from Sunday to Saturday.
+        dt = startDt - datetime.timedelta(days=(startDt.weekday()+1) % 7)
+        step = datetime.timedelta(days=7)
+    else:
+        dt = startDt
+        step = datetime.timedelta(days=1)
+    while dt < endDt:
+        dates.append(dt)
+        dt += step
+
+    #like Google, scale so the largest value in the file is 100.
+    levels = [[_level(term, geo, cat, gprop, dt) for term in terms] for dt in dates]
+    maxVal = max(max(line) for line in levels)
+
+    place = GEOS.get(geo, geo)
+    if cat:
+        place += "; " + CATS.get(cat, cat)
+    lines = [GPROPS.get(gprop, gprop) + " Search interest: " + ", ".join(terms),
+             place + "; " + startDt.strftime("%b %Y") + " - " + endDt.strftime("%b %Y"),
+             "",
+             "Interest over time",
+             ("Week," if weekly else "Day,") + ",".join(terms)]
+    for dt, line in zip(dates, levels):
+        if weekly:
+            label = dt.isoformat() + " - " + (dt + datetime.timedelta(days=6)).isoformat()
+        else:
+            label = dt.isoformat()
+        lines.append(label + "," + ",".join(str(int(round(100*v/maxVal))) for v in line))
+
+    for term in terms:
+        lines += ["", "Top regions for " + term, "", "Region," + term]
+        for i in range(5):
+            region = REGIONS[(_hash(term) + i) % len(REGIONS)]
+            lines.append(region + "," + str(100 - 15*i))
+    for term in terms:
+        lines += ["", "Top searches for " + term]
+        for i, suffix in enumerate(["recipe", "near me", "price", "definition"]):
+            lines.append(term + " " + suffix + "," + str(100 - 20*i))
+        lines += ["", "Rising searches for " + term, term + " news,Breakout"]
+    lines.append("")
+    return "\n".join(lines)
+
+
+def _hash(text):
+    return zlib.crc32(text.encode("utf-8")) & 0xffffffff
+
+
+def _level(term, geo, cat, gprop, dt):
+    """A smooth, always positive level with weekly and yearly cycles and a trend."""
+    seed = _hash(term + "|" + geo + "|" + cat + "|" + gprop)
+    base = 1 + seed % 97
+    day = dt.toordinal()
+    phase = (seed >> 8) % 360
+    return base * (2.0 + math.sin(2*math.pi*day/7 + phase) * 0.3
+                   + math.sin(2*math.pi*day/365.25 + phase) * 0.6
+                   + (day - 731947) / 3000.0)
+
+
+if __name__ == "__main__":
+    args = [float(arg) for arg in sys.argv[1:]]
+    port = int(args[0]) if args else 8000
+    server = StandInServer(port=port, latency=(args[1:2] or [0.0])[0],
+                           jitter=(args[2:3] or [0.0])[0], errorRate=(args[3:4] or [0.0])[0])
+    print("Serving the Google Trends stand-in at " + server.url)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
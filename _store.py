@@ -0,0 +1,223 @@
+"""
+A binary file format for trend data which can be mapped into memory without
+parsing or copying, and to which new dates can be appended in place.
+
+Layout, all little-endian:
+
+    magic     8 bytes, b"GTRSTORE"
+    version   uint32
+    jsonSize  uint32, the size of the json header
+    rows      uint64, the number of dates written
+    capacity  uint64, the number of dates there is room for
+    json      {"terms": [...], "params": {...}}, padded to 64 bytes
+    dates     int64[capacity], days since 1970-01-01
+    values    float64[capacity, len(terms)], row by row
+
+Rows past `rows` are unused room for appending. `rows` is only raised once
+the new rows are written, so readers never see half-written dates.
+"""
+import os
+import json
+import struct
+import datetime
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from _frame import TrendFrame
+
+EXTENSION = ".gtr"
+MAGIC = b"GTRSTORE"
+VERSION = 1
+_HEAD = struct.Struct("<8sIIQQ")
+_ROWS = 16      #offset of rows in the header
+_ALIGN = 64
+
+class TrendStore(object):
+    """
+    Trend data in a file of the format above, mapped into memory.
+
+    dates and values are numpy memmaps of the rows written so far, so
+    opening a store reads nothing but its header, and only the pages used
+    are loaded. NumPy must be installed to use it.
+    """
+
+    def __init__(self, path, mode="r"):
+        """
+        Args:
+            path: A string for the file path of the store.
+            mode: "r" to read, or "r+" to also append.
+        """
+        if np is None:
+            raise ImportError("TrendStore requires NumPy to be installed")
+        if mode not in ("r", "r+"):
+            raise ValueError("mode must be 'r' or 'r+', not "+str(mode))
+        self.path = path
+        self.mode = mode
+        self._map()
+
+    @classmethod
+    def create(cls, path, dates, values, terms, params=None, capacity=None):
+        """
+        Writes a new store, replacing any file at path, and returns it opened
+        for appending.
+
+        Args:
+            path: A string for the file path.
+            dates: A sequence of datetime objects (or a datetime64 array), in
+                ascending order.
+            values: Anything convertible to a float64 array with one row per
+                date and one column per term.
+            terms: A sequence of strings naming the columns.
+            params: A dict of the query parameters (geo, granularity, etc.)
+                to keep in the header. Must be serializable to json.
+            capacity: The number of dates to make room for. By default a
+                quarter more than given, and at least 64.
+        """
+        if np is None:
+            raise ImportError("TrendStore requires NumPy to be installed")
+        days = _days(dates)
+        values = np.asarray(values, dtype=np.float64).reshape(len(days), len(terms))
+        if capacity is None:
+            capacity = max(64, len(days) + len(days) // 4)
+        _write(path, days, values, list(terms), params or {}, max(capacity, len(days), 1))
+        return cls(path, "r+")
+
+    def __len__(self):
+        return self.rows
+
+    def __repr__(self):
+        return "TrendStore(%r, %d dates x %d terms)" % (self.path, self.rows, len(self.terms))
+
+    def frame(self):
+        """Returns a TrendFrame of the data, sharing memory with the file."""
+        return TrendFrame(self.dates, self.values, self.terms)
+
+    def toList(self):
+        """Returns the data in the list format of collectTrends(), header included."""
+        return self.frame().toList()
+
+    def append(self, dates, values):
+        """
+        Adds rows after the last date. The file grows in place while there is
+        room, and is otherwise rewritten with twice the room (arrays taken
+        from the store before then keep the old data).
+
+        Args:
+            dates: A sequence of datetime objects after the last date, in
+                ascending order.
+            values: One row per date and one column per term.
+        """
+        if self.mode != "r+":
+            raise IOError("TrendStore was not opened for appending")
+        days = _days(dates)
+        values = np.asarray(values, dtype=np.float64).reshape(len(days), len(self.terms))
+        if not len(days):
+            return
+        if (self.rows and days[0] <= self._days[self.rows-1]) or np.any(np.diff(days) <= 0):
+            raise ValueError("appended dates must come after the last date, in ascending order")
+
+        rows = self.rows + len(days)
+        if rows > self.capacity:
+            #no room left: rewrite the file with room for as many more rows.
+            allDays = np.concatenate([self._days[:self.rows], days])
+            allValues = np.concatenate([self._values[:self.rows], values])
+            self._close()
+            _write(self.path, allDays, allValues, self.terms, self.params,
+                   max(2*self.capacity, rows))
+            self._map()
+            return
+
+        self._days[self.rows:rows] = days
+        self._values[self.rows:rows] = values
+        self._days.flush()
+        self._values.flush()
+        with open(self.path, "r+b") as f:
+            f.seek(_ROWS)
+            f.write(struct.pack("<Q", rows))
+        self._setRows(rows)
+
+    def close(self):
+        """
+        Lets go of the file. It is unmapped once no arrays taken from the
+        store (such as those of its frames) are left.
+        """
+        self._close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, exc, tb):
+        self.close()
+        return False
+
+    def _map(self):
+        with open(self.path, "rb") as f:
+            magic, version, jsonSize, rows, capacity = _HEAD.unpack(f.read(_HEAD.size))
+            if magic != MAGIC:
+                raise ValueError(self.path+" is not a trend store")
+            if version > VERSION:
+                raise ValueError(self.path+" was written by a later version of gtrends")
+            header = json.loads(f.read(jsonSize).decode("utf-8"))
+        self.terms = header["terms"]
+        self.params = header["params"]
+        self.capacity = capacity
+        offset = _dataOffset(jsonSize)
+        self._days = np.memmap(self.path, dtype="<M8[D]", mode=self.mode,
+                               offset=offset, shape=(capacity,))
+        self._values = np.memmap(self.path, dtype="<f8", mode=self.mode,
+                                 offset=offset + 8*capacity, shape=(capacity, len(self.terms)))
+        self._setRows(rows)
+
+    def _setRows(self, rows):
+        self.rows = rows
+        self.dates = self._days[:rows]
+        self.values = self._values[:rows]
+
+    def _close(self):
+        #closing the maps themselves would break views still in use.
+        self._days = self._values = self.dates = self.values = None
+
+
+
+
+def save(path, dates, values, terms, params=None):
+    """Writes a new store without keeping it open."""
+    TrendStore.create(path, dates, values, terms, params).close()
+
+
+def isStore(path):
+    """Tells whether path names a store, by its extension."""
+    return os.path.splitext(path)[1].lower() == EXTENSION
+
+
+def _write(path, days, values, terms, params, capacity):
+    """Writes a whole store to a temporary file, then moves it to path."""
+    header = json.dumps({"terms": terms, "params": params}, sort_keys=True).encode("utf-8")
+    offset = _dataOffset(len(header))
+    dates = np.zeros(capacity, dtype="datetime64[D]")
+    dates[:len(days)] = days
+    matrix = np.zeros((capacity, len(terms)), dtype=np.float64)
+    matrix[:len(days)] = values
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEAD.pack(MAGIC, VERSION, len(header), len(days), capacity))
+        f.write(header)
+        f.write(b"\0" * (offset - _HEAD.size - len(header)))
+        f.write(dates.astype("<i8").tobytes())
+        f.write(matrix.astype("<f8").tobytes())
+    getattr(os, "replace", os.rename)(tmp, path)
+
+
+def _dataOffset(jsonSize):
+    end = _HEAD.size + jsonSize
+    return (end + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _days(dates):
+    if isinstance(dates, np.ndarray) and dates.dtype.kind == "M":
+        return dates.astype("datetime64[D]")
+    return np.array([datetime.date(dt.year, dt.month, dt.day) for dt in dates],
+                    dtype="datetime64[D]")
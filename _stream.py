@@ -0,0 +1,160 @@
+import os
+import csv
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import _store
+
+#Rows rescaled at a time when normalizing a TrendStore in place.
+_CHUNK = 65536
+
+class TrendSink(object):
+    """
+    Writes levels to a file as they are chained, for collectTrendsStream().
+
+    Rows are given in date order with add(), and written at once, apart from
+    the last one, so that they can be trimmed at endDt the same way as by
+    collectTrends(): the rows from the first date in endDt's month onwards
+    are dropped, or else the very last row. The largest value of every row,
+    trimmed or not, is kept for normalizing.
+
+    With normalize=True, a csv file is first written to path + ".levels",
+    and close() rewrites it to path with the values normalized to [0, 100].
+    A ".gtr" path is written directly and rescaled in place, a chunk at a
+    time. Either way, only the rows of one add() are held in memory.
+    """
+
+    def __init__(self, path, header, endDt, params=None, normalize=True):
+        """
+        Args:
+            path: A string for the file path of the output, csv or ".gtr".
+            header: The header line of the data, as from _addHeader.
+            endDt: The end date given to collectTrendsStream().
+            params: The query parameters kept in a TrendStore's header.
+            normalize: False to keep the chained levels as they are.
+        """
+        self.path = path
+        self.header = header
+        self.end = (endDt.year, endDt.month)
+        self.params = params
+        self.normalize = normalize
+        self.rows = 0
+        self.max_value = 0.0
+        self.store = _store.isStore(path)
+        self._held = None
+        self._done = False
+        self._file = None
+        self._writer = None
+        self._trendStore = None
+        self._created = []
+        if not self.store:
+            self._open(path + ".levels" if normalize else path)
+
+    def add(self, rows):
+        """Writes rows of [datetime, level, ...], after any given before."""
+        out = []
+        for line in rows:
+            for j in range(1, len(line)):
+                if line[j] > self.max_value:
+                    self.max_value = line[j]
+            if self._done:
+                continue
+            if self._held is not None:
+                out.append(self._held)
+                self._held = None
+            if (line[0].year, line[0].month) == self.end:
+                self._done = True
+                continue
+            self._held = line
+        if out:
+            self._write(out)
+
+    def close(self):
+        """
+        Drops the held back row, normalizes the output if asked to, and
+        returns the number of rows written.
+        """
+        self._held = None
+        if self.store:
+            if self._trendStore is None:
+                _store.save(self.path, [], [], self.header[1:], self.params)
+            elif self.normalize:
+                self._rescaleStore()
+            self._trendStore = None
+        else:
+            self._file.close()
+            if self.normalize:
+                self._rescaleCsv()
+        return self.rows
+
+    def abort(self):
+        """Closes and removes whatever was written so far."""
+        if self._file is not None:
+            self._file.close()
+        self._trendStore = None
+        for path in self._created:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _open(self, path):
+        self._created.append(path)
+        try:
+            self._file = open(path, "w", newline="")
+        except TypeError:   #Py2 has no newline argument, and needs "wb"
+            self._file = open(path, "wb")
+        self._writer = csv.writer(self._file, delimiter=",")
+        self._writer.writerow(self.header)
+
+    def _write(self, lines):
+        self.rows += len(lines)
+        if not self.store:
+            for line in lines:
+                #repr keeps every digit of the levels, also on Py2.
+                self._writer.writerow([line[0].strftime("%Y-%m-%d")] +
+                                      [repr(value) for value in line[1:]])
+            return
+
+        dates = [line[0] for line in lines]
+        values = [line[1:] for line in lines]
+        if self._trendStore is None:
+            #summed data only has one column, but the header lists every term.
+            terms = self.header[1:] if len(lines[0]) == len(self.header) else \
+                [" ".join(self.header[1:])]
+            self._created.append(self.path)
+            self._trendStore = _store.TrendStore.create(self.path, dates, values, terms,
+                                                        self.params)
+        else:
+            self._trendStore.append(dates, values)
+
+    def _rescaleCsv(self):
+        """Rewrites the levels file to path, normalized as by _normalize."""
+        maxVal = self.max_value or 1.0
+        levels = self.path + ".levels"
+        source = open(levels)
+        reader = csv.reader(source, delimiter=",")
+        self._open(self.path)
+        next(reader)
+        for line in reader:
+            newLine = [line[0]]
+            for value in line[1:]:
+                norm = float(value)*100
+                norm /= maxVal
+                newLine.append(round(norm, 3))
+            self._writer.writerow(newLine)
+        self._file.close()
+        source.close()
+        os.remove(levels)
+
+    def _rescaleStore(self):
+        """
+        Normalizes the store in place. Values can differ by 0.001 from
+        _normalize where they fall right on a rounding boundary.
+        """
+        maxVal = self.max_value or 1.0
+        values = self._trendStore.values
+        for start in range(0, len(values), _CHUNK):
+            chunk = values[start:start+_CHUNK]
+            chunk[:] = np.round(chunk*100/maxVal, 3)
+        self._trendStore._values.flush()
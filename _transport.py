@@ -0,0 +1,327 @@
+import io
+import os
+import zlib
+import socket
+import hashlib
+import threading
+import six
+from six.moves import http_client
+from six.moves.urllib.request import proxy_bypass
+try:
+    import urllib.request as urllib2
+except ImportError:
+    import urllib2
+try:
+    import urllib.parse as urlparse
+except ImportError:
+    import urlparse
+
+#Statuses after which a request is sent again to the Location given.
+REDIRECTS = (301, 302, 303, 307, 308)
+
+class Transport(object):
+    """
+    Sends the requests of a Downloader.
+
+    Subclasses implement open(). A transport is used by a single Downloader,
+    which calls prepare() once before its first request.
+    """
+
+    def prepare(self, cookieJar, headers):
+        """
+        Receives the Downloader's cookie jar and the headers to send with
+        every request.
+        """
+        pass
+
+    def open(self, url, data=None):
+        """
+        Sends a GET request, or a POST of the encoded form data if given, and
+        returns the body of the response as bytes.
+        """
+        raise NotImplementedError
+
+
+
+
+class HttpTransport(Transport):
+    """
+    Sends requests over the network, keeping connections open between
+    requests (HTTP keep-alive) and asking for gzip-compressed responses.
+
+    Every window and segment of a job goes to the same host, so after the
+    first few requests no more TCP or TLS handshakes are needed. Up to
+    `connections` idle connections are kept per host; threads sharing the
+    transport each take one, or open a new one if none is idle. A kept
+    connection which the server has closed in the meantime is replaced
+    transparently. Compressed responses are decoded before being returned.
+
+    Proxies set in the environment (http_proxy, https_proxy) are used as by
+    urllib. stats() tells how many connections were opened and reused.
+    """
+
+    def __init__(self, host=None, connections=8, compress=True, timeout=60):
+        """
+        Args:
+            host: A string such as "http://127.0.0.1:8000". If given, it
+                replaces the scheme and host of every url, so that requests go
+                to a stand-in server instead of Google.
+            connections: The most idle connections kept open per host.
+            compress: False to ask for uncompressed responses.
+            timeout: Seconds to wait for a connection or a response.
+        """
+        self.host = host
+        self.connections = connections
+        self.compress = compress
+        self.timeout = timeout
+        self.cj = None
+        self.headers = []
+        self.requests = 0
+        self.opened = 0
+        self.reused = 0
+        self.wire_bytes = 0
+        self.body_bytes = 0
+        self._idle = {}
+        self._proxies = urllib2.getproxies()
+        self._lock = threading.Lock()
+
+    def prepare(self, cookieJar, headers):
+        self.cj = cookieJar
+        self.headers = headers
+
+    def open(self, url, data=None):
+        """
+        Sends a GET request, or a POST of the encoded form data if given,
+        following redirects, and returns the body of the response as bytes.
+        Raises HTTPError for error statuses, like urllib.
+        """
+        url = self._rewrite(url)
+        for i in range(10):
+            request = urllib2.Request(url, data, dict(self.headers))
+            if self.compress:
+                request.add_header("Accept-encoding", "gzip")
+            self.cj.add_cookie_header(request)
+            status, reason, headers, body = self._send(request)
+            self.cj.extract_cookies(_Response(url, headers), request)
+            if status in REDIRECTS and headers.get("Location"):
+                url = self._rewrite(urlparse.urljoin(url, headers.get("Location")))
+                if status in (301, 302, 303):
+                    data = None
+                continue
+            if status >= 400:
+                raise urllib2.HTTPError(url, status, reason, headers, io.BytesIO(body))
+            return body
+        raise urllib2.HTTPError(url, status, "Too many redirects", headers, io.BytesIO(body))
+
+    def stats(self):
+        """
+        Returns a dict of the number of requests sent, connections opened and
+        reused, idle connections and the most kept, and the bytes received
+        before and after decompression.
+        """
+        with self._lock:
+            return {"requests": self.requests, "opened": self.opened,
+                    "reused": self.reused,
+                    "idle": sum(len(idle) for idle in self._idle.values()),
+                    "poolSize": self.connections, "wireBytes": self.wire_bytes,
+                    "bodyBytes": self.body_bytes}
+
+    def close(self):
+        """Closes the idle connections."""
+        with self._lock:
+            idle = self._idle
+            self._idle = {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+    def _send(self, request):
+        url = request.get_full_url()
+        parts = urlparse.urlsplit(url)
+        https = parts.scheme == "https"
+        port = parts.port or (443 if https else 80)
+        key = (parts.scheme, parts.hostname, port)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        proxy = self._proxies.get(parts.scheme)
+        if proxy and proxy_bypass(parts.hostname):
+            #hosts in no_proxy are connected to directly, as by urllib.
+            proxy = None
+        if proxy and not https:
+            #plain http goes to the proxy with the whole url.
+            path = url
+        headers = dict(request.header_items())
+
+        #a kept connection may have been closed by the server since.
+        for reused in (True, False):
+            conn = self._take(key) if reused else None
+            if reused and conn is None:
+                continue
+            if conn is None:
+                conn = self._connect(parts.hostname, port, https, proxy)
+            try:
+                conn.request(request.get_method(), path, request.data, headers)
+                resp = conn.getresponse()
+                body = resp.read()
+            except (http_client.HTTPException, socket.error):
+                conn.close()
+                if reused:
+                    continue
+                raise
+            with self._lock:
+                self.requests += 1
+                if reused:
+                    self.reused += 1
+                self.wire_bytes += len(body)
+            if resp.will_close:
+                conn.close()
+            else:
+                self._give(key, conn)
+            body = _decode(body, resp.getheader("Content-Encoding"))
+            with self._lock:
+                self.body_bytes += len(body)
+            return resp.status, resp.reason, resp.msg, body
+
+    def _connect(self, hostname, port, https, proxy):
+        with self._lock:
+            self.opened += 1
+        if proxy:
+            parts = urlparse.urlsplit(proxy)
+            conn = _connection(https, parts.hostname, parts.port or 80, self.timeout)
+            if https:
+                conn.set_tunnel(hostname, port)
+            return conn
+        return _connection(https, hostname, port, self.timeout)
+
+    def _take(self, key):
+        with self._lock:
+            idle = self._idle.get(key)
+            return idle.pop() if idle else None
+
+    def _give(self, key, conn):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.connections:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def _rewrite(self, url):
+        if self.host is None:
+            return url
+        parts = urlparse.urlsplit(url)
+        host = urlparse.urlsplit(self.host)
+        return urlparse.urlunsplit((host.scheme, host.netloc) + tuple(parts[2:]))
+
+
+
+
+class RecordingTransport(Transport):
+    """
+    Passes requests on to another transport, and saves every response to a
+    directory for ReplayTransport.
+
+    Responses are looked up by method and url only, so that the login form
+    data (and the password in it) doesn't need to match on replay. Keep in
+    mind that the login responses are saved too.
+    """
+
+    def __init__(self, path, inner=None):
+        """
+        Args:
+            path: A string for the directory to save responses in. It is
+                created if it does not exist.
+            inner: The transport which actually sends the requests. Defaults
+                to an HttpTransport.
+        """
+        self.path = path
+        self.inner = inner if inner is not None else HttpTransport()
+        self._lock = threading.Lock()
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    def prepare(self, cookieJar, headers):
+        self.inner.prepare(cookieJar, headers)
+
+    def open(self, url, data=None):
+        body = self.inner.open(url, data)
+        name = _recordingFile(self.path, url, data)
+        with self._lock:
+            with open(name, "wb") as f:
+                f.write(_toBytes(url) + b"\n" + body)
+        return body
+
+
+
+
+class ReplayTransport(Transport):
+    """
+    Answers requests with the responses saved by a RecordingTransport, without
+    touching the network. Raises IOError for requests that were not recorded.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path: A string for the directory the responses were saved in.
+        """
+        self.path = path
+
+    def open(self, url, data=None):
+        name = _recordingFile(self.path, url, data)
+        try:
+            with open(name, "rb") as f:
+                f.readline()    #the url, for people browsing the directory
+                return f.read()
+        except (IOError, OSError):
+            raise IOError("No recorded response for "+url)
+
+
+
+
+def _recordingFile(path, url, data):
+    method = b"GET " if data is None else b"POST "
+    key = hashlib.sha1(method + _toBytes(url)).hexdigest()
+    return os.path.join(path, key)
+
+
+def _toBytes(text):
+    if isinstance(text, six.text_type):
+        return text.encode("utf-8")
+    return text
+
+
+def _connection(https, hostname, port, timeout):
+    if https:
+        return http_client.HTTPSConnection(hostname, port, timeout=timeout)
+    return http_client.HTTPConnection(hostname, port, timeout=timeout)
+
+
+def _decode(body, encoding):
+    """Decompresses a body sent with the given Content-Encoding."""
+    encoding = (encoding or "").lower()
+    if encoding == "gzip":
+        return zlib.decompress(body, 16 + zlib.MAX_WBITS)
+    if encoding == "deflate":
+        try:
+            return zlib.decompress(body)
+        except zlib.error:  #raw deflate, without the zlib header
+            return zlib.decompress(body, -zlib.MAX_WBITS)
+    return body
+
+
+
+
+class _Response(object):
+    """The parts of a urllib response a CookieJar reads cookies from."""
+
+    def __init__(self, url, headers):
+        self.url = url
+        self.headers = headers
+
+    def info(self):
+        return self.headers
+
+    def geturl(self):
+        return self.url
@@ -0,0 +1,188 @@
+"""
+Load benchmarks for the whole collectTrends path (download, _prepTrends and
+stitching), run against the local stand-in server in _standin.py.
+
+    python benchmark.py [--quick] [--latency 0.05] [--jitter 0.02]
+                        [--error-rate 0.0] [--rate N] [--jobs 5] [--label NAME]
+
+Each scenario runs in its own process, so its peak RSS is its own. The
+results are appended to benchmarks.jsonl (see --output), and every scenario
+is compared with its last result under a different label, so that
+regressions between versions show up.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import datetime
+import subprocess
+
+#(name, number of terms, years, granularity, workers, engine)
+SCENARIOS = [
+    ("d-1term-1y-serial", 1, 1, "d", 1, "python"),
+    ("d-1term-1y-8workers", 1, 1, "d", 8, "python"),
+    ("d-12terms-1y-8workers", 12, 1, "d", 8, "python"),
+    ("d-12terms-1y-8workers-numpy", 12, 1, "d", 8, "numpy"),
+    ("d-4terms-5y-16workers", 4, 5, "d", 16, "python"),
+    ("w-4terms-10y-serial", 4, 10, "w", 1, "python"),
+    ("w-40terms-10y-8workers", 40, 10, "w", 8, "python"),
+]
+QUICK = ["d-1term-1y-8workers", "d-12terms-1y-8workers", "w-4terms-10y-serial"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n\n")[0])
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="seconds the stand-in delays each response (default 0.05)")
+    parser.add_argument("--jitter", type=float, default=0.02,
+                        help="up to this many more seconds at random (default 0.02)")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="fraction of report requests answered with 429 (default 0)")
+    parser.add_argument("--rate", type=float, default=None,
+                        help="requests per second allowed by the RateLimiter (default: "
+                             "unlimited until throttled)")
+    parser.add_argument("--jobs", type=int, default=5,
+                        help="collectTrends calls per scenario (default 5)")
+    parser.add_argument("--quick", action="store_true", help="run only a few scenarios")
+    parser.add_argument("--scenario", action="append",
+                        help="run only the named scenario (can be repeated)")
+    parser.add_argument("--label", default=None,
+                        help="name for this version in the results (default: git commit)")
+    parser.add_argument("--output", default="benchmarks.jsonl",
+                        help="file the results are appended to (default benchmarks.jsonl)")
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        #child process: run one scenario and print its metrics.
+        metrics = runScenario(_scenario(args.run), args.latency, args.jitter,
+                              args.error_rate, args.jobs, args.rate)
+        print(json.dumps(metrics))
+        return
+
+    names = args.scenario or (QUICK if args.quick else [s[0] for s in SCENARIOS])
+    label = args.label or _gitLabel()
+    settings = {"latency": args.latency, "jitter": args.jitter,
+                "errorRate": args.error_rate, "jobs": args.jobs, "rate": args.rate}
+    previous = _load(args.output)
+
+    print("%-30s %7s %9s %8s %8s %8s %8s" % ("scenario", "req/s", "failed", "p50 s",
+                                             "p95 s", "p99 s", "RSS MB"))
+    for name in names:
+        cmd = [sys.executable, os.path.abspath(__file__), "--run", name,
+               "--latency", str(args.latency), "--jitter", str(args.jitter),
+               "--error-rate", str(args.error_rate), "--jobs", str(args.jobs)]
+        if args.rate is not None:
+            cmd += ["--rate", str(args.rate)]
+        out = subprocess.check_output(cmd, cwd=os.path.dirname(os.path.abspath(__file__)))
+        metrics = json.loads(out.decode("utf-8").strip().split("\n")[-1])
+        record = {"label": label, "time": datetime.datetime.now().isoformat(),
+                  "python": sys.version.split()[0], "scenario": name,
+                  "settings": settings, "metrics": metrics}
+        print("%-30s %7.1f %4d/%-4d %8.3f %8.3f %8.3f %8.1f" % (
+            name, metrics["requestsPerSec"], metrics["failed"], metrics["jobs"],
+            metrics["p50"], metrics["p95"], metrics["p99"], metrics["peakRssMB"]))
+        _compare(record, previous)
+        with open(args.output, "a") as f:
+            f.write(json.dumps(record, sort_keys=True) + "\n")
+
+
+def runScenario(scenario, latency, jitter, errorRate, jobs, rate=None):
+    """Runs the jobs of one scenario against a fresh stand-in server."""
+    import gtrends
+    from _metrics import _percentile
+    from _standin import StandInServer
+
+    name, numTerms, years, granularity, workers, engine = scenario
+    server = StandInServer(latency=latency, jitter=jitter, errorRate=errorRate).start()
+    gtrends.sessionPool.setTransport(server.transport)
+    limiter = gtrends.RateLimiter(rate=rate)
+    gtrends.sessionPool.setLimiter(limiter)
+    gtrends.metrics.reset()
+    terms = ["term%d" % i for i in range(numTerms)]
+    startDt = datetime.datetime(year=2010, month=1, day=1)
+    endDt = datetime.datetime(year=2010 + years, month=1, day=1)
+
+    latencies = []
+    failed = 0
+    start = time.time()
+    for i in range(jobs):
+        jobStart = time.time()
+        try:
+            trends = gtrends.collectTrends("bench", "bench", list(terms), startDt, endDt,
+                                           granularity, workers=workers, engine=engine)
+        except Exception:
+            trends = []
+        latencies.append(time.time() - jobStart)
+        if not trends:
+            failed += 1
+    elapsed = time.time() - start
+    server.stop()
+
+    latencies.sort()
+    stats = limiter.stats()
+    return {"jobs": jobs, "failed": failed, "requests": server.requests,
+            "injectedErrors": server.errors, "seconds": elapsed,
+            "requestsPerSec": server.requests / elapsed,
+            "p50": _percentile(latencies, 50), "p95": _percentile(latencies, 95),
+            "p99": _percentile(latencies, 99), "peakRssMB": _peakRss(),
+            "throttles": stats["throttles"],
+            "limiterWait": stats["waited"] + stats["backedOff"],
+            "stageSeconds": dict((stage, gtrends.metrics.histogram(stage)["sum"])
+                                 for stage in gtrends.metrics.stages())}
+
+
+def _scenario(name):
+    for scenario in SCENARIOS:
+        if scenario[0] == name:
+            return scenario
+    raise SystemExit("Unknown scenario: " + name)
+
+
+def _peakRss():
+    """Peak resident memory of this process in MB, or 0.0 where unavailable."""
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    #kilobytes on Linux, bytes on macOS
+    return peak / (1024.0*1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+
+def _gitLabel():
+    try:
+        out = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                      stderr=subprocess.STDOUT)
+        return out.decode("utf-8").strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _load(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _compare(record, previous):
+    """Prints the change from the last result of the scenario under another label."""
+    for old in reversed(previous):
+        if (old["scenario"] == record["scenario"] and old["settings"] == record["settings"]
+                and old["label"] != record["label"]):
+            break
+    else:
+        return
+    changes = []
+    for key in ("requestsPerSec", "p50", "p95", "peakRssMB"):
+        before = old["metrics"].get(key)
+        if before:
+            after = record["metrics"][key]
+            changes.append("%s %+.1f%%" % (key, 100.0*(after - before) / before))
+    print("    vs %s: %s" % (old["label"], ", ".join(changes)))
+
+
+if __name__ == "__main__":
+    main()
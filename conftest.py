@@ -0,0 +1,43 @@
+import sys
+import pytest
+import gtrends
+from _limit import RateLimiter
+from _standin import StandInServer
+
+#the asyncio API needs Python 3.5 or later, and its tests use asyncio.run,
+#which needs 3.7.
+collect_ignore = [] if sys.version_info >= (3, 7) else ["test_async.py"]
+
+def pytest_configure(config):
+	config.addinivalue_line("markers",
+		"server(errorRate, latency, jitter, seed, login): options of the server fixture")
+
+@pytest.fixture
+def terms():
+	return ["banana", "pie", "apple", "cherry", "grape", "melon"]
+
+@pytest.fixture
+def server(request):
+	"""
+	A StandInServer for the user "user" with the password "secret", which
+	gtrends.sessionPool sends its requests to with a fast RateLimiter that
+	doesn't retry. The metrics are reset, and the user is logged in unless
+	the test or its module is marked with server(login=False). The mark also
+	takes the errorRate, latency, jitter and seed of the StandInServer.
+	"""
+	mark = request.node.get_closest_marker("server")
+	options = dict(mark.kwargs) if mark is not None else {}
+	login = options.pop("login", True)
+	server = StandInServer(username="user", password="secret", **options).start()
+	oldTransport = gtrends.sessionPool.transport
+	oldLimiter = gtrends.sessionPool.limiter
+	gtrends.sessionPool.setTransport(server.transport)
+	gtrends.sessionPool.setLimiter(RateLimiter(rate=1000.0, minRate=100.0, baseDelay=0.0,
+		retries=0))
+	if login:
+		gtrends.sessionPool.get("user", "secret").login()
+	gtrends.metrics.reset()
+	yield server
+	gtrends.sessionPool.setTransport(oldTransport)
+	gtrends.sessionPool.setLimiter(oldLimiter)
+	server.stop()
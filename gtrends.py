@@ -1,18 +1,46 @@
 import os
+import io
+import sys
 import time
 import csv
 import datetime
 import math
+import logging
+import threading
 from fractions import *
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
 try:
     import urllib.parse as urllib
 except ImportError:
     import urllib
 
-from _login import Downloader
+from _login import Downloader, SessionPool, sessionPool
+from _cache import ResponseCache
+from _flight import SingleFlight
+from _levels import LevelCache
+from _limit import RateLimiter
+from _metrics import Metrics, metrics
+from _frame import TrendFrame, TrendCube
+import _vector
+import _store
+from _store import TrendStore
+from _reader import TrendReader
+from _stream import TrendSink
+from _checkpoint import Checkpoint
+
+#The longest window, in months, for which Google still returns data at each
+#granularity: daily data for up to 3 months, weekly data for up to 5 years.
+WINDOWS = {'d': 3, 'w': 60}
+#The least volume, summed over the dates an extension shares with the old
+#data, for a term to be scaled on its own (see _chain).
+MIN_ANCHOR = 1.0
 
 def collectTrends(username, password, terms, startDt, endDt, granularity='d',
-					geo='', cat='', gprops='', tz='', sum=False, savePath=None):
+					geo='', cat='', gprops='', tz='', sum=False, savePath=None,
+					cookiePath=None, workers=1, cache=None, engine='python',
+					frame=False, packing='fixed', popularity=None, window=None,
+					checkpoint=None, sections=False, levels=None):
 	"""
 	Downloads normalized Google trend data between [startDt, endDt).
 
@@ -33,7 +61,45 @@ def collectTrends(username, password, terms, startDt, endDt, granularity='d',
 			Ex: images, news, froogle, and youtube
 		tz: A string representing the desired timezone.
 		sum: Sum values of multiple terms by day/week before normalizing.
-		savePath: A string for the file path where the data can be saved
+		savePath: A string for the file path where the data can be saved.
+			Paths ending in ".gtr" are saved as a TrendStore, with the query
+			parameters, and otherwise as csv.
+		cookiePath: A string for a file path where the login cookies are kept
+			between runs. If left as None, the login is only shared within
+			the current process.
+		workers: The maximum number of files downloaded at the same time.
+			Files for all the term segments share this limit.
+		cache: A ResponseCache in which downloaded files are kept, so that
+			later calls only download files which are missing or expired.
+		engine: 'python' to stitch the files together with plain lists, or
+			'numpy' to do it with arrays, which is much faster for many terms
+			or long periods (NumPy must be installed). Values from the two
+			can differ by at most 0.001.
+		frame: If True, a TrendFrame is returned instead of a list. NumPy
+			must be installed.
+		packing: 'fixed' to query the terms in groups of 4 plus the first
+			term, or 'planned' to drop repeated terms and query them in groups
+			of similar popularity (see _planTerms), which needs fewer files
+			and keeps the terms on a common scale.
+		popularity: With packing='planned', a dict of the relative search
+			volume of each term. If None, it is found with one short query per
+			group of terms.
+		window: The number of months in each file. Consecutive files overlap
+			by one month. If None, the longest window Google returns at the
+			granularity is used (see WINDOWS): 3 months for daily data and 5
+			years for weekly data, where earlier versions used 2 and 6 months.
+		checkpoint: A Checkpoint, or the path of a directory for one, in
+			which every downloaded file is saved at once. If the job fails, or
+			the process dies, running it again with the same arguments only
+			downloads the files which are missing.
+		sections: If True, the sections Google sends after the time series
+			in every file, such as the top regions and the top and rising
+			searches of each term, are parsed too, without any more requests.
+		levels: A LevelCache in which the chained levels are kept before
+			they are summed and normalized. Calls for some of the terms and
+			months of a kept result, with the same other query parameters,
+			are then answered from it without downloading anything. It is not
+			used for the lookup when sections is True.
 
 	Returns:
 		A list where each line is a list of format:
@@ -43,92 +109,386 @@ def collectTrends(username, password, terms, startDt, endDt, granularity='d',
 		set to 100. There is a header on the first line, with format:
 		"date,term1,term2,term3, ... termN" where N is the total number of terms.
 		Returns empty list if error.
+		If frame is True, the same data as a TrendFrame, without the header.
+		If sections is True, a tuple of that and a list with a dict for each
+		file, segment after segment, holding its "segment" and "window"
+		numbers, the "startDt" and "endDt" of its window, and its "sections":
+		a dict of each section's title, like "Top regions for foo", to its
+		rows of [label, value]. Values are ints, or strings like "Breakout".
 
 	"""
 	#General checks:
-	if granularity != 'd' and granularity != 'w':
-		print("Error: Granularity must be 'd' or 'w,' not "+granularity)
-		return []
-	if startDt > endDt:
-		print("Error: startDt must come earlier in time than endDt")
-		return []
-	if startDt < datetime.datetime(month=1, day=1, year=2004):
-		print("Error: Google Trends does not provide data before 2004, your start date was: "+str(startDt))
-		return []
-	if endDt > datetime.datetime.today():
-		print("Error: Google Trends cannot see the future, your end date is : "
-				+str(endDt)+", which is later than today")
-		return []
-	if not terms:
-		print("Error: terms tuple is empty, please provide a populated tuple")
+	if not _checkArgs(terms, startDt, endDt, granularity, engine, frame, packing,
+			window):
 		return []
 
 	#all set to download files:
 	else:
-		#Note: Always overlap by 1 month (which is why count = freq-1 ).
-		if granularity == "d":
-			countMonth = 1
-			freq = "2m"
-
-		else: #granularity == "w":
-			countMonth = 5
-			freq = "6m"
-
-		numYears = endDt.year - startDt.year
-		numMonths = endDt.month - startDt.month
-		numMonths += numYears*12
-		numFiles = float(numMonths) / countMonth
-		numFiles = int(math.ceil(numFiles))
-
-		#Packages terms into lists of 5 (the max that can be
-		#queried at once).
-		segmentedTerms = _packTerms(terms)
+		params = _params(granularity, geo, cat, gprops, tz, sum)
+		if packing == 'planned':
+			#as _planTerms does, so a cached result has the same columns.
+			terms = _uniqueTerms(terms)
+		keep = None
+		if levels is not None:
+			levelParams = (granularity, geo, cat, gprops, tz, packing,
+				window or WINDOWS[granularity])
+			cached = None if sections else levels.get(levelParams, list(terms),
+				startDt, endDt)
+			if cached is not None:
+				return _finishLevels(_fromCache(cached, engine), list(terms), endDt,
+					sum, engine, frame, savePath, params)
+
+			def keep(dates, rows):
+				levels.put(levelParams, terms, startDt, endDt, dates, rows,
+					_allClosed(startDt, endDt, granularity, window))
+
+		groups = None
+		if packing == 'planned':
+			terms, groups = _planTerms(username, password, terms, startDt, endDt,
+				geo, cat, gprops, tz, cookiePath, workers, cache, popularity)
+		tables = [] if sections else None
+		reportData = _collectReports(username, password, terms, startDt, endDt,
+			granularity, geo, cat, gprops, tz, cookiePath, workers, cache, groups,
+			window, checkpoint, tables)
+		if not reportData:
+			return []
+
+		trends = _finishTrends(reportData, terms, endDt, sum, engine, frame,
+			savePath, groups, params, keep)
+		if sections:
+			return trends, tables
+		return trends
+
+
+
+
+def collectTrendsBatch(username, password, jobs, startDt, endDt, granularity='d',
+					geo='', cat='', gprops='', tz='', sum=False, cookiePath=None,
+					workers=1, cache=None, engine='python', frame=False,
+					packing='fixed', window=None):
+	"""
+	Downloads normalized Google trend data between [startDt, endDt) for many
+	sets of terms at once.
+
+	Files needed by more than one set of terms, such as those of a segment
+	of terms shared by several sets, are only downloaded once. Each set is
+	then stitched and normalized on its own, exactly as by collectTrends().
+
+	Args:
+		username: A string representing a Google username.
+		password: A string representing the corresponding Google password.
+		jobs: A list where each item is either a list of terms, as given to
+			collectTrends(), or a dict with the key "terms", and optionally
+			"sum" and "savePath" to override those arguments for that job,
+			and "popularity" for packing='planned'.
+		startDt, endDt, granularity, geo, cat, gprops, tz, sum, cookiePath,
+		workers, cache, engine, frame, packing, window: As for
+			collectTrends(), and shared by all jobs. workers limits the
+			downloads of the whole batch.
+
+	Returns:
+		A list with the result of each job in the same order, in the format
+		of collectTrends(). A job with an error gets an empty list.
+
+	"""
+	jobs = [job if isinstance(job, dict) else {"terms": job} for job in jobs]
+
+	#work out the files of every job, and download each distinct one once.
+	plans = []
+	index = {}
+	queries = []
+	for job in jobs:
+		if not _checkArgs(job["terms"], startDt, endDt, granularity, engine, frame,
+				packing, window):
+			plans.append(None)
+			continue
+		terms = list(job["terms"])
+		groups = None
+		if packing == 'planned':
+			terms, groups = _planTerms(username, password, terms, startDt, endDt,
+				geo, cat, gprops, tz, cookiePath, workers, cache, job.get("popularity"))
+		plan = _planQueries(terms, startDt, endDt, granularity, geo, cat,
+			gprops, tz, groups, window) + (terms, groups)
+		plans.append(plan)
+		for query in plan[0]:
+			if query not in index:
+				index[query] = len(queries)
+				queries.append(query)
+
+	dloader = sessionPool.get(username, password, cookiePath)
+	rawReports = _fetchAll(dloader, queries, workers, cache)
+
+	results = []
+	for job, plan in zip(jobs, plans):
+		if plan is None:
+			results.append([])
+			continue
+		jobQueries, numSegs, numFiles, countMonth, terms, groups = plan
+		jobReports = [rawReports[index[query]] for query in jobQueries]
+		reportData = _parseReports(jobReports, numSegs, startDt, numFiles,
+			countMonth, granularity, groups is None)
+		if not reportData:
+			results.append([])
+			continue
+		jobSum = job.get("sum", sum)
+		results.append(_finishTrends(reportData, terms, endDt, jobSum, engine,
+			frame, job.get("savePath"), groups,
+			_params(granularity, geo, cat, gprops, tz, jobSum)))
+
+	return results
+
+
+
+
+def collectTrendsGeo(username, password, terms, geos, startDt, endDt, granularity='d',
+					cat='', gprops='', tz='', sum=False, cookiePath=None, workers=1,
+					cache=None, engine='python', packing='fixed', popularity=None,
+					window=None):
+	"""
+	Downloads normalized Google trend data between [startDt, endDt) for the
+	same terms in many geos at once, as a TrendCube.
+
+	Every geo shares one login, one plan of term segments and windows, and
+	one pool of workers, so the files of all the geos are downloaded in
+	parallel. Each geo is then stitched and normalized on its own, exactly
+	as by collectTrends() with that geo. NumPy must be installed.
+
+	Args:
+		username: A string representing a Google username.
+		password: A string representing the corresponding Google password.
+		terms: A tuple of strings whose query volume is to be searched.
+		geos: A list of strings for the geos to query, such as "US" or "DE".
+			'' is worldwide.
+		startDt, endDt, granularity, cat, gprops, tz, sum, cookiePath, cache,
+		engine, packing, window: As for collectTrends(), and shared by all
+			geos.
+		workers: The maximum number of files downloaded at the same time,
+			for all the geos together.
+		popularity: With packing='planned', a dict of the relative search
+			volume of each term. If None, it is found with one short query per
+			group of terms in the first geo, and the same groups are used for
+			every geo.
+
+	Returns:
+		A TrendCube with the values of each geo, date and term. Geos with a
+		file which could not be downloaded or parsed are listed in its failed
+		attribute, and their values are NaN.
+		Returns empty list if error, or if no geo could be collected.
+
+	"""
+	if not _checkArgs(terms, startDt, endDt, granularity, engine, True, packing, window):
+		return []
+	if not geos or len(set(geos)) != len(geos):
+		logging.error("geos must be a list of distinct geos, not "+str(geos))
+		return []
+
+	terms = list(terms)
+	groups = None
+	if packing == 'planned':
+		terms, groups = _planTerms(username, password, terms, startDt, endDt,
+			geos[0], cat, gprops, tz, cookiePath, workers, cache, popularity)
+
+	#the plan only differs between geos by the geo parameter of each url.
+	plans = []
+	queries = []
+	for geo in geos:
+		plan = _planQueries(terms, startDt, endDt, granularity, geo, cat,
+			gprops, tz, groups, window)
+		plans.append(plan)
+		queries.extend(plan[0])
+
+	#a file which cannot be downloaded only fails its own geo.
+	dloader = sessionPool.get(username, password, cookiePath)
+	rawReports = _fetchAll(dloader, queries, workers, cache, catch=True)
+
+	frames = []
+	offset = 0
+	for geo, plan in zip(geos, plans):
+		geoQueries, numSegs, numFiles, countMonth = plan
+		geoReports = rawReports[offset:offset+len(geoQueries)]
+		offset += len(geoQueries)
 		reportData = []
-		for segTerms in segmentedTerms:
-			#download each 2m file csv as a string
-			rawReport = _downloadReport(username, password, segTerms,
-				startDt, numFiles, countMonth, freq, geo, cat, gprops, tz)
-			#format rawReport into list of each multi-month list.
-			report = _prepTrends(rawReport, startDt, numFiles, countMonth, granularity)
-			#if there is nothing in the report data, then return empty list.
-			if not report:
-				print("Error: at least one file was unable to be downloaded."
-					" Perhaps your search terms are invalid")
-				return []
-
-			reportData.append(report)
-
-		#if, in the same period, between two sets, the added constant
-		#term changes scale, then we must scale the second set to meet
-		#the first one.
-		scaleReports = _scaleRep(reportData)
-		#when more than 4 terms, merge reports into single report.
-		mergeTrend = _merge(scaleReports)
-		initValues = mergeTrend[0][0]
-		#calculate the percent change between subsequent data points
-		#and merge monthly lists.
-		percTrend = _calcPerc(numFiles, mergeTrend)
-		#convert back into levels, all on same scale.
-		reformTrend = _reformTrend(percTrend, initValues)
-		if sum == True:
-			#sum terms query volumes together.
-			reformTrend = _calcSum(reformTrend)
+		if None not in geoReports:
+			reportData = _parseReports(geoReports, numSegs, startDt, numFiles,
+				countMonth, granularity, groups is None)
+		if not reportData:
+			logging.error("No data could be collected for geo "+repr(geo))
+			frames.append(None)
+			continue
+		frames.append(_finishTrends(reportData, terms, endDt, sum, engine, True,
+			None, groups))
 
-		#normalized between [0.0,100.0].
-		normTrend = _normalize(reformTrend)
-		#trim off extra days, which only occur with granularity='w'
-		trimTrend = _trim(normTrend, endDt)
-		#add header.
-		finalTrend = _addHeader(trimTrend, terms)
-		if savePath != None:
-			_save(savePath, finalTrend)
+	if all(frame is None for frame in frames):
+		return []
+	return TrendCube.fromFrames(geos, frames)
 
-		return finalTrend
 
 
 
+def collectTrendsStream(username, password, terms, startDt, endDt, savePath,
+					granularity='d', geo='', cat='', gprops='', tz='', sum=False,
+					cookiePath=None, workers=1, cache=None, packing='fixed',
+					popularity=None, window=None, normalize=True, checkpoint=None):
+	"""
+	Downloads Google trend data between [startDt, endDt) like collectTrends(),
+	but writes it to savePath as it goes instead of returning it.
+
+	The files are downloaded a few windows at a time, and each window is
+	chained onto the levels of the one before as soon as it arrives, then
+	written out. Memory therefore stays at a few windows however long the
+	period is. Normalizing needs the largest level of the whole period, so
+	the output is rescaled once everything is written (see TrendSink); with
+	normalize=False, the levels are left as chained, starting from 1.0.
+	The values written are the same as those saved by collectTrends().
+
+	Args:
+		username, password, terms, startDt, endDt, granularity, geo, cat,
+		gprops, tz, sum, cookiePath, cache, packing, popularity, window,
+		checkpoint: As for collectTrends().
+		savePath: A string for the file path where the data is written, csv
+			or ".gtr".
+		workers: The maximum number of files downloaded at the same time.
+			Also sets how many windows are downloaded before being chained.
+		normalize: If False, write the levels without normalizing them.
+
+	Returns:
+		The number of dates written, or 0 if error, in which case nothing is
+		left at savePath.
 
-def collectRawTrends(username, password, terms, startDt, endDt, geo='', cat='', gprops='', tz='', savePath=None):
+	"""
+	#General checks:
+	if not _checkArgs(terms, startDt, endDt, granularity, 'python', False, packing,
+			window):
+		return 0
+
+	groups = None
+	if packing == 'planned':
+		terms, groups = _planTerms(username, password, terms, startDt, endDt,
+			geo, cat, gprops, tz, cookiePath, workers, cache, popularity)
+	queries, numSegs, numFiles, countMonth = _planQueries(terms, startDt,
+		endDt, granularity, geo, cat, gprops, tz, groups, window)
+	dropLast = groups is None
+	checkpoint = _beginCheckpoint(checkpoint, queries, numFiles)
+
+	params = _params(granularity, geo, cat, gprops, tz, sum)
+	params["normalized"] = bool(normalize)
+	sink = TrendSink(savePath, _addHeader([], terms)[0], endDt, params, normalize)
+	dloader = sessionPool.get(username, password, cookiePath)
+	#windows downloaded together, so that all workers are kept busy.
+	step = max(1, workers // numSegs)
+	grans = [granularity]*numSegs
+	lastDts = [None]*numSegs
+	factors = inits = levels = None
+	try:
+		for first in range(0, numFiles, step):
+			windowIds = range(first, min(first+step, numFiles))
+			#the files of these windows, window after window.
+			rawReports = _fetchAll(dloader, [queries[s*numFiles + i] for i in windowIds
+				for s in range(numSegs)], workers, cache, checkpoint)
+
+			for n, i in enumerate(windowIds):
+				windows = []
+				with metrics.timer("prepTrends"):
+					for s in range(numSegs):
+						report, grans[s] = _prepWindow(rawReports[n*numSegs + s], i,
+							startDt, countMonth, grans[s], dropLast, lastDts[s])
+						if checkpoint is not None:
+							checkpoint.mark(s, i, bool(report))
+						if not report:
+							logging.error("At least one file was unable to be downloaded."
+								" Perhaps your search terms are invalid")
+							sink.abort()
+							return 0
+						lastDts[s] = report[-1][0]
+						windows.append(report)
+
+				with metrics.timer("stitch"):
+					if groups is not None:
+						merged, windowInits = _mergePlanned([[w] for w in windows], groups,
+							terms)
+						inits = inits or windowInits
+					else:
+						if factors is None:
+							factors = [_scaleFactor(windows[0], w) for w in windows]
+						for s in range(1, numSegs):
+							_scaleLines(windows[s], factors[s])
+						merged = _merge([[w] for w in windows])
+					reformTrend, levels = _chainWindow(merged[0], levels)
+					if groups is not None:
+						reformTrend = _startFrom(reformTrend, inits)
+					if sum == True:
+						reformTrend = _calcSum(reformTrend)
+				with metrics.timer("save", path=savePath):
+					sink.add(reformTrend)
+			del rawReports
+
+		with metrics.timer("normalize"):
+			return sink.close()
+	except Exception:
+		sink.abort()
+		raise
+
+
+
+
+def explainTrends(terms, startDt, endDt, granularity='d', geo='', cat='', gprops='',
+					tz='', packing='fixed', popularity=None, window=None):
+	"""
+	Shows the files collectTrends() would download for the same arguments,
+	without downloading anything.
+
+	Args:
+		terms, startDt, endDt, granularity, geo, cat, gprops, tz, packing,
+		popularity, window: As for collectTrends().
+
+	Returns:
+		A list where each line is a list of format:
+		[datetime, months, terms, query], where "datetime" is the first month
+		of the file, "months" its length, "terms" the list of terms in it, and
+		"query" its export url. There is a header on the first line. With
+		packing='planned' and no popularity, the probe files come first, and
+		the groups are shown in the order of terms, since their popularity is
+		only known after the probes. Every probe after the first also holds
+		the most popular term of the first, which is only known once the first
+		is downloaded, so their terms leave it out and their query is None.
+		Returns empty list if error.
+
+	"""
+	if not _checkArgs(terms, startDt, endDt, granularity, 'python', False, packing,
+			window):
+		return []
+
+	plan = [["date", "months", "terms", "query"]]
+	groups = None
+	if packing == 'planned':
+		probes = popularity is None
+		if probes:
+			popularity = dict((term, -i) for i, term in enumerate(terms))
+		terms, groups = _planTerms(None, None, terms, startDt, endDt, geo, cat,
+			gprops, tz, None, 1, None, popularity)
+		if probes and len(groups) > 1:
+			numMonths = (endDt.year - startDt.year)*12 + endDt.month - startDt.month
+			freq = str(max(numMonths, 1))+"m"
+			query = _buildQueries(terms[:5], startDt, 1, 0, freq, geo, cat, gprops, tz)[0]
+			plan.append([startDt, max(numMonths, 1), terms[:5], query])
+			for i in range(5, len(terms), 4):
+				plan.append([startDt, max(numMonths, 1), terms[i : i+4], None])
+
+	numFiles, countMonth, freq = _planWindows(startDt, endDt, granularity, window)
+	for segTerms in (groups if groups is not None else _packTerms(list(terms))):
+		queries = _buildQueries(segTerms, startDt, numFiles, countMonth, freq,
+			geo, cat, gprops, tz)
+		for i, query in enumerate(queries):
+			year, month = _addMonths(startDt, i*countMonth)
+			plan.append([datetime.datetime(year, month, 1), countMonth+1, segTerms, query])
+
+	return plan
+
+
+
+
+def collectRawTrends(username, password, terms, startDt, endDt, geo='', cat='', gprops='', tz='', savePath=None,
+					cookiePath=None, cache=None):
 	"""
 	Downloads raw Google Trends data.
 
@@ -146,43 +506,515 @@ def collectRawTrends(username, password, terms, startDt, endDt, geo='', cat='',
 		endDt: A datetime object for the end of the period (exclusive).
 			Only the month and year are considered.
 		savePath: A string for the file path where the data can be saved
+		cookiePath: A string for a file path where the login cookies are kept
+			between runs.
+		cache: A ResponseCache in which the downloaded file is kept.
 
 	Returns:
 		A list of 1 string representing the entire downloaded csv.
 
 	"""
 	#General checks:
-	if startDt > endDt:
-		print("Error: startDt must come earlier in time than endDt")
+	if not _checkRawArgs(terms, startDt, endDt):
 		return []
-	if startDt < datetime.datetime(month=1, day=1, year=2004):
-		print("Error: Google Trends does not provide data before 2004, your start date was: "+str(startDt))
+
+	#all set to download files:
+	else:
+		report = _downloadReport(username, password, terms, startDt, 1, 0, _rawFreq(startDt, endDt), geo, cat, gprops, tz, cookiePath,
+				cache=cache)
+		if not report:
+			logging.error("File was unable to be downloaded.")
+			return []
+		else:
+			if savePath != None:
+				_save(savePath, report)
+
+			return report
+
+
+
+
+def extendTrends(username, password, trends, endDt, geo='', cat='', gprops='',
+					tz='', savePath=None, cookiePath=None, workers=1, cache=None):
+	"""
+	Extends data from collectTrends() up to endDt, downloading only the files
+	needed for the new dates.
+
+	The new data is chained onto the old levels over the dates of the last
+	old month, which the first new file overlaps, and the whole series is
+	then normalized again. A term with less than MIN_ANCHOR of volume over
+	that month is chained over as many earlier months as it takes, and if
+	it never has that much, the data cannot be extended. The terms,
+	granularity, and summing are taken from the old data, but geo, cat,
+	gprops, and tz must be given the same values as before.
+	Summed data is chained as a single series, so it can differ slightly from
+	summed data downloaded in one go, where each term starts from its level at
+	startDt.
+
+	Args:
+		username: A string representing a Google username.
+		password: A string representing the corresponding Google password.
+		trends: Either the list returned by collectTrends(), or a string
+			for the path of a file saved by it (csv or ".gtr").
+		endDt: A datetime object for the new end of the period (exclusive).
+			Only the month and year are considered.
+		savePath: A string for the file path where the data can be saved
+
+	Returns:
+		A list of the same format as collectTrends(), holding both the old and
+		the new data. Returns empty list if error.
+
+	"""
+	if not isinstance(trends, list):
+		trends = _read(trends)
+	header = trends[0]
+	data = trends[1:]
+	terms = header[1:]
+
+	#General checks:
+	if len(data) < 2:
+		logging.error("At least two dates are needed to extend a trend")
 		return []
 	if endDt > datetime.datetime.today():
-		print("Error: Google Trends cannot see the future, your end date is : "
+		logging.error("Google Trends cannot see the future, your end date is : "
 				+str(endDt)+", which is later than today")
 		return []
-	if not terms:
-		print("Error: terms tuple is empty, please provide a populated tuple")
+	lastDt = data[-1][0]
+	if (endDt.year, endDt.month) <= (lastDt.year, lastDt.month):
+		logging.error("endDt must come later than the last date of the trend, "
+				+str(lastDt))
 		return []
-	if len(terms) > 5:
-		print("Error: Google Trends only accepts 5 terms at a time")
+	anchor = _anchorMonth(data)
+	if anchor is None:
+		logging.error("A term has too little volume in the trend to extend it")
 		return []
 
 	#all set to download files:
 	else:
-		numYears = endDt.year - startDt.year
-		numMonths = endDt.month - startDt.month
-		numMonths += numYears*12
-		report = _downloadReport(username, password, terms, startDt, 1, 0, str(numMonths)+"m", geo, cat, gprops, tz)
-		if not report:
-			print("Error: file was unable to be downloaded.")
+		startDt = datetime.datetime(year=anchor[0], month=anchor[1], day=1)
+		granularity = 'd' if (data[1][0] - data[0][0]).days == 1 else 'w'
+		#summed data has one column under a header of every term (see _addHeader).
+		summed = len(data[0]) == 2 and len(header) > 2
+
+		#the first new file overlaps the old dates from startDt.
+		reformTrend = _collectLevels(username, password, terms, startDt, endDt,
+			granularity, geo, cat, gprops, tz, cookiePath, workers, cache)
+		if not reformTrend:
 			return []
-		else:
+		if summed:
+			reformTrend = _calcSum(reformTrend)
+
+		#chain the new levels onto the old ones.
+		newTrend = _chain(data, reformTrend)
+		if not newTrend:
+			logging.error("The new data does not overlap the last date, "+str(lastDt)
+				+", or has no volume on the dates it shares with the old data")
+			return []
+
+		#normalized between [0.0,100.0].
+		normTrend = _normalize(newTrend)
+		trimTrend = _trim(normTrend, endDt)
+		finalTrend = [header] + trimTrend
+		if savePath != None:
+			_save(savePath, finalTrend, _params(granularity, geo, cat, gprops, tz, summed))
+
+		return finalTrend
+
+
+
+
+def readTrends(path, startDt=None, endDt=None, terms=None, frame=False):
+	"""
+	Reads the dates in [startDt, endDt) of a file saved by collectTrends(),
+	without loading the rest of it.
+
+	Csv files are read with a TrendReader, which seeks to startDt through an
+	index kept next to the file (path + ".idx"), and ".gtr" files are mapped
+	into memory.
+
+	Args:
+		path: A string for the path of a file saved with savePath.
+		startDt: A datetime object for the first date, or None for the first
+			date of the file.
+		endDt: A datetime object for the end of the range (exclusive), or None
+			for the last date of the file.
+		terms: A list of the terms to read, or None for all of them.
+		frame: If True, return a TrendFrame instead of a list.
+
+	Returns:
+		A list of the same format as collectTrends(), or a TrendFrame.
+
+	"""
+	if _store.isStore(path):
+		store = TrendStore(path)
+		data = store.frame()
+		if startDt is not None or endDt is not None:
+			data = data.between(startDt or datetime.datetime(1, 1, 1),
+				endDt or datetime.datetime(9999, 12, 31))
+		if terms is not None:
+			data = data.select(terms)
+		summed = store.params.get("sum") and len(store.terms) == 1
+		store.close()
+		if frame:
+			return data
+		data = data.toList()
+		if terms is None and summed:
+			#summed data lists every term in its header, as in the csv.
+			data[0] = ["date"] + store.terms[0].split(" ")
+		return data
+
+	reader = TrendReader(path)
+	if frame:
+		return reader.frame(startDt, endDt, terms)
+	return reader.read(startDt, endDt, terms)
+
+
+
+
+def _checkArgs(terms, startDt, endDt, granularity, engine, frame, packing='fixed',
+				window=None):
+	"""Checks the arguments of collectTrends(), printing what is wrong."""
+	if granularity != 'd' and granularity != 'w':
+		logging.error("Granularity must be 'd' or 'w,' not "+granularity)
+		return False
+	if startDt > endDt:
+		logging.error("startDt must come earlier in time than endDt")
+		return False
+	if startDt < datetime.datetime(month=1, day=1, year=2004):
+		logging.error("Google Trends does not provide data before 2004, your start date was: "+str(startDt))
+		return False
+	if endDt > datetime.datetime.today():
+		logging.error("Google Trends cannot see the future, your end date is : "
+				+str(endDt)+", which is later than today")
+		return False
+	if not terms:
+		logging.error("Terms tuple is empty, please provide a populated tuple")
+		return False
+	if engine != 'python' and engine != 'numpy':
+		logging.error("engine must be 'python' or 'numpy', not "+engine)
+		return False
+	if (engine == 'numpy' or frame) and _vector.np is None:
+		logging.error("engine='numpy' and frame=True require NumPy to be installed")
+		return False
+	if packing != 'fixed' and packing != 'planned':
+		logging.error("packing must be 'fixed' or 'planned', not "+packing)
+		return False
+	if window is not None and (not isinstance(window, int) or window < 2):
+		logging.error("window must be a whole number of months, at least 2, not "
+				+str(window))
+		return False
+	return True
+
+
+
+
+def _checkRawArgs(terms, startDt, endDt):
+	"""Checks the arguments of collectRawTrends(), printing what is wrong."""
+	if startDt > endDt:
+		logging.error("startDt must come earlier in time than endDt")
+		return False
+	if startDt < datetime.datetime(month=1, day=1, year=2004):
+		logging.error("Google Trends does not provide data before 2004, your start date was: "+str(startDt))
+		return False
+	if endDt > datetime.datetime.today():
+		logging.error("Google Trends cannot see the future, your end date is : "
+				+str(endDt)+", which is later than today")
+		return False
+	if not terms:
+		logging.error("Terms tuple is empty, please provide a populated tuple")
+		return False
+	if len(terms) > 5:
+		logging.error("Google Trends only accepts 5 terms at a time")
+		return False
+	return True
+
+
+def _rawFreq(startDt, endDt):
+	"""The length of the single file of collectRawTrends(), for its query."""
+	numYears = endDt.year - startDt.year
+	numMonths = endDt.month - startDt.month
+	numMonths += numYears*12
+	return str(numMonths)+"m"
+
+
+
+
+def _finishTrends(reportData, terms, endDt, sum, engine, frame, savePath, groups=None,
+					params=None, keep=None):
+	"""
+	Stitches the parsed reports of collectTrends() together, then sums,
+	normalizes, trims and saves them. groups are the term groups from
+	_planTerms, if packing='planned' was used, and params the query
+	parameters saved with a TrendStore. keep, if given, is called with the
+	dates and the rows of levels before they are summed, for a LevelCache.
+	"""
+	if groups is not None:
+		#planned groups are put on a single scale before chaining, and
+		#the levels start from the values on the first date.
+		merged, inits = _mergePlanned(reportData, groups, terms)
+		reportData = [merged]
+
+	if engine == 'numpy':
+		with metrics.timer("stitch"):
+			dates, levels = _vector.stitch(reportData)
+		if groups is not None:
+			levels = levels * inits
+		if keep is not None:
+			keep(dates, levels.tolist())
+		return _finishLevels((dates, levels), terms, endDt, sum, engine, frame,
+			savePath, params)
+
+	#chain the files into levels on a single scale.
+	reformTrend = _stitch(reportData)
+	if groups is not None:
+		reformTrend = _startFrom(reformTrend, inits)
+	if keep is not None:
+		keep([line[0] for line in reformTrend], [line[1:] for line in reformTrend])
+	return _finishLevels(reformTrend, terms, endDt, sum, engine, frame, savePath,
+		params)
+
+
+
+
+def _finishLevels(levels, terms, endDt, sum, engine, frame, savePath, params=None):
+	"""
+	Sums, normalizes, trims and saves the chained levels of collectTrends().
+	With engine='numpy', levels are a tuple of the dates and an array of
+	levels, and otherwise rows of [datetime, level1, level2, ...].
+	"""
+	if engine == 'numpy':
+		dates, levels = levels
+		if sum == True:
+			levels = _vector.calcSum(levels)
+		with metrics.timer("normalize"):
+			normValues = _vector.normalize(levels)
+		if frame:
+			#skip the list format entirely.
+			end = _trimLength(dates, endDt)
+			columns = [" ".join(terms)] if sum == True else terms
+			finalFrame = TrendFrame(dates[:end], normValues[:end], columns)
 			if savePath != None:
-				_save(savePath, report)
+				with metrics.timer("save", path=savePath):
+					if _store.isStore(savePath):
+						_store.save(savePath, finalFrame.dates, finalFrame.values,
+							finalFrame.terms, params)
+					else:
+						#the same header as _addHeader, also when summed.
+						finalFrame.toCsv(savePath, ["date"] + list(terms))
+			return finalFrame
+		normTrend = _vector.toRows(dates, normValues)
+
+	else:
+		reformTrend = levels
+		if sum == True:
+			#sum terms query volumes together.
+			reformTrend = _calcSum(reformTrend)
+
+		#normalized between [0.0,100.0].
+		with metrics.timer("normalize"):
+			normTrend = _normalize(reformTrend)
+
+	#trim off extra days, which only occur with granularity='w'
+	trimTrend = _trim(normTrend, endDt)
+	#add header.
+	finalTrend = _addHeader(trimTrend, terms)
+	if savePath != None:
+		with metrics.timer("save", path=savePath):
+			_save(savePath, finalTrend, params)
+	if frame:
+		return TrendFrame.fromList(finalTrend)
+
+	return finalTrend
+
+
+
+
+def _fromCache(cached, engine):
+	"""
+	Converts the (dates, levels) from a LevelCache into the levels taken by
+	_finishLevels for the engine.
+	"""
+	dates, rows = cached
+	if engine == 'numpy':
+		return dates, _vector.np.array(rows, dtype=_vector.np.float64).reshape(len(rows), -1)
+	return [[dt] + line for dt, line in zip(dates, rows)]
+
+
+
+
+def _allClosed(startDt, endDt, granularity, window=None):
+	"""
+	Checks if every file for [startDt, endDt) is of months before the
+	current one, so that Google won't change them any more.
+	"""
+	numFiles, countMonth, freq = _planWindows(startDt, endDt, granularity, window)
+	today = datetime.datetime.today()
+	return _addMonths(startDt, numFiles*countMonth) < (today.year, today.month)
+
+
+
+
+def _params(granularity, geo, cat, gprops, tz, sum):
+	"""The query parameters kept in the header of a TrendStore."""
+	return {"granularity": granularity, "geo": geo, "cat": cat, "gprops": gprops,
+		"tz": tz, "sum": bool(sum)}
+
+
+
+
+def _collectLevels(username, password, terms, startDt, endDt, granularity,
+					geo, cat, gprops, tz, cookiePath, workers, cache):
+	"""
+	Downloads every file for [startDt, endDt) and chains them into levels
+	which are all on the same scale, but not yet normalized. Returns an empty
+	list if any file could not be used.
+	"""
+	reportData = _collectReports(username, password, terms, startDt, endDt,
+		granularity, geo, cat, gprops, tz, cookiePath, workers, cache)
+	if not reportData:
+		return []
+
+	return _stitch(reportData)
+
+
+
+
+def _collectReports(username, password, terms, startDt, endDt, granularity,
+					geo, cat, gprops, tz, cookiePath, workers, cache, groups=None,
+					window=None, checkpoint=None, sections=None):
+	"""
+	Downloads every file for [startDt, endDt) and parses them, returning a
+	list with the _prepTrends output of each term segment, and appending the
+	sections of each file to sections if it is a list. Returns an empty list
+	if any file could not be used.
+	"""
+	queries, numSegs, numFiles, countMonth = _planQueries(terms, startDt,
+		endDt, granularity, geo, cat, gprops, tz, groups, window)
+	checkpoint = _beginCheckpoint(checkpoint, queries, numFiles)
+	#download each file csv as a string, for all segments at once.
+	dloader = sessionPool.get(username, password, cookiePath)
+	rawReports = _fetchAll(dloader, queries, workers, cache, checkpoint)
+
+	return _parseReports(rawReports, numSegs, startDt, numFiles, countMonth,
+		granularity, groups is None, checkpoint, sections)
+
+
+
+
+def _beginCheckpoint(checkpoint, queries, numFiles):
+	"""
+	Starts or resumes the job of the queries in checkpoint, a Checkpoint or
+	the path of one. Returns the Checkpoint, or None if there is none.
+	"""
+	if checkpoint is None:
+		return None
+	if not isinstance(checkpoint, Checkpoint):
+		checkpoint = Checkpoint(checkpoint)
+	saved = checkpoint.begin(queries, numFiles)
+	if saved:
+		logging.info("Resuming from "+checkpoint.path+", "+str(saved)+" of "
+			+str(len(queries))+" files already downloaded")
+	return checkpoint
+
+
+
+
+def _planQueries(terms, startDt, endDt, granularity, geo, cat, gprops, tz,
+					groups=None, window=None):
+	"""
+	Works out the files needed for [startDt, endDt). Returns their export
+	urls, segment after segment, with the number of segments, the number of
+	files per segment, and the number of months between files. The segments
+	are the given groups, or else come from _packTerms.
+	"""
+	numFiles, countMonth, freq = _planWindows(startDt, endDt, granularity, window)
+
+	#Packages terms into lists of 5 (the max that can be
+	#queried at once).
+	segmentedTerms = groups if groups is not None else _packTerms(terms)
+	queries = []
+	for segTerms in segmentedTerms:
+		queries += _buildQueries(segTerms, startDt, numFiles, countMonth,
+			freq, geo, cat, gprops, tz)
+
+	return queries, len(segmentedTerms), numFiles, countMonth
+
+
+
+
+def _planWindows(startDt, endDt, granularity, window=None):
+	"""
+	Works out the windows for [startDt, endDt), each `window` months long
+	(WINDOWS by default). Returns the number of files, the number of months
+	between files, and the length of each file for the query.
+	"""
+	if window is None:
+		window = WINDOWS[granularity]
+	#Note: Always overlap by 1 month (which is why count = window-1 ). Only
+	#the first point of that month is kept, to chain the windows together.
+	countMonth = window - 1
+	freq = str(window)+"m"
+
+	numYears = endDt.year - startDt.year
+	numMonths = endDt.month - startDt.month
+	numMonths += numYears*12
+	numFiles = float(numMonths) / countMonth
+	numFiles = int(math.ceil(numFiles))
+
+	return numFiles, countMonth, freq
+
+
+
+
+def _parseReports(rawReports, numSegs, startDt, numFiles, countMonth, granularity,
+					dropLast=True, checkpoint=None, sections=None):
+	"""
+	Parses the downloaded files of each segment with _prepTrends, recording
+	the result of each in checkpoint, and appending the sections of each to
+	sections if it is a list. Returns an empty list if any of them could not
+	be used.
+	"""
+	reportData = []
+	for i in range(numSegs):
+		rawReport = rawReports[i*numFiles : (i+1)*numFiles]
+		#format rawReport into list of each multi-month list.
+		with metrics.timer("prepTrends"):
+			report = _prepTrends(rawReport, startDt, numFiles, countMonth, granularity,
+				dropLast, checkpoint, i, sections)
+		#if there is nothing in the report data, then return empty list.
+		if not report:
+			logging.error("At least one file was unable to be downloaded."
+				" Perhaps your search terms are invalid")
+			return []
+
+		reportData.append(report)
+
+	return reportData
+
 
-			return report
+
+
+def _stitch(reportData):
+	"""
+	Chains the parsed reports of all segments into levels on a single scale.
+	"""
+	#if, in the same period, between two sets, the added constant
+	#term changes scale, then we must scale the second set to meet
+	#the first one.
+	with metrics.timer("scaleRep"):
+		scaleReports = _scaleRep(reportData)
+	#when more than 4 terms, merge reports into single report.
+	with metrics.timer("merge"):
+		mergeTrend = _merge(scaleReports)
+	initValues = mergeTrend[0][0]
+	#calculate the percent change between subsequent data points
+	#and merge monthly lists.
+	with metrics.timer("calcPerc"):
+		percTrend = _calcPerc(len(mergeTrend), mergeTrend)
+	#convert back into levels, all on same scale.
+	with metrics.timer("reformTrend"):
+		reformTrend = _reformTrend(percTrend, initValues)
+	return reformTrend
 
 
 
@@ -217,24 +1049,150 @@ def _packTerms(terms):
 
 
 
+def _planTerms(username, password, terms, startDt, endDt, geo, cat, gprops, tz,
+				cookiePath, workers, cache, popularity=None):
+	"""
+	Packages terms for packing='planned'. Repeated terms are dropped, and up
+	to 5 terms are queried together. More terms are sorted by popularity and
+	split into groups of similar popularity: the first group holds the 5 most
+	popular terms, and each following group the last (least popular) term of
+	the group before it, as the anchor, and the next 4 terms. Neighbouring
+	groups are then scaled to each other through the values of their shared
+	anchor, which are never far from the other values in either file, and so
+	are not rounded to 0 or 1 by Google.
+	Returns the terms without repeats, and the groups.
+	"""
+	unique = _uniqueTerms(terms)
+	if len(unique) <= 5:
+		return unique, [list(unique)]
+
+	if popularity is None:
+		popularity = _probePopularity(username, password, unique, startDt, endDt,
+			geo, cat, gprops, tz, cookiePath, workers, cache)
+	ranked = sorted(unique, key=lambda term: -popularity.get(term, 0.0))
+
+	groups = [ranked[:5]]
+	index = 5
+	while index < len(ranked):
+		groups.append([groups[-1][-1]] + ranked[index : index+4])
+		index += 4
+
+	return unique, groups
+
+
+
+
+def _uniqueTerms(terms):
+	"""Returns the terms without repeats, in the order first given."""
+	unique = []
+	for term in terms:
+		if term not in unique:
+			unique.append(term)
+	return unique
+
+
+
+
+#(terms, startDt, endDt, geo, cat, gprops, tz) -> (expires, popularity), so
+#repeated planned downloads only probe once. Past MAX_POPULARITY entries the
+#least recently used are dropped, and entries whose probes reach into the
+#current month expire after POPULARITY_TTL seconds, as in a LevelCache.
+MAX_POPULARITY = 64
+POPULARITY_TTL = 6*60*60
+_popularity = OrderedDict()
+_popularityLock = threading.Lock()
+
+def _probePopularity(username, password, terms, startDt, endDt, geo, cat, gprops,
+					tz, cookiePath, workers, cache):
+	"""
+	Finds the relative popularity of the terms over [startDt, endDt) with a
+	single file per group of 5 terms, spanning the whole range. Every group
+	after the first holds the most popular term of the first group, which
+	scales it to the first group.
+	Returns a dict of the mean level of each term.
+	"""
+	key = (tuple(terms), startDt, endDt, geo, cat, gprops, tz)
+	with _popularityLock:
+		entry = _popularity.pop(key, None)
+		if entry is not None and (not entry[0] or entry[0] > time.time()):
+			_popularity[key] = entry
+			return entry[1]
+
+	numMonths = (endDt.year - startDt.year)*12 + endDt.month - startDt.month
+	freq = str(max(numMonths, 1))+"m"
+	groups = [terms[:5]]
+	for index in range(5, len(terms), 4):
+		groups.append(terms[index : index+4])
+
+	#the first group has to be downloaded before its most popular term is known.
+	dloader = sessionPool.get(username, password, cookiePath)
+	queries = _buildQueries(groups[0], startDt, 1, 0, freq, geo, cat, gprops, tz)
+	means = _probeMeans(_fetchAll(dloader, queries, workers, cache)[0])
+	popularity = dict(zip(groups[0], means))
+	ref = max(groups[0], key=lambda term: popularity[term])
+
+	queries = []
+	for group in groups[1:]:
+		queries += _buildQueries([ref] + group, startDt, 1, 0, freq, geo, cat,
+			gprops, tz)
+	for group, raw in zip(groups[1:], _fetchAll(dloader, queries, workers, cache)):
+		means = _probeMeans(raw)
+		factor = popularity[ref] / (means[0] or 1.0)
+		for term, mean in zip(group, means[1:]):
+			popularity[term] = mean*factor
+
+	now = datetime.datetime.now()
+	closed = _addMonths(startDt, max(numMonths, 1)) <= (now.year, now.month)
+	with _popularityLock:
+		_popularity[key] = (0 if closed else time.time() + POPULARITY_TTL, popularity)
+		while len(_popularity) > MAX_POPULARITY:
+			_popularity.popitem(last=False)
+	return popularity
+
+
+def _probeMeans(raw):
+	"""Returns the mean of each column of the time series in a file."""
+	sums = []
+	count = 0
+	for j, rawLine in enumerate(_iterLines(raw)):
+		if j < 5:
+			continue
+		line = rawLine.rstrip("\r\n").split(",")
+		if line[0] == "":
+			break
+		if not sums:
+			sums = [0.0]*(len(line)-1)
+		for k in range(1, len(line)):
+			sums[k-1] += int(line[k] or 0)
+		count += 1
+
+	return [total / max(count, 1) for total in sums]
+
+
+
+
 def _downloadReport(username, password, terms, startDt, numFiles,
-					countMonth, freq, geo, cat, gprops, tz):
+					countMonth, freq, geo, cat, gprops, tz, cookiePath=None,
+					workers=1, cache=None):
 	"""
 	Helper function to actually downloading Google trend data.
 	Must have a maximum of FIVE terms.
+	The login is shared with every other download for the same account.
 	"""
+	dloader = sessionPool.get(username, password, cookiePath)
+	queries = _buildQueries(terms, startDt, numFiles, countMonth, freq,
+		geo, cat, gprops, tz)
+	return _fetchAll(dloader, queries, workers, cache)
+
 
-	report = []
 
-	dloader = Downloader(username, password)
 
+def _buildQueries(terms, startDt, numFiles, countMonth, freq, geo, cat, gprops, tz):
+	"""Creates the export url of each file, in chronological order."""
+	queries = []
 	for i in range(0, numFiles):
-		month = startDt.month + i*countMonth
-		year = startDt.year
-		while month > 12:
-			year += 1
-			month -= 12
-	
+		year, month = _addMonths(startDt, i*countMonth)
+
 		#create query
 		query = "http://www.google.com/trends/trendsReport?&q="
 		for term in terms:
@@ -242,115 +1200,262 @@ def _downloadReport(username, password, terms, startDt, numFiles,
 		query = query[:-3] #remove final comma
 		query += "&geo="+urllib.quote(geo)+"&cat="+urllib.quote(cat)+"&gprop="+urllib.quote(gprops)
 		query += "&cmpt=q&content=1&export=1&date="+str(month)+"%2F"+str(year)+"%20"+urllib.quote(freq)
-		
-		print(query)
-	
-		data = dloader.downloadReport(query)
-		report.append(data)
+		if tz:
+			query += "&tz="+urllib.quote(tz)
+		queries.append(query)
 
-	return report
+	return queries
 
 
 
 
-def _prepTrends(rawReport, startDt, numFiles, countMonth, granularity):
+def _fetchAll(dloader, queries, workers, cache=None, checkpoint=None, catch=False):
+	"""
+	Downloads each query, with at most `workers` downloads running at once.
+	The reports are returned in the same order as the queries. Files saved in
+	checkpoint are not downloaded again, and the others are saved in it as
+	they arrive. With catch=True, a download which fails is logged and
+	returned as None, instead of raising its exception.
+	"""
+	def fetch(query):
+		if checkpoint is not None:
+			data = checkpoint.get(query)
+			if data is not None:
+				return data
+		logging.info("Downloading "+query)
+		if catch:
+			try:
+				return dloader.downloadReport(query, cache)
+			except Exception as e:
+				logging.error("Unable to download "+query+": "+str(e))
+				return None
+		data = dloader.downloadReport(query, cache)
+		if checkpoint is not None:
+			checkpoint.put(query, data)
+		return data
+
+	if workers <= 1 or len(queries) <= 1:
+		return [fetch(query) for query in queries]
+
+	pool = ThreadPool(min(workers, len(queries)))
+	try:
+		return pool.map(fetch, queries)
+	finally:
+		pool.close()
+		pool.join()
+
+
+
+
+def _prepTrends(rawReport, startDt, numFiles, countMonth, granularity, dropLast=True,
+				checkpoint=None, segment=0, sections=None):
 	"""
 	Helper function which reformats data into list of lists with correct data
 	types. If anything is empty or has incorrect data, then an empty list is
-	returned.
+	returned. The last column (the constant term added by _packTerms) is
+	dropped unless dropLast is False. Whether each file could be parsed is
+	recorded in checkpoint, as files of the given segment. If sections is a
+	list, the sections of each file are appended to it (see _windowSections).
 	"""
 	#load each rawReport into separate list
 	reportData = []
 	for i in range(numFiles):
-		#convert string to 2d list
-		raw = rawReport[i]
-		rawLines = raw.split("\n")
-		lines = []
-		for rawLine in rawLines:
-			line = rawLine.split(",")
-			lines.append(line)
+		lastDt = reportData[-1][-1][0] if reportData else None
+		windowSections = None
+		if sections is not None:
+			windowSections = _windowSections(segment, i, startDt, countMonth)
+			sections.append(windowSections)
+		report, granularity = _prepWindow(rawReport[i], i, startDt, countMonth,
+			granularity, dropLast, lastDt,
+			windowSections["sections"] if windowSections is not None else None)
+		if checkpoint is not None:
+			checkpoint.mark(segment, i, bool(report))
+		#Checks that there is data. If not, then returns empty list.
+		if not report:
+			return []
+
+		reportData.append(report)
 
+	return reportData
+
+
+def _windowSections(segment, i, startDt, countMonth):
+	"""
+	The table of sections of the i'th file of a segment: a dict of the
+	segment and window numbers, the window's first month as "startDt", its
+	end month (exclusive, the overlap with the next window included) as
+	"endDt", and the "sections" parsed from the file.
+	"""
+	start = _addMonths(startDt, i*countMonth)
+	end = _addMonths(startDt, (i+1)*countMonth + 1)
+	return {"segment": segment, "window": i,
+		"startDt": datetime.datetime(start[0], start[1], 1),
+		"endDt": datetime.datetime(end[0], end[1], 1), "sections": {}}
+
+
+def _prepWindow(raw, i, startDt, countMonth, granularity, dropLast=True, lastDt=None,
+				sections=None):
+	"""
+	Parses the i'th file of a segment, which follows a file ending at lastDt
+	(None for the first file). Returns the lines and the granularity found.
+	The sections after the time series are parsed into sections, if it is a
+	dict.
+	"""
+	finalMonth = _addMonths(startDt, (i+1)*countMonth)
+
+	report, granularity = _parseReport(raw, finalMonth, granularity, dropLast, sections)
+	#weeks run from Sunday, so a window's first week can start in the
+	#month before. Start from the last week of the previous window instead,
+	#so that both windows share exactly one point.
+	if lastDt is not None:
+		while report and report[0][0] < lastDt:
+			report.pop(0)
+
+	return report, granularity
+
+
+
+
+def _addMonths(dt, months):
+	"""Returns the (year, month) which is `months` months after dt."""
+	month = dt.month - 1 + months
+	return dt.year + month // 12, month % 12 + 1
+
+
+
+
+def _parseReport(raw, finalMonth, granularity, dropLast=True, sections=None):
+	"""
+	Parses the time series of one file in a single pass, keeping lines up to
+	and including the first one in finalMonth, a (year, month) tuple. raw can
+	be the whole file as a string, or any iterable of its lines, such as an
+	open response, which is then only read as far as needed.
+	If sections is a dict, the rest of the file is read too, and the sections
+	after the time series are parsed into it (see _parseSections).
+	Returns the lines and the granularity actually found in the file, or an
+	empty list and the granularity if the data is incorrect.
+	"""
+	report = []
+	drop = 1 if dropLast else 0
+	lines = _iterLines(raw)
+	pastSeries = False
+	for j, rawLine in enumerate(lines):
 		#check if the actual granularity matches the desired granularity. If
 		#no, then alter to match and continue
-		trueGran = lines[4][0]
-		if granularity == "d" and trueGran == "Week":
-			print("Error: The file returned from Google Trends doesn't match your desired granularity."
-				" Altering your desired granularity to match.")
-			granularity = 'w'
-		if granularity == "w" and trueGran == "Day":
-			print("Error: The file returned from Google Trends doesn't match your desired granularity."
-				" Altering your desired granularity to match.")
-			granularity = 'd'
-
-
-		#prep data
-
-		#remove header
-		lines = lines[5:]
-
-		#remove country data
-		for j, line in enumerate(lines):
-			if line[0] == "":	#checks if line is empty
-				lines = lines[:j]
-				break
-			else:
-				continue
-
-		#remove 2nd month data (except 1st day)
-		for j, line in enumerate(lines):
-			try:
+		if j == 4:
+			trueGran = rawLine.split(",", 1)[0]
+			if granularity == "d" and trueGran == "Week":
+				logging.warning("The file returned from Google Trends doesn't match your desired granularity."
+					" Altering your desired granularity to match.")
+				granularity = 'w'
+			if granularity == "w" and trueGran == "Day":
+				logging.warning("The file returned from Google Trends doesn't match your desired granularity."
+					" Altering your desired granularity to match.")
+				granularity = 'd'
+		#skip header
+		if j < 5:
+			continue
 
-				if granularity == 'd':
-					dt = datetime.datetime.strptime(line[0], "%Y-%m-%d")
-				else: #granularity == 'w':
-					dt = line[0][:-13]
-					dt = datetime.datetime.strptime(dt, "%Y-%m-%d")
-
-				finalMonth = startDt.month + (i+1)*countMonth	#would just use % operator for this
-				while finalMonth > 12:							#however it doesn't work bc the range
-					finalMonth -= 12							#runs from 1-12, not 0-11
-
-				if dt.month == finalMonth:
-					lines = lines[:j+1] #+1 bc we want to keep this first day/week/month
-					break
-				else:
-					continue
-			#If there is a ValueError, then there is incorrectly week data,
-			#and so we should just return an empty array, bc the data is not
-			#correct to begin with.
-			except ValueError:
-				print("Value Error: Unable to format datetime correctly from file, returning empty list.")
-				return []
+		line = rawLine.rstrip("\r\n").split(",")
+		#country data starts after the first empty line
+		if line[0] == "":
+			pastSeries = True
+			break
 
-		#Checks that there is data. If not, then returns empty list.
-		if len(lines) == 0:
-			return []
+		try:
+			dt = _parseDate(line[0], granularity)
+			newLine = [dt]
+			#Removes the final item in the line, which is the constant term
+			#This makes sure that there is the same scaling.
+			for k in range(1, len(line)-drop):
+				newLine.append(int(line[k]))
+		#If there is a ValueError, then there is incorrectly week data,
+		#and so we should just return an empty array, bc the data is not
+		#correct to begin with.
+		except ValueError:
+			logging.error("Value Error: Unable to format datetime correctly from file, returning empty list.")
+			return [], granularity
+
+		report.append(newLine)
+		#keep the first day/week of the following month, then stop.
+		if (dt.year, dt.month) >= finalMonth:
+			break
 
-		#Saves data to list, which is element of larger list.
-		report = []
-		for line in lines:
-			try:
-				newLine = []
-				if granularity == 'd':
-					dt = datetime.datetime.strptime(line[0], "%Y-%m-%d")
-				else: #granularity == 'w':
-					dt = line[0][:-13]
-					dt = datetime.datetime.strptime(dt, "%Y-%m-%d")
-				newLine.append(dt)
-				#Removes the final item in the line, which is the constant term
-				#This makes sure that there is the same scaling.
-				for j in range(1, len(line)-1):
-					value = int(line[j])
-					newLine.append(value)
-				report.append(newLine)
-
-			except ValueError:	#issue with data, return empty list
-				print("Value Error: Unable to format datetime correctly from file, returning empty list.")
-				return []
+	if sections is not None and report:
+		_parseSections(lines, sections, pastSeries)
+	return report, granularity
 
-		reportData.append(report)
 
-	return reportData
+def _parseSections(lines, sections, pastSeries=True):
+	"""
+	Parses the sections which follow the time series of a file, such as the
+	top regions, top searches and rising searches of each term, out of the
+	rest of its lines. Each is added to sections as its title mapped to a
+	list of its rows, which are [label, value, ...] with the values that are
+	whole numbers as ints, and the others (like "Breakout") as strings.
+	Lines are read as csv, so labels such as "Washington, D.C." are quoted.
+	The first row of a section is taken as its column names, such as
+	"Region,foo", if none of its values is a number, a percentage or
+	"Breakout".
+	Unless pastSeries, the lines up to the first empty one are skipped.
+	"""
+	title = None
+	newBlock = True
+	for rawLine in lines:
+		line = rawLine.rstrip("\r\n")
+		if not pastSeries:
+			pastSeries = line == ""
+			continue
+		if line == "":
+			newBlock = True
+			continue
+		fields = next(csv.reader([line]))
+		if newBlock and len(fields) == 1:
+			#a title on its own, such as "Top regions for foo".
+			title = fields[0]
+			sections[title] = []
+		elif title is not None and not sections[title] and \
+				not any(_isSectionValue(value) for value in fields[1:]):
+			#the column names of the section, such as "Region,foo".
+			pass
+		elif title is not None:
+			sections[title].append([fields[0]] +
+				[int(value) if value.isdigit() else value for value in fields[1:]])
+		newBlock = False
+
+
+def _isSectionValue(text):
+	"""Tells whether text is a value of a section row, like "45", "+250%" or "Breakout"."""
+	text = text.strip()
+	return text.replace(",", "").isdigit() or text == "Breakout" or \
+		(text.endswith("%") and text.lstrip("+-").rstrip("%").replace(",", "").isdigit())
+
+
+def _iterLines(raw):
+	"""Iterates over the lines of raw, decoding them if needed."""
+	if isinstance(raw, (str, type(u""))):
+		try:
+			raw = io.StringIO(raw)
+		except TypeError:	#Py2 str
+			raw = io.BytesIO(raw)
+	for line in raw:
+		if isinstance(line, bytes) and not isinstance(line, str):	#Py3 bytes
+			line = line.decode("utf-8")
+		yield line
+
+
+def _parseDate(text, granularity):
+	"""
+	Parses "YYYY-MM-DD" for daily data, or the start of "YYYY-MM-DD - YYYY-MM-DD"
+	for weekly data. Dates in exactly this form skip the much slower strptime.
+	"""
+	if granularity == 'w':
+		text = text.split(" - ", 1)[0]
+	if len(text) != 10 or text[4] != "-" or text[7] != "-" or \
+			not (text[0:4] + text[5:7] + text[8:10]).isdigit():
+		return datetime.datetime.strptime(text, "%Y-%m-%d")
+	return datetime.datetime(int(text[0:4]), int(text[5:7]), int(text[8:10]))
+
 
 
 
@@ -367,25 +1472,38 @@ def _scaleRep(reportData):
 	"""
 	baseMonth = reportData[0][0]
 	for i in range(1, len(reportData)):
-		testMonth = reportData[i][0]
-		factor = 0.0
-		for j in range(len(baseMonth)):
-			old = baseMonth[j][len(baseMonth[j])-1] #last term in line
-			new = testMonth[j][len(testMonth[j])-1]	#ditto
-			if abs(new - old) > 3:
-				#^means that there is a large difference and we need to scale
-				old = 1.0 if old == 0.0 else old
-				new = 1.0 if new == 0.0 else new
-				factor = old / float(new)
-				break
-		if abs(factor) >  0.0003:	#in case floating point error
-			for j in range(len(reportData[i])):
-				for k in range(len(reportData[i][j])):
-					for l in range(1, len(reportData[i][j][k])):
-						reportData[i][j][k][l] = factor*reportData[i][j][k][l]
+		factor = _scaleFactor(baseMonth, reportData[i][0])
+		for j in range(len(reportData[i])):
+			_scaleLines(reportData[i][j], factor)
 	return reportData
 
 
+def _scaleFactor(baseMonth, testMonth):
+	"""
+	Returns the factor which brings testMonth to the scale of baseMonth, both
+	first files of their segments, or 0.0 if they already agree.
+	"""
+	factor = 0.0
+	for j in range(len(baseMonth)):
+		old = baseMonth[j][len(baseMonth[j])-1] #last term in line
+		new = testMonth[j][len(testMonth[j])-1]	#ditto
+		if abs(new - old) > 3:
+			#^means that there is a large difference and we need to scale
+			old = 1.0 if old == 0.0 else old
+			new = 1.0 if new == 0.0 else new
+			factor = old / float(new)
+			break
+	return factor
+
+
+def _scaleLines(lines, factor):
+	"""Multiplies the values of each line by factor, from _scaleFactor."""
+	if abs(factor) >  0.0003:	#in case floating point error
+		for line in lines:
+			for l in range(1, len(line)):
+				line[l] = factor*line[l]
+
+
 def _merge(reportData):
 	"""Merges the separate reports into one large report."""
 	merged = reportData[0]
@@ -398,6 +1516,49 @@ def _merge(reportData):
 	return merged
 
 
+def _mergePlanned(reportData, groups, terms):
+	"""
+	Merges the reports of the groups from _planTerms into one report with a
+	column per term, in the order of terms. Each window of a group is scaled
+	to the same window of the group before it by the sums of their shared
+	anchor. Returns the report and the values of its first line, which
+	_startFrom uses to keep the terms on a common scale.
+	"""
+	for g in range(1, len(groups)):
+		for i in range(len(reportData[g])):
+			#the group before has already been scaled, so this chains.
+			prev = 0.0
+			for line in reportData[g-1][i]:
+				prev += line[len(line)-1]
+			cur = 0.0
+			for line in reportData[g][i]:
+				cur += line[1]
+			factor = (prev or 1.0) / float(cur or 1.0)
+			for line in reportData[g][i]:
+				for k in range(1, len(line)):
+					line[k] = factor*line[k]
+
+	#where each term is found: (group, column)
+	columns = {}
+	for g in range(len(groups)):
+		for k in range(len(groups[g])):
+			columns.setdefault(groups[g][k], (g, k+1))
+
+	merged = []
+	for i in range(len(reportData[0])):
+		window = []
+		for j in range(len(reportData[0][i])):
+			newLine = [reportData[0][i][j][0]]
+			for term in terms:
+				g, k = columns[term]
+				newLine.append(reportData[g][i][j][k])
+			window.append(newLine)
+		merged.append(window)
+
+	inits = [1 if value == 0 else value for value in merged[0][0][1:]]
+	return merged, inits
+
+
 
 def _calcPerc(numFiles, report):
 	"""Calculates the percent change between subsequent data points."""
@@ -429,7 +1590,9 @@ def _calcPerc(numFiles, report):
 				#to avoid divide-by-zero error, set all 0's in data to 1's
 				line[k] = 1 if line[k] == 0 else line[k]
 				prevLine[k] = 1 if prevLine[k] == 0 else prevLine[k]
-				perc = Fraction(line[k], prevLine[k])
+				#values of scaled reports are floats, which Fraction only
+				#accepts one at a time.
+				perc = Fraction(line[k]) / Fraction(prevLine[k])
 				newLine.append(perc)
 			percTrend.append(newLine)
 
@@ -457,6 +1620,96 @@ def _reformTrend(percs, inits):
 	return trend
 
 
+def _chainWindow(window, levels=None):
+	"""
+	Chains the lines of one merged window onto levels, the last levels of the
+	window before (None for the first window), exactly as _calcPerc and
+	_reformTrend chain whole reports. Returns the new lines, without the one
+	shared with the window before, and the last levels.
+	"""
+	percs = _calcPerc(1, [window])
+	if levels is not None:
+		percs[0] = [percs[0][0]] + levels
+	trend = _reformTrend(percs, None)
+	if levels is not None:
+		trend = trend[1:]
+	if not trend:
+		return trend, levels
+	return trend, trend[-1][1:]
+
+
+def _startFrom(trend, inits):
+	"""Multiplies each term of trend by its value in inits."""
+	for line in trend:
+		for j in range(1, len(line)):
+			line[j] = line[j]*inits[j-1]
+	return trend
+
+
+
+def _anchorMonth(old):
+	"""
+	Returns the (year, month) from which the dates at the end of old hold at
+	least MIN_ANCHOR of every term's volume, so that each term can be chained
+	on its own (see _chain), or None if some term never has that much.
+	"""
+	sums = [0.0]*(len(old[-1])-1)
+	for line in reversed(old):
+		for j in range(1, len(line)):
+			sums[j-1] += line[j]
+		if min(sums) >= MIN_ANCHOR:
+			return line[0].year, line[0].month
+	return None
+
+
+def _chain(old, new):
+	"""
+	Appends the levels in new which come after the last date in old, scaled
+	so that both agree over the dates they share. Returns an empty list if
+	new does not contain the last date of old, or if a term cannot be scaled.
+
+	Each term is scaled by the ratio of its old to its new values summed
+	over the shared dates, rather than on the last date alone, where a value
+	which was rounded to 0 or close to it would zero or distort the whole
+	extension. The terms of data collected with packing='fixed' each start
+	from their own level, so no term can be scaled by the others: a term
+	whose old values over the shared dates add up to less than MIN_ANCHOR,
+	or whose new values add up to 0, cannot be scaled (see _anchorMonth).
+	"""
+	last = old[-1]
+	for k, line in enumerate(new):
+		if line[0] == last[0]:
+			break
+	else:
+		return []
+
+	#the dates old and new have in common, up to the last old one.
+	oldByDate = dict((line[0], line) for line in old[-(k+1):])
+	shared = [(oldByDate[line[0]], line) for line in new[:k+1] if line[0] in oldByDate]
+	oldSums = [0.0]*(len(last)-1)
+	newSums = [0.0]*(len(last)-1)
+	for oldLine, newLine in shared:
+		for j in range(1, len(last)):
+			oldSums[j-1] += oldLine[j]
+			newSums[j-1] += newLine[j]
+
+	factors = []
+	for oldSum, newSum in zip(oldSums, newSums):
+		if oldSum < MIN_ANCHOR or newSum <= 0:
+			return []
+		factors.append(oldSum / newSum)
+
+	trend = list(old)
+	for line in new[k+1:]:
+		newLine = [line[0]]
+		for j in range(1, len(line)):
+			newLine.append(line[j] * factors[j-1])
+		trend.append(newLine)
+
+	return trend
+
+
+
 
 def _calcSum(data):
 	"""
@@ -505,26 +1758,28 @@ def _normalize(data):
 
 def _trim(data, endDt):
 	"""Removes datetime-value pairs >= endDt to the precision of one month."""
-	index = 0
-	for i,line in enumerate(data):
-		if line[0].month == endDt.month and line[0].year == endDt.year:
-			index = i
+	return data[0:_trimLength([line[0] for line in data], endDt)]
+
+
+def _trimLength(dates, endDt):
+	"""Returns the number of dates to keep when trimming at endDt."""
+	for i, dt in enumerate(dates):
+		if dt.month == endDt.month and dt.year == endDt.year:
 			break
-	return data[0:i]
+	return i
 
 
 
 def _addHeader(data, terms):
+	"""
+	Adds the header line of every term. Summed data has a single column, but
+	its header still lists each term, which is how a saved file is known to
+	be summed when it is read back.
+	"""
 	header = ["date"]
-	if sum == True:
-		other = ""
-		for term in terms:
-			other += " "+term
-		header.append(other)
-	else:
-		for term in terms:
-			header.append(term)
-	
+	for term in terms:
+		header.append(term)
+
 	trend = []
 	trend.append(header)
 	for line in data:
@@ -545,9 +1800,20 @@ def _deleteFiles(path, numFiles):
 
 
 
-def _save(path, data):
-	"""Writes data to file."""
-	file = open(path, "wb")
+def _save(path, data, params=None):
+	"""
+	Writes data to file, as a TrendStore with params in its header if the
+	path ends in ".gtr", and as csv otherwise.
+	"""
+	if _store.isStore(path):
+		frame = TrendFrame.fromList(data)
+		_store.save(path, frame.dates, frame.values, frame.terms, params)
+		return
+
+	try:
+		file = open(path, "w", newline="")
+	except TypeError:	#Py2 has no newline argument, and needs "wb"
+		file = open(path, "wb")
 	writer = csv.writer(file, delimiter=",")
 
 	#header line
@@ -566,6 +1832,9 @@ def _save(path, data):
 
 def _read(path):
 	"""Reads data into list."""
+	if _store.isStore(path):
+		return readTrends(path)
+
 	file = open(path)
 	reader = csv.reader(file, delimiter=",")
 
@@ -579,11 +1848,19 @@ def _read(path):
 	#other lines
 	for i in range(1, len(lines)):
 		newLine = []
-		dt = datetime.datetime.strptime(lines[i][0], "%Y-%m-%d")
+		dt = _parseDate(lines[i][0], 'd')
 		newLine.append(dt)
 		for j in range(1, len(lines[i])):
 			newLine.append(float(lines[i][j]))
 		data.append(newLine)
 	file.close()
 
-	return data
\ No newline at end of file
+	return data
+
+
+
+
+#The asyncio API needs Python 3.5 or later.
+if sys.version_info >= (3, 5):
+	from _async import (AsyncDownloader, AsyncHttpTransport, AsyncSingleFlight,
+		asyncSessionPool, collectTrendsAsync, collectRawTrendsAsync)
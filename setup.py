@@ -10,7 +10,9 @@ with open(path.join(here, 'README.rst')) as f:
 setup(
 	name="gtrends",
 	version = "0.2.1",
-	py_modules = ["gtrends", "_login"],
+	py_modules = ["gtrends", "_async", "_login", "_cache", "_frame", "_limit",
+		"_batch", "_checkpoint", "_flight", "_levels", "_metrics", "_reader",
+		"_standin", "_store", "_stream", "_transport", "_vector"],
 	description = "Automated Google Trends downloader",
 	author = "Eric Salina",
 	url = "https://github.com/ecsalina/gtrends",
@@ -18,6 +20,8 @@ setup(
 	long_description = long_description,
 	keywords = ['Google', 'Trends', 'API', 'gtrends'],
 	install_requires = ['six'],
+	extras_require = {'numpy': ['numpy']},
+	entry_points = {'console_scripts': ['gtrends-batch = _batch:main']},
 	classifiers = [
 		"Development Status :: 5 - Production/Stable",
 		"Intended Audience :: Developers",
@@ -0,0 +1,83 @@
+import asyncio
+import datetime
+import socket
+import pytest
+import gtrends
+from http.cookiejar import CookieJar
+from _async import AsyncHttpTransport, asyncSessionPool
+
+#SETUP
+
+startDt = datetime.datetime(2010, 1, 1)
+endDt = datetime.datetime(2011, 1, 1)
+
+pytestmark = pytest.mark.server(login=False)
+
+@pytest.fixture
+def server(server):
+	asyncSessionPool.setTransport(lambda: AsyncHttpTransport(server.url, connections=4))
+	yield server
+	asyncSessionPool.setTransport(AsyncHttpTransport)
+
+
+#TEST SAME RESULTS?
+
+def testCollectTrendsAsync(server):
+	terms = ["banana", "pie", "mango", "kiwi", "fig"]
+	expected = gtrends.collectTrends("user", "secret", list(terms), startDt, endDt)
+	trends = asyncio.run(gtrends.collectTrendsAsync("user", "secret", list(terms),
+		startDt, endDt))
+	assert trends == expected
+
+def testCollectRawTrendsAsync(server):
+	expected = gtrends.collectRawTrends("user", "secret", ["banana"], startDt, endDt)
+	report = asyncio.run(gtrends.collectRawTrendsAsync("user", "secret", ["banana"],
+		startDt, endDt))
+	assert report == expected
+
+def testBadArgs(server):
+	assert asyncio.run(gtrends.collectTrendsAsync("user", "secret", [], startDt, endDt)) == []
+
+
+#TEST MANY JOBS
+
+def testManyJobs(server):
+	async def run():
+		return await asyncio.gather(*[gtrends.collectTrendsAsync("user", "secret",
+			["term%d" % i], startDt, endDt, granularity='w') for i in range(50)])
+	results = asyncio.run(run())
+	assert all(len(trends) == len(results[0]) > 50 for trends in results)
+	#one login for every job.
+	assert server.logins == 1
+
+def testBadLogin(server):
+	with pytest.raises(Exception):
+		asyncio.run(gtrends.collectRawTrendsAsync("user", "wrong", ["banana"], startDt, endDt))
+
+def testCoalesced(server):
+	terms = ["banana", "pie"]
+	async def collect():
+		return await asyncio.gather(*[gtrends.collectTrendsAsync("user", "secret",
+			list(terms), startDt, endDt) for i in range(3)])
+	requests = server.requests
+	results = asyncio.run(collect())
+	assert results[0] == results[1] == results[2]
+	#the 4 requests of the login, then each of the 6 files once.
+	assert server.requests - requests == 4 + 6
+
+
+#TEST TIMEOUT
+
+def testStalledServer():
+	#a server which accepts connections, but never answers.
+	stalled = socket.socket()
+	stalled.bind(("127.0.0.1", 0))
+	stalled.listen(1)
+	transport = AsyncHttpTransport("http://127.0.0.1:%d" % stalled.getsockname()[1],
+		timeout=0.2)
+	transport.prepare(CookieJar(), [])
+	try:
+		with pytest.raises(asyncio.TimeoutError):
+			asyncio.run(transport.open("http://www.google.com/trends/"))
+	finally:
+		stalled.close()
@@ -0,0 +1,110 @@
+import os
+import sys
+import json
+import datetime
+import subprocess
+import pytest
+import gtrends
+import _batch
+
+#SETUP
+
+jobs = [{"id": "fruit", "terms": ["banana", "pie"], "start": "2014-01", "end": "2014-07"},
+	{"id": "veg", "terms": "carrot, leek", "start": "2014-01-01", "end": "2014-07-01",
+		"granularity": "w", "geo": "US"},
+	{"id": "summed", "terms": ["banana", "pie"], "start": "2014-01", "end": "2014-07",
+		"sum": True}]
+
+def writeManifest(tmpdir, name, text):
+	path = tmpdir.join(name)
+	path.write(text)
+	return str(path)
+
+
+#TEST MANIFESTS
+
+def testJsonl(tmpdir):
+	path = writeManifest(tmpdir, "jobs.jsonl", "\n".join(json.dumps(job) for job in jobs) + "\n\n")
+	loaded = _batch.loadManifest(path)
+	assert [job["id"] for job in loaded] == ["fruit", "veg", "summed"]
+	assert loaded[1]["terms"] == ["carrot", "leek"]
+	assert loaded[1]["startDt"] == datetime.datetime(2014, 1, 1)
+	assert loaded[0]["granularity"] == "d" and loaded[1]["granularity"] == "w"
+	assert loaded[2]["sum"] is True and loaded[0]["output"] is None
+
+def testDefaults(tmpdir):
+	path = writeManifest(tmpdir, "jobs.json", json.dumps({"defaults": {"geo": "GB",
+		"start": "2014-01", "end": "2014-07"}, "jobs": [{"terms": ["a"]},
+		{"terms": ["b"], "geo": "US"}]}))
+	loaded = _batch.loadManifest(path)
+	assert [job["id"] for job in loaded] == ["job00000", "job00001"]
+	assert [job["geo"] for job in loaded] == ["GB", "US"]
+
+def testInvalid(tmpdir):
+	for job, message in [({"terms": ["a"], "start": "2014-01"}, "no end"),
+						({"terms": ["a"], "start": "2014", "end": "2014-07"}, "bad date"),
+						({"terms": ["a"], "start": "2014-01", "end": "2014-07", "gprop": ""},
+							"unknown fields: gprop")]:
+		path = writeManifest(tmpdir, "bad.json", json.dumps([job]))
+		with pytest.raises(ValueError) as e:
+			_batch.loadManifest(path)
+		assert message in str(e.value)
+	path = writeManifest(tmpdir, "bad.jsonl", json.dumps(jobs[0]) + "\n{\n")
+	with pytest.raises(ValueError) as e:
+		_batch.loadManifest(path)
+	assert "line 2" in str(e.value)
+
+
+#TEST STARTUP
+
+def testLazyImports(tmpdir):
+	#checking a manifest must not load the network or numeric modules.
+	path = writeManifest(tmpdir, "jobs.json", json.dumps(jobs))
+	code = ("import sys, _batch; assert _batch.main([%r, '--check']) == 0; "
+		"print(sorted(m for m in ('gtrends', 'numpy', '_transport', 'six') if m in sys.modules))"
+		% path)
+	out = subprocess.check_output([sys.executable, "-c", code],
+		cwd=os.path.dirname(os.path.abspath(_batch.__file__)))
+	assert out.decode().strip().splitlines()[-1] == "[]"
+
+
+#TEST RUNNING
+
+def testRun(server, tmpdir):
+	path = writeManifest(tmpdir, "jobs.json", json.dumps(jobs))
+	out = str(tmpdir.join("out"))
+	argv = [path, "--out", out, "--workers", "3", "--shard-size", "2",
+		"--username", "user", "--password", "secret"]
+	assert _batch.main(argv) == 0
+	#the outputs are the same as from collectTrends, 2 jobs per directory.
+	assert sorted(os.listdir(out)) == ["000", "001", "summary.json"]
+	assert sorted(os.listdir(os.path.join(out, "000"))) == ["fruit.csv", "veg.csv"]
+	expected = gtrends.collectTrends("user", "secret", ["banana", "pie"],
+		datetime.datetime(2014, 1, 1), datetime.datetime(2014, 7, 1))
+	assert gtrends._read(os.path.join(out, "000", "fruit.csv")) == expected
+
+	with open(os.path.join(out, "summary.json")) as f:
+		summary = json.load(f)
+	assert summary["jobs"] == 3 and summary["succeeded"] == 3 and summary["failed"] == []
+	assert summary["requests"] > 0 and summary["rows"] > 0
+	assert sorted(result["id"] for result in summary["results"]) == ["fruit", "summed", "veg"]
+	#one login was shared by every job.
+	assert server.logins <= 1
+
+def testFailures(server, tmpdir):
+	bad = {"id": "bad", "terms": ["banana"], "start": "2014-07", "end": "2014-01"}
+	path = writeManifest(tmpdir, "jobs.json", json.dumps([jobs[0], bad]))
+	out = str(tmpdir.join("out"))
+	output = str(tmpdir.join("fruit.csv"))
+	loaded = _batch.loadManifest(path)
+	loaded[0]["output"] = output
+	summary = _batch.runJobs(loaded, "user", "secret", out, workers=2)
+	assert summary["succeeded"] == 1
+	assert [failure["id"] for failure in summary["failed"]] == ["bad"]
+	assert os.path.exists(output)
+
+def testNoLogin(tmpdir, monkeypatch):
+	monkeypatch.delenv("GTRENDS_USERNAME", raising=False)
+	monkeypatch.delenv("GTRENDS_PASSWORD", raising=False)
+	path = writeManifest(tmpdir, "jobs.json", json.dumps(jobs))
+	assert _batch.main([path]) == 2
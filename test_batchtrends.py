@@ -0,0 +1,30 @@
+import datetime
+import gtrends
+
+#SETUP
+
+startDt = datetime.datetime(2010, 1, 1)
+endDt = datetime.datetime(2010, 4, 1)
+
+
+#TEST SHARED DOWNLOADS
+
+def testCollectTrendsBatch(server):
+	jobs = [["banana", "pie", "mango", "kiwi", "fig"], ["banana", "pie", "mango", "kiwi"]]
+	single = [gtrends.collectTrends("user", "secret", list(terms), startDt, endDt)
+		for terms in jobs]
+	requests = server.requests
+	batch = gtrends.collectTrendsBatch("user", "secret", jobs + [[]], startDt, endDt)
+	assert batch == single + [[]]
+	#both jobs share their first segment, so only 2 segments x 2 files.
+	assert server.requests - requests == 4
+
+def testJobOptions(server, tmpdir):
+	path = str(tmpdir.join("summed.csv"))
+	batch = gtrends.collectTrendsBatch("user", "secret", [["banana", "pie"],
+		{"terms": ["banana", "pie"], "sum": True, "savePath": path}], startDt, endDt)
+	assert batch[0] == gtrends.collectTrends("user", "secret", ["banana", "pie"], startDt,
+		endDt)
+	assert batch[1] == gtrends.collectTrends("user", "secret", ["banana", "pie"], startDt,
+		endDt, sum=True)
+	assert open(path).readline().strip() == "date,banana,pie"
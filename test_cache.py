@@ -0,0 +1,107 @@
+import os
+import time
+import datetime
+from _cache import ResponseCache, _isClosed, _isReport, _normalize
+
+#SETUP
+
+url = "https://www.google.com/trends/trendsReport?hl=en-US&q="
+
+def query(term, month=1, year=2010, length="3m"):
+	return (url + term + "&geo=&cat=&gprop=&cmpt=q&content=1&export=1&date=" +
+		str(month) + "%2F" + str(year) + "%20" + length)
+
+def report(term):
+	return "\n".join(["Web Search interest: " + term, "Worldwide; Jan 2010 - Apr 2010", "",
+		"Interest over time", "Day," + term, "2010-01-01,40", "2010-01-02,50", ""])
+
+today = datetime.date.today()
+openQuery = query("banana", today.month, today.year, "1m")
+
+
+#TEST EXPIRY
+
+def testClosedNeverExpires(tmpdir):
+	cache = ResponseCache(str(tmpdir), ttl=-10)
+	cache.put(query("banana"), report("banana"))
+	assert cache.get(query("banana")) == report("banana")
+	assert cache.hits == 1 and cache.misses == 0
+
+def testOpenExpires(tmpdir):
+	cache = ResponseCache(str(tmpdir), ttl=-10)
+	cache.put(openQuery, report("banana"))
+	assert cache.get(openQuery) is None
+	assert cache.misses == 1
+	#the expired file is removed.
+	assert os.listdir(str(tmpdir)) == []
+	cache = ResponseCache(str(tmpdir), ttl=60)
+	cache.put(openQuery, report("banana"))
+	assert cache.get(openQuery) == report("banana")
+
+def testIsClosed():
+	assert _isClosed(query("banana", 1, 2010, "3m"), datetime.date(2010, 4, 1))
+	#the window reaches into the current month.
+	assert not _isClosed(query("banana", 1, 2010, "3m"), datetime.date(2010, 3, 31))
+	assert not _isClosed(url + "banana")
+
+
+#TEST EVICTION
+
+def testEvictsLeastRecentlyUsed(tmpdir):
+	size = len(report("banana")) + 2
+	cache = ResponseCache(str(tmpdir), maxBytes=int(size * 2.5))
+	cache.put(query("banana"), report("banana"))
+	cache.put(query("cherry"), report("cherry"))
+	#banana is used after cherry, so cherry is the least recently used.
+	now = time.time()
+	os.utime(cache._file(query("banana")), (now - 100, now - 100))
+	os.utime(cache._file(query("cherry")), (now - 200, now - 200))
+	cache.put(query("grapes"), report("grapes"))
+	assert cache.get(query("cherry")) is None
+	assert cache.get(query("banana")) == report("banana")
+	assert cache.get(query("grapes")) == report("grapes")
+
+def testOverwrite(tmpdir):
+	size = len(report("banana")) + 2
+	cache = ResponseCache(str(tmpdir))
+	#storing the same query again replaces its file, and its size.
+	for i in range(3):
+		cache.put(query("banana"), report("banana"))
+	assert cache._size == size
+	cache.put(query("cherry"), report("cherry"))
+	assert cache._size == 2 * size == cache._scan()[1]
+	assert cache.get(query("banana")) == report("banana")
+
+def testClear(tmpdir):
+	cache = ResponseCache(str(tmpdir))
+	cache.put(query("banana"), report("banana"))
+	cache.clear()
+	assert cache.get(query("banana")) is None
+	assert cache._size == 0
+
+
+#TEST KEYS
+
+def testNormalizedKeys(tmpdir):
+	cache = ResponseCache(str(tmpdir))
+	cache.put(query("banana"), report("banana"))
+	#the same parameters in another order, with empty ones left out.
+	same = url.split("?")[0] + "?date=1%2F2010%203m&export=1&content=1&cmpt=q&q=banana&hl=en-US"
+	assert _normalize(same) == _normalize(query("banana"))
+	assert cache.get(same) == report("banana")
+	assert cache.get(query("cherry")) is None
+	#the order of the terms sets the columns, so it is kept.
+	assert _normalize(url + "banana%2Cpie") != _normalize(url + "pie%2Cbanana")
+
+
+#TEST WHAT IS CACHED
+
+def testErrorPagesNotCached(tmpdir):
+	cache = ResponseCache(str(tmpdir))
+	for page in ["<html><body>Sign in</body></html>", "You have reached your quota limit",
+				""]:
+		assert not _isReport(page)
+		cache.put(query("banana"), page)
+		assert cache.get(query("banana")) is None
+	assert _isReport(report("banana"))
+	assert os.listdir(str(tmpdir)) == []
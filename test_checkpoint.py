@@ -0,0 +1,102 @@
+import os
+import datetime
+import pytest
+import gtrends
+from _checkpoint import Checkpoint
+
+#SETUP
+
+pytestmark = pytest.mark.server(errorRate=0.3, seed=3)
+
+startDt = datetime.datetime(2010, 1, 1)
+endDt = datetime.datetime(2011, 1, 1)
+#2 segments of 6 windows.
+numFiles = 12
+
+def collect(terms, path, workers=1):
+	return gtrends.collectTrends("user", "secret", terms, startDt, endDt, workers=workers,
+		checkpoint=path)
+
+
+#TEST RESUMING
+
+def testResume(server, terms, tmpdir):
+	path = str(tmpdir.join("job"))
+	#the other downloads carry on when one fails.
+	with pytest.raises(Exception):
+		collect(terms, path, workers=4)
+	saved = Checkpoint(path).begin(*checkpointJob(terms))
+	assert 0 < saved < numFiles
+
+	server.error_rate = 0.0
+	requests = server.requests
+	trends = collect(terms, path)
+	assert server.requests - requests == numFiles - saved
+	assert trends == gtrends.collectTrends("user", "secret", terms, startDt, endDt)
+
+	#everything is there now.
+	requests = server.requests
+	assert collect(terms, path) == trends
+	assert server.requests == requests
+	assert Checkpoint(path).begin(*checkpointJob(terms)) == numFiles
+
+def testStatus(server, terms, tmpdir):
+	path = str(tmpdir.join("job"))
+	server.error_rate = 0.0
+	collect(terms, path)
+	assert Checkpoint(path).status() == {"files": numFiles, "saved": numFiles, "parsed": numFiles,
+		"failed": 0}
+
+def testBadFile(server, terms, tmpdir):
+	path = str(tmpdir.join("job"))
+	server.error_rate = 0.0
+	trends = collect(terms, path)
+	#a file which cannot be parsed is dropped, and downloaded again.
+	name = os.path.join(path, "s001-w0002.csv")
+	data = open(name).read().replace("2010-05-0", "2010-05-x")
+	open(name, "w").write(data)
+	assert collect(terms, path) == []
+	assert not os.path.exists(name)
+	checkpoint = Checkpoint(path)
+	checkpoint.begin(*checkpointJob(terms))
+	assert checkpoint.status()["failed"] == 1
+	assert checkpoint.status()["saved"] == numFiles - 1
+	requests = server.requests
+	assert collect(terms, path) == trends
+	assert server.requests == requests + 1
+
+def testOtherJob(server, terms, tmpdir):
+	path = str(tmpdir.join("job"))
+	server.error_rate = 0.0
+	collect(terms, path)
+	gtrends.collectTrends("user", "secret", terms[:2], startDt, endDt, checkpoint=path)
+	assert not os.path.exists(os.path.join(path, "s001-w0000.csv"))
+
+def testStream(server, terms, tmpdir):
+	path = str(tmpdir.join("job"))
+	server.error_rate = 0.0
+	collect(terms, path)
+	requests = server.requests
+	gtrends.collectTrendsStream("user", "secret", terms, startDt, endDt,
+		str(tmpdir.join("out.csv")), checkpoint=path)
+	assert server.requests == requests
+
+def testOtherFiles(server, terms, tmpdir):
+	#a directory which already holds other files keeps them.
+	path = tmpdir.join("job")
+	path.join("data").ensure(dir=True)
+	path.join("data", "notes.txt").write("notes")
+	path.join("thesis.tex").write("tex")
+	path = str(path)
+	server.error_rate = 0.0
+	trends = collect(terms, path)
+	gtrends.collectTrends("user", "secret", terms[:2], startDt, endDt, checkpoint=path)
+	Checkpoint(path).clear()
+	assert sorted(os.listdir(path)) == ["data", "thesis.tex"]
+	assert open(os.path.join(path, "data", "notes.txt")).read() == "notes"
+	assert trends
+
+def checkpointJob(terms):
+	queries, numSegs, files, countMonth = gtrends._planQueries(terms, startDt, endDt, 'd',
+		'', '', '', '')
+	return queries, files
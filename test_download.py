@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import os
 import pytest
 import getpass
 import datetime
@@ -6,11 +7,22 @@ import gtrends
 
 #SETUP
 
-username = getpass.getpass("username: ")
-password = getpass.getpass("password: ")
+#By default the tests run against a local stand-in for Google. Set
+#GTRENDS_LIVE=1 to run them against Google itself with a real login.
+if os.environ.get("GTRENDS_LIVE"):
+	username = getpass.getpass("username: ")
+	password = getpass.getpass("password: ")
+else:
+	username = "user"
+	password = "secret"
 startDt = datetime.datetime(year=2006, month=1, day=1)
 #countMonth = 1 for daily and 5 for weekly
 
+@pytest.fixture(autouse=True)
+def standin(request):
+	if not os.environ.get("GTRENDS_LIVE"):
+		request.getfixturevalue("server")
+
 
 #TEST DOES DOWNLOAD?
 
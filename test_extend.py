@@ -0,0 +1,107 @@
+import datetime
+import pytest
+import gtrends
+
+#SETUP
+
+terms = ["banana", "pie", "apple"]
+startDt = datetime.datetime(2014, 1, 1)
+midDt = datetime.datetime(2014, 4, 1)
+endDt = datetime.datetime(2014, 7, 1)
+
+def ratios(trends, old):
+	"""The ratio of each extended value to the old one, on the old dates."""
+	return [line[j] / oldLine[j] for line, oldLine in zip(trends[1:], old[1:])
+		for j in range(1, len(line)) if oldLine[j]]
+
+
+#TEST EXTENDING
+
+def testExtend(server, tmpdir):
+	old = gtrends.collectTrends("user", "secret", terms, startDt, midDt)
+	path = str(tmpdir.join("data.csv"))
+	trends = gtrends.extendTrends("user", "secret", old, endDt, savePath=path)
+	full = gtrends.collectTrends("user", "secret", terms, startDt, endDt)
+	assert trends[0] == ["date"] + terms
+	assert [line[0] for line in trends] == [line[0] for line in full]
+	#the old data is only rescaled.
+	assert max(ratios(trends, old)) - min(ratios(trends, old)) < 0.01
+	#the new data follows the one downloaded in one go.
+	for line, fullLine in zip(trends[1:], full[1:]):
+		for j in range(1, len(line)):
+			assert line[j] == pytest.approx(fullLine[j], abs=3.0)
+	assert gtrends._read(path) == trends
+	#a saved file is extended the same way.
+	gtrends._save(path, old)
+	assert gtrends.extendTrends("user", "secret", path, endDt) == trends
+
+def testExtendSummed(server):
+	old = gtrends.collectTrends("user", "secret", terms, startDt, midDt, sum=True)
+	trends = gtrends.extendTrends("user", "secret", old, endDt)
+	full = gtrends.collectTrends("user", "secret", terms, startDt, endDt, sum=True)
+	assert trends[0] == ["date"] + terms
+	assert all(len(line) == 2 for line in trends[1:])
+	assert [line[0] for line in trends] == [line[0] for line in full]
+	for line, fullLine in zip(trends[1:], full[1:]):
+		assert line[1] == pytest.approx(fullLine[1], abs=3.0)
+
+def testZeroAnchor(server):
+	#a term rounded to 0 on the last old date still gets its new data.
+	old = gtrends.collectTrends("user", "secret", terms, startDt, midDt)
+	old[-1][2] = 0.0
+	trends = gtrends.extendTrends("user", "secret", old, endDt)
+	new = [line[2] for line in trends[len(old):]]
+	assert new and min(new) > 0.0
+	full = gtrends.collectTrends("user", "secret", terms, startDt, endDt)
+	for line, fullLine in zip(trends[len(old):], full[len(old):]):
+		assert line[2] == pytest.approx(fullLine[2], abs=3.0)
+
+def testNearZeroTerm(server):
+	#a term with almost no volume over the last old month is chained over
+	#earlier months, on its own scale rather than that of the other terms.
+	old = gtrends.collectTrends("user", "secret", terms, startDt, midDt)
+	lastMonth = [line for line in old[1:] if line[0] >= datetime.datetime(2014, 3, 1)]
+	scale = 0.6 / sum(line[3] for line in lastMonth)
+	for line in old[1:]:
+		line[3] *= scale
+	assert gtrends._anchorMonth(old[1:]) < (2014, 3)
+	trends = gtrends.extendTrends("user", "secret", old, endDt)
+	assert trends[0] == ["date"] + terms
+	full = gtrends.collectTrends("user", "secret", terms, startDt, endDt)
+	#the term keeps its level relative to the others, on average over the new dates.
+	new = sum(line[3] for line in trends[len(old):]) / sum(line[1] for line in trends[len(old):])
+	expected = sum(line[3] for line in full[len(old):]) / sum(line[1] for line in full[len(old):])
+	assert new == pytest.approx(scale * expected, rel=0.1)
+
+def testNoVolume(server):
+	#a term without volume cannot be scaled at all.
+	old = gtrends.collectTrends("user", "secret", terms, startDt, midDt)
+	for line in old[1:]:
+		line[3] = 0.0
+	before = server.requests
+	assert gtrends.extendTrends("user", "secret", old, endDt) == []
+	assert server.requests == before
+
+def testErrors(server):
+	old = gtrends.collectTrends("user", "secret", terms, startDt, midDt)
+	assert gtrends.extendTrends("user", "secret", old, datetime.datetime(2014, 3, 1)) == []
+	assert gtrends.extendTrends("user", "secret", old[:2], endDt) == []
+
+
+#TEST CHAINING
+
+def testChain():
+	dts = [startDt + datetime.timedelta(days=i) for i in range(6)]
+	old = [[dts[0], 10.0, 0.0], [dts[1], 20.0, 0.0], [dts[2], 30.0, 0.0]]
+	new = [[dts[1], 2.0, 1.0], [dts[2], 3.0, 1.0], [dts[3], 4.0, 2.0]]
+	#a term without volume on the shared dates is not scaled by the others.
+	assert gtrends._chain(old, new) == []
+	old = [[dts[0], 10.0, 0.0], [dts[1], 20.0, 0.0], [dts[2], 30.0, 4.0]]
+	trend = gtrends._chain(old, new)
+	assert trend[:3] == old
+	#each term is scaled over both shared dates.
+	assert trend[3] == [dts[3], 40.0, 4.0]
+	assert gtrends._anchorMonth(old) == (2014, 1)
+	assert gtrends._anchorMonth([line[:2] + [0.0] for line in old]) is None
+	#the last old date is missing from new.
+	assert gtrends._chain(old, new[2:]) == []
@@ -0,0 +1,60 @@
+import time
+import random
+import datetime
+import threading
+import pytest
+import gtrends
+
+#SETUP
+
+pytestmark = pytest.mark.server(latency=0.01, jitter=0.03, seed=2)
+
+startDt = datetime.datetime(2010, 1, 1)
+endDt = datetime.datetime(2011, 1, 1)
+
+class SlowDownloader(object):
+	"""Returns each query after a random delay, counting how many run at once."""
+
+	def __init__(self):
+		self.running = 0
+		self.most = 0
+		self._random = random.Random(0)
+		self._lock = threading.Lock()
+
+	def downloadReport(self, query, cache=None):
+		with self._lock:
+			self.running += 1
+			self.most = max(self.most, self.running)
+			delay = self._random.random() * 0.02
+		time.sleep(delay)
+		with self._lock:
+			self.running -= 1
+		return "report " + query
+
+
+#TEST ORDER AND LIMIT
+
+def testFetchAllOrder():
+	queries = ["q%d" % i for i in range(20)]
+	for workers in (1, 3, 8):
+		dloader = SlowDownloader()
+		assert gtrends._fetchAll(dloader, queries, workers) == \
+			["report " + query for query in queries]
+		assert 1 <= dloader.most <= workers
+
+def testSameResults(server, terms):
+	#files arrive out of order, but are stitched in order.
+	serial = gtrends.collectTrends("user", "secret", terms, startDt, endDt)
+	before = server.requests
+	parallel = gtrends.collectTrends("user", "secret", terms, startDt, endDt, workers=8)
+	assert parallel == serial
+	assert server.requests - before == len(gtrends._planQueries(terms, startDt, endDt, 'd',
+		"", "", "", "")[0])
+
+def testFaster(server, terms):
+	start = time.time()
+	gtrends.collectTrends("user", "secret", terms, startDt, endDt)
+	serial = time.time() - start
+	start = time.time()
+	gtrends.collectTrends("user", "secret", terms, startDt, endDt, workers=12)
+	assert time.time() - start < serial / 2
@@ -0,0 +1,101 @@
+import datetime
+import threading
+import pytest
+import gtrends
+from _flight import SingleFlight
+
+#SETUP
+
+pytestmark = pytest.mark.server(latency=0.05)
+
+query = ("http://www.google.com/trends/trendsReport?&q=banana&geo=&cat=&gprop="
+	"&cmpt=q&content=1&export=1&date=1%2F2010%202m")
+#the same query, with its parameters in another order.
+sameQuery = ("http://www.google.com/trends/trendsReport?&date=1%2F2010%202m&q=banana"
+	"&export=1&content=1&cmpt=q")
+
+def together(calls):
+	"""Runs each call on its own thread, all at once, and returns their results."""
+	results = [None]*len(calls)
+	def run(i):
+		try:
+			results[i] = calls[i]()
+		except Exception as e:
+			results[i] = e
+	threads = [threading.Thread(target=run, args=(i,)) for i in range(len(calls))]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+	return results
+
+
+#TEST COALESCING
+
+def testShared():
+	flight = SingleFlight()
+	started = threading.Event()
+	release = threading.Event()
+	downloads = []
+	def download():
+		downloads.append(1)
+		started.set()
+		release.wait()
+		return "report"
+	def leader():
+		return flight.do(query, download)
+	def follower():
+		started.wait()
+		timer = threading.Timer(0.1, release.set)
+		timer.start()
+		return flight.do(sameQuery, download)
+	assert together([leader, follower]) == ["report", "report"]
+	assert len(downloads) == 1
+	assert flight.stats() == {"calls": 1, "coalesced": 1, "inFlight": 0}
+
+def testError():
+	flight = SingleFlight()
+	started = threading.Event()
+	def download():
+		started.set()
+		threading.Event().wait(0.1)
+		raise ValueError("throttled")
+	def follower():
+		started.wait()
+		return flight.do(query, download)
+	results = together([lambda: flight.do(query, download), follower])
+	assert all(isinstance(result, ValueError) for result in results)
+	#nothing is kept once the download is over.
+	assert flight.do(query, lambda: "report") == "report"
+
+def testAccounts():
+	flight = SingleFlight()
+	started = threading.Event()
+	release = threading.Event()
+	def badLogin():
+		started.set()
+		release.wait()
+		raise ValueError("bad login")
+	def other():
+		started.wait()
+		try:
+			return flight.do(query, lambda: "report", "other")
+		finally:
+			release.set()
+	#another account's download, or its error, is not shared.
+	results = together([lambda: flight.do(query, badLogin, "user"), other])
+	assert isinstance(results[0], ValueError) and results[1] == "report"
+	assert flight.stats() == {"calls": 2, "coalesced": 0, "inFlight": 0}
+
+def testCollectTrends(server):
+	terms = ["banana", "pie"]
+	startDt = datetime.datetime(2010, 1, 1)
+	endDt = datetime.datetime(2011, 1, 1)
+	requests = server.requests
+	def collect():
+		return gtrends.collectTrends("user", "secret", list(terms), startDt, endDt)
+	files = len(gtrends._planQueries(terms, startDt, endDt, 'd', '', '', '', '')[0])
+	results = together([collect]*4)
+	assert results[0] == results[1] == results[2] == results[3]
+	assert server.requests - requests < 4*files
+	assert gtrends.metrics.counter("coalesced") == 4*files - (server.requests - requests)
@@ -0,0 +1,55 @@
+import datetime
+import pytest
+import gtrends
+
+np = pytest.importorskip("numpy")
+
+#SETUP
+
+startDt = datetime.datetime(year=2010, month=1, day=1)
+data = [["date", "banana", "pie"]]
+for i in range(90):
+	data.append([startDt + datetime.timedelta(days=i), float(i), 100.0 - i])
+
+
+#TEST FORMAT CONVERSION
+
+def testFromListRoundTrip():
+	frame = gtrends.TrendFrame.fromList(data)
+	assert frame.shape == (90, 2)
+	assert frame.toList() == data
+
+def testFromListSummed():
+	summed = [data[0]] + [[line[0], line[1] + line[2]] for line in data[1:]]
+	frame = gtrends.TrendFrame.fromList(summed)
+	assert frame.terms == ["banana pie"]
+
+def testCsvMatchesSave(tmpdir):
+	gtrends.TrendFrame.fromList(data).toCsv(str(tmpdir.join("frame.csv")))
+	gtrends._save(str(tmpdir.join("list.csv")), data)
+	assert tmpdir.join("frame.csv").read() == tmpdir.join("list.csv").read()
+
+
+def testCsvSummedMatchesSave(tmpdir):
+	summed = [data[0]] + [[line[0], line[1] + line[2]] for line in data[1:]]
+	gtrends.TrendFrame.fromList(summed).toCsv(str(tmpdir.join("frame.csv")), data[0])
+	gtrends._save(str(tmpdir.join("list.csv")), summed)
+	assert tmpdir.join("frame.csv").read() == tmpdir.join("list.csv").read()
+
+#TEST LOOKUPS
+
+def testColumn():
+	frame = gtrends.TrendFrame.fromList(data)
+	assert frame["pie"][3] == 97.0
+	assert np.shares_memory(frame["pie"], frame.values)
+
+def testBetweenIsView():
+	frame = gtrends.TrendFrame.fromList(data)
+	month = frame.between(datetime.datetime(2010, 2, 1), datetime.datetime(2010, 3, 1))
+	assert len(month) == 28
+	assert month["banana"][0] == 31.0
+	assert np.shares_memory(month.values, frame.values)
+
+def testSelect():
+	frame = gtrends.TrendFrame.fromList(data).select(["pie"])
+	assert frame.terms == ["pie"] and frame.shape == (90, 1)
@@ -0,0 +1,84 @@
+import datetime
+import pytest
+import gtrends
+import _login
+
+np = pytest.importorskip("numpy")
+
+#SETUP
+
+geos = ["US", "DE", "FR", ""]
+startDt = datetime.datetime(2014, 1, 1)
+endDt = datetime.datetime(2014, 7, 1)
+
+
+#TEST FAN-OUT
+
+def testSameAsCollectTrends(server, terms):
+	before = server.requests
+	cube = gtrends.collectTrendsGeo("user", "secret", terms, geos, startDt, endDt, workers=8)
+	assert cube.geos == geos and cube.terms == terms and cube.failed == []
+	#the files of one geo, for every geo.
+	files = len(gtrends._planQueries(terms, startDt, endDt, 'd', "", "", "", "")[0])
+	assert server.requests - before == len(geos) * files
+	for geo in geos:
+		frame = gtrends.collectTrends("user", "secret", terms, startDt, endDt, geo=geo,
+			frame=True)
+		assert np.array_equal(cube.dates, frame.dates)
+		assert np.array_equal(cube[geo].values, frame.values)
+	assert cube.shape == (len(geos), len(frame), len(terms))
+	#the geos have different data.
+	assert not np.array_equal(cube["US"].values, cube["DE"].values)
+	assert cube.term("pie").shape == (len(geos), len(frame))
+	assert np.array_equal(cube.term("pie")[1], cube["DE"]["pie"])
+
+def testOptions(server, terms):
+	cube = gtrends.collectTrendsGeo("user", "secret", terms, ["US", "DE"], startDt, endDt,
+		granularity='w', sum=True, engine='numpy', workers=4)
+	frame = gtrends.collectTrends("user", "secret", terms, startDt, endDt, granularity='w',
+		geo="DE", sum=True, engine='numpy', frame=True)
+	assert cube.terms == [" ".join(terms)]
+	assert np.array_equal(cube["DE"].values, frame.values)
+
+def testErrors(server, terms):
+	before = server.requests
+	assert gtrends.collectTrendsGeo("user", "secret", terms, [], startDt, endDt) == []
+	assert gtrends.collectTrendsGeo("user", "secret", terms, ["US", "US"], startDt, endDt) == []
+	assert gtrends.collectTrendsGeo("user", "secret", terms, ["US"], endDt, startDt) == []
+	assert server.requests == before
+
+
+def testFailedGeo(server, terms, monkeypatch):
+	#a file which cannot be downloaded only fails its own geo.
+	download = _login.Downloader.downloadReport
+	def failDE(self, query, cache=None):
+		if "geo=DE" in query:
+			raise Exception("Throttled by Google Trends")
+		return download(self, query, cache)
+	monkeypatch.setattr(_login.Downloader, "downloadReport", failDE)
+	cube = gtrends.collectTrendsGeo("user", "secret", terms, geos, startDt, endDt, workers=8)
+	assert cube.failed == ["DE"]
+	assert np.isnan(cube["DE"].values).all()
+	assert not np.isnan(cube["US"].values).any()
+
+def testThrottled(server, terms):
+	server.error_rate = 0.2
+	cube = gtrends.collectTrendsGeo("user", "secret", terms, geos, startDt, endDt, workers=8)
+	assert cube == [] or (0 < len(cube.failed) <= len(geos) and
+		all(np.isnan(cube[geo].values).all() for geo in cube.failed))
+
+
+#TEST CUBE
+
+def testFromFrames():
+	dates = [startDt + datetime.timedelta(days=i) for i in range(5)]
+	full = gtrends.TrendFrame(dates, np.arange(10.0).reshape(5, 2), ["a", "b"])
+	short = gtrends.TrendFrame(dates[1:4], np.ones((3, 2)), ["a", "b"])
+	cube = gtrends.TrendCube.fromFrames(["US", "DE", "FR"], [full, short, None])
+	assert cube.shape == (3, 5, 2) and cube.failed == ["FR"]
+	assert np.array_equal(cube["US"].values, full.values)
+	assert np.isnan(cube["DE"]["a"][[0, 4]]).all() and (cube["DE"]["a"][1:4] == 1.0).all()
+	assert np.isnan(cube["FR"].values).all()
+	assert "DE" in cube and "GB" not in cube
+	with pytest.raises(ValueError):
+		gtrends.TrendCube.fromFrames(["US", "DE"], [full, full.select(["b", "a"])])
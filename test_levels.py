@@ -0,0 +1,108 @@
+import datetime
+import pytest
+import gtrends
+from _levels import LevelCache
+
+#SETUP
+
+startDt = datetime.datetime(2014, 1, 1)
+endDt = datetime.datetime(2014, 7, 1)
+
+def collect(levels, terms, startDt=startDt, endDt=endDt, **kwargs):
+	return gtrends.collectTrends("user", "secret", terms, startDt, endDt, levels=levels,
+		**kwargs)
+
+
+#TEST DERIVED QUERIES
+
+def testSameQuery(server, terms):
+	levels = LevelCache()
+	trends = collect(levels, terms)
+	before = server.requests
+	#the same call, and sums of it, are exactly what a download gives.
+	assert collect(levels, terms) == trends
+	assert collect(levels, terms, sum=True) == gtrends.collectTrends("user", "secret", terms,
+		startDt, endDt, sum=True)
+	assert levels.stats() == {"entries": 1, "hits": 2, "misses": 1}
+	assert server.requests - before == len(gtrends._planQueries(terms, startDt, endDt,
+		'd', "", "", "", "")[0])
+
+def testSubsets(server, terms):
+	levels = LevelCache()
+	collect(levels, terms)
+	before = server.requests
+	subset = collect(levels, terms=["melon", "pie"])
+	assert subset[0] == ["date", "melon", "pie"]
+	#renormalized to the largest of the subset.
+	assert max(max(line[1:]) for line in subset[1:]) == 100.0
+	summed = collect(levels, terms=["melon", "pie"], sum=True)
+	assert summed[0] == ["date", "melon", "pie"] and len(summed[1]) == 2
+	assert server.requests == before
+
+def testSubrange(server, terms):
+	levels = LevelCache()
+	trends = collect(levels, terms)
+	before = server.requests
+	part = collect(levels, terms, startDt=datetime.datetime(2014, 3, 1),
+		endDt=datetime.datetime(2014, 5, 1))
+	assert server.requests == before
+	assert part[1][0] == datetime.datetime(2014, 3, 1)
+	assert part[-1][0] == datetime.datetime(2014, 4, 30)
+	#the same shape as the full result, on its own scale.
+	full = dict((line[0], line[1:]) for line in trends[1:])
+	ratio = full[part[1][0]][0] / part[1][1]
+	for line in part[1:]:
+		assert full[line[0]][0] == pytest.approx(line[1] * ratio, abs=0.01)
+
+def testMisses(server, terms):
+	levels = LevelCache()
+	collect(levels, terms=terms[:2])
+	before = server.requests
+	#other terms, months outside the entry and other parameters all download.
+	collect(levels, terms=["banana", "melon"])
+	collect(levels, terms=terms[:2], endDt=datetime.datetime(2014, 9, 1))
+	collect(levels, terms=terms[:2], geo="US")
+	collect(levels, terms=terms[:2], granularity='w')
+	assert levels.stats()["misses"] == 5 and levels.stats()["hits"] == 0
+	assert server.requests - before == 4 + 3 + 3 + 1
+
+def testEngines(server, terms):
+	np = pytest.importorskip("numpy")
+	levels = LevelCache()
+	frame = collect(levels, terms, engine='numpy', frame=True)
+	before = server.requests
+	assert np.array_equal(collect(levels, terms, engine='numpy', frame=True).values, frame.values)
+	assert collect(levels, terms) == collect(None, terms)
+	assert collect(levels, terms=["pie"], engine='numpy', frame=True).terms == ["pie"]
+	assert server.requests - before == 6
+
+def testRepeatedTerms(server, terms):
+	#planned packing drops repeated terms, also when answered from the cache.
+	levels = LevelCache()
+	repeated = terms + ["pie", "apple"]
+	first = collect(levels, repeated, packing='planned')
+	before = server.requests
+	assert collect(levels, repeated, packing='planned') == first
+	assert first[0] == ["date"] + terms
+	assert server.requests == before
+
+
+#TEST CACHE
+
+def testEviction():
+	levels = LevelCache(maxEntries=2)
+	dates = [startDt + datetime.timedelta(days=i) for i in range(3)]
+	for i in range(3):
+		levels.put(("d",), ["t%d" % i], startDt, endDt, dates, [[1.0], [2.0], [3.0]])
+	assert levels.get(("d",), ["t0"], startDt, endDt) is None
+	assert levels.get(("d",), ["t2"], startDt, endDt) == (dates, [[1.0], [2.0], [3.0]])
+	levels.clear()
+	assert levels.stats()["entries"] == 0
+
+def testExpiry():
+	levels = LevelCache(ttl=-1)
+	dates = [startDt]
+	levels.put(("d",), ["a"], startDt, endDt, dates, [[1.0]], closed=False)
+	assert levels.get(("d",), ["a"], startDt, endDt) is None
+	levels.put(("d",), ["a"], startDt, endDt, dates, [[1.0]], closed=True)
+	assert levels.get(("d",), ["a"], startDt, endDt) == (dates, [[1.0]])
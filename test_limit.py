@@ -0,0 +1,77 @@
+import time
+import datetime
+import pytest
+import gtrends
+from _login import Downloader
+from _limit import RateLimiter, isThrottled
+
+#SETUP
+
+pytestmark = pytest.mark.server(errorRate=0.3, seed=1, login=False)
+
+query = ("http://www.google.com/trends/trendsReport?&q=banana&geo=&cat=&gprop="
+	"&cmpt=q&content=1&export=1&date=1%2F2010%202m")
+
+
+#TEST TOKEN BUCKET
+
+def testRate():
+	limiter = RateLimiter(rate=50.0)
+	start = time.time()
+	for i in range(11):
+		limiter.acquire()
+	#the first token is there already, the other 10 take 0.2s.
+	assert time.time() - start >= 0.18
+	assert limiter.stats()["waited"] >= 0.18
+
+def testUnlimited():
+	limiter = RateLimiter()
+	for i in range(100):
+		assert limiter.acquire() == 0.0
+
+def testAimd():
+	limiter = RateLimiter(rate=10.0, maxRate=12.0, increase=1.0, baseDelay=0.0)
+	limiter.throttled(0)
+	assert limiter.rate == 5.0
+	for i in range(100):
+		limiter.succeeded()
+	assert limiter.rate == 12.0
+
+def testStartsLimitingWhenThrottled():
+	limiter = RateLimiter(baseDelay=0.0)
+	for i in range(20):
+		limiter.acquire()
+	limiter.throttled(0)
+	#20 requests in the last 10s, halved.
+	assert limiter.rate == 1.0
+
+def testQuotaPage():
+	assert isThrottled("<html>You have reached your quota limit. Please try again later.</html>")
+	assert not isThrottled("Web Search interest: banana")
+
+
+#TEST RETRIES
+
+def testRetries(server):
+	limiter = RateLimiter(rate=1000.0, minRate=100.0, baseDelay=0.01, retries=10, seed=0)
+	dloader = Downloader("user", "secret", transport=server.transport(), limiter=limiter)
+	for i in range(10):
+		assert "banana" in dloader.downloadReport(query)
+	assert server.errors > 0
+	assert limiter.stats()["throttles"] == server.errors
+
+def testGivesUp(server):
+	server.error_rate = 1.0
+	limiter = RateLimiter(rate=1000.0, minRate=100.0, baseDelay=0.0, retries=2)
+	dloader = Downloader("user", "secret", transport=server.transport(), limiter=limiter)
+	with pytest.raises(Exception):
+		dloader.downloadReport(query)
+	assert server.errors == 3
+
+def testCollectTrends(server):
+	#the server fixture puts the old limiter back.
+	gtrends.sessionPool.setLimiter(RateLimiter(rate=1000.0, minRate=100.0, baseDelay=0.01,
+		retries=10, seed=0))
+	trends = gtrends.collectTrends("user", "secret", ["banana", "pie"],
+		datetime.datetime(2010, 1, 1), datetime.datetime(2011, 1, 1), workers=4)
+	assert len(trends) == 1 + 365
@@ -0,0 +1,72 @@
+import os
+import datetime
+import pytest
+import gtrends
+from _login import Downloader
+
+#SETUP
+
+pytestmark = pytest.mark.server(login=False)
+
+query = ("http://www.google.com/trends/trendsReport?&q=banana&geo=&cat=&gprop="
+	"&cmpt=q&content=1&export=1&date=1%2F2010%202m")
+startDt = datetime.datetime(2010, 1, 1)
+endDt = datetime.datetime(2010, 7, 1)
+
+
+#TEST SESSION POOL
+
+def testOneLoginPerAccount(server, terms):
+	#every segment of every call shares the login.
+	gtrends.collectTrends("user", "secret", terms, startDt, endDt)
+	gtrends.collectTrends("user", "secret", terms[:2], startDt, endDt)
+	assert server.logins == 1
+	pool = gtrends.sessionPool
+	assert pool.get("user", "secret") is pool.get("user", "secret")
+	assert pool.get("user", "other") is not pool.get("user", "secret")
+
+def testLoginDeferred(server):
+	dloader = gtrends.sessionPool.get("user", "secret")
+	assert not dloader.logged_in and server.requests == 0
+	dloader.downloadReport(query)
+	assert dloader.logged_in and dloader.logins == 1
+
+def testClear(server):
+	dloader = gtrends.sessionPool.get("user", "secret")
+	dloader.downloadReport(query)
+	gtrends.sessionPool.clear()
+	assert gtrends.sessionPool.get("user", "secret") is not dloader
+	gtrends.sessionPool.get("user", "secret").downloadReport(query)
+	assert server.logins == 2
+
+
+#TEST SAVED COOKIES
+
+def testCookiesSaved(server, tmpdir):
+	path = str(tmpdir.join("cookies.txt"))
+	Downloader("user", "secret", path, server.transport()).downloadReport(query)
+	if os.name == "posix":
+		assert os.stat(path).st_mode & 0o777 == 0o600
+	#a later process starts logged in.
+	dloader = Downloader("user", "secret", path, server.transport())
+	assert dloader.logged_in
+	assert "banana" in dloader.downloadReport(query)
+	assert server.logins == 1
+
+def testRevokedCookies(server, tmpdir):
+	path = tmpdir.join("cookies.txt")
+	Downloader("user", "secret", str(path), server.transport()).downloadReport(query)
+	#Google no longer knows the saved session.
+	path.write(path.read().replace("SID=", "OLD="))
+	dloader = Downloader("user", "secret", str(path), server.transport())
+	assert "banana" in dloader.downloadReport(query)
+	assert server.logins == 2
+	assert "SID=" in path.read()
+
+def testBadCookieFile(server, tmpdir):
+	path = tmpdir.join("cookies.txt")
+	path.write("not a cookie file\n")
+	dloader = Downloader("user", "secret", str(path), server.transport())
+	assert not dloader.logged_in
+	assert "banana" in dloader.downloadReport(query)
+	assert server.logins == 1
@@ -0,0 +1,79 @@
+import datetime
+import pytest
+import gtrends
+from _metrics import Metrics, _percentile
+
+#SETUP
+
+pytestmark = pytest.mark.server(login=False)
+
+
+#TEST COUNTERS AND HISTOGRAMS
+
+def testHistogram():
+	metrics = Metrics(buckets=(0.1, 1.0))
+	metrics.observe("fetch", 0.05)
+	metrics.observe("fetch", 0.5)
+	metrics.observe("fetch", 5.0)
+	hist = metrics.histogram("fetch")
+	assert hist["count"] == 3
+	assert hist["sum"] == pytest.approx(5.55)
+	assert hist["buckets"] == [(0.1, 1), (1.0, 2)]
+
+def testCounters():
+	metrics = Metrics()
+	metrics.count("requests", status=200)
+	metrics.count("requests", status=200)
+	metrics.count("requests", status=429)
+	assert metrics.counter("requests", status=200) == 2
+	assert metrics.counter("requests", status=500) == 0
+
+def testPrometheus():
+	metrics = Metrics(buckets=(0.1, 1.0))
+	metrics.count("requests", status=200)
+	metrics.observe("fetch", 0.5)
+	text = metrics.toPrometheus()
+	assert "# TYPE gtrends_requests_total counter\n" in text
+	assert 'gtrends_requests_total{status="200"} 1\n' in text
+	assert 'gtrends_stage_seconds_bucket{stage="fetch",le="0.1"} 0\n' in text
+	assert 'gtrends_stage_seconds_bucket{stage="fetch",le="+Inf"} 1\n' in text
+	assert 'gtrends_stage_seconds_count{stage="fetch"} 1\n' in text
+
+def testBadHook():
+	metrics = Metrics()
+	def hook(stage, seconds, info):
+		raise ValueError()
+	metrics.addHook(hook)
+	metrics.observe("fetch", 0.1)
+	assert metrics.histogram("fetch")["count"] == 1
+
+def testPercentile():
+	values = list(range(1, 21))
+	#nearest rank, as in the batch runner's summary and benchmark.py.
+	assert _percentile(values, 50) == 10
+	assert _percentile(values, 95) == 19
+	assert _percentile(values, 100) == 20
+	assert _percentile([], 95) == 0.0
+
+
+#TEST WHOLE PATH
+
+def testCollectTrends(server):
+	events = []
+	def hook(stage, seconds, info):
+		events.append((stage, info))
+	gtrends.metrics.addHook(hook)
+	try:
+		gtrends.collectTrends("user", "secret", ["banana", "pie"],
+			datetime.datetime(2010, 1, 1), datetime.datetime(2010, 7, 1))
+	finally:
+		gtrends.metrics.removeHook(hook)
+	stages = [stage for stage, info in events]
+	for stage in ["login", "fetch", "rateLimit", "prepTrends", "scaleRep", "merge",
+			"calcPerc", "reformTrend", "normalize"]:
+		assert stage in stages
+	fetches = [info for stage, info in events if stage == "fetch"]
+	assert len(fetches) == 3
+	assert all(info["status"] == 200 and info["bytes"] > 0 for info in fetches)
+	assert gtrends.metrics.counter("requests", status=200) == 3
+	assert gtrends.metrics.counter("logins") == 1
@@ -0,0 +1,145 @@
+import io
+import datetime
+import gtrends
+
+#SETUP
+
+startDt = datetime.datetime(year=2010, month=1, day=1)
+
+daily = "\n".join([
+	"Web Search interest: banana, pie",
+	"Worldwide; Jan 2010 - Feb 2010",
+	"",
+	"Interest over time",
+	"Day,banana,pie",
+	"2010-01-30,40,7",
+	"2010-01-31,50,0",
+	"2010-02-01,60,3",
+	"2010-02-02,70,4",
+	"",
+	"Top regions for banana",
+	"Region,banana",
+	"Italy,100",
+	""])
+
+weekly = "\n".join([
+	"Web Search interest: banana, pie",
+	"Worldwide; 2010 - 2010",
+	"",
+	"Interest over time",
+	"Week,banana,pie",
+	"2010-05-23 - 2010-05-29,40,7",
+	"2010-05-30 - 2010-06-05,50,0",
+	"2010-06-06 - 2010-06-12,60,3",
+	"2010-06-13 - 2010-06-19,70,4",
+	"",
+	"Top regions for banana",
+	""])
+
+
+#TEST PARSES CORRECTLY?
+
+def testDaily():
+	report = gtrends._prepTrends([daily], startDt, 1, 1, 'd')
+	assert report == [[[datetime.datetime(2010, 1, 30), 40],
+						[datetime.datetime(2010, 1, 31), 50],
+						[datetime.datetime(2010, 2, 1), 60]]]
+
+def testWeekly():
+	report = gtrends._prepTrends([weekly], startDt, 1, 5, 'w')
+	assert [line[0] for line in report[0]] == [datetime.datetime(2010, 5, 23),
+		datetime.datetime(2010, 5, 30), datetime.datetime(2010, 6, 6)]
+
+def testGranularityFromFile():
+	report = gtrends._prepTrends([weekly], startDt, 1, 5, 'd')
+	assert len(report[0]) == 3
+
+def testStream():
+	lines = io.BytesIO(daily.encode("utf-8"))
+	assert gtrends._prepTrends([lines], startDt, 1, 1, 'd') == \
+		gtrends._prepTrends([daily], startDt, 1, 1, 'd')
+
+def testWeeklyWindowsShareOnePoint():
+	#the second window starts with the week from the end of May.
+	second = weekly.replace("2010-05-23 - 2010-05-29,40,7\n", "").replace(
+		"2010-06-13 - 2010-06-19", "2010-11-07 - 2010-11-13")
+	report = gtrends._prepTrends([weekly, second],
+		datetime.datetime(year=2010, month=1, day=1), 2, 5, 'w')
+	assert report[0][-1][0] == report[1][0][0] == datetime.datetime(2010, 6, 6)
+
+def testLongWindow():
+	#the same month a year later is not the end of the window.
+	report = gtrends._prepTrends([weekly], datetime.datetime(year=2009, month=5, day=1),
+		1, 24, 'w')
+	assert len(report[0]) == 4
+
+def testCrLf():
+	report = gtrends._prepTrends([daily.replace("\n", "\r\n")], startDt, 1, 1, 'd')
+	assert len(report[0]) == 3
+
+
+#TEST BAD DATA
+
+def testBadDate():
+	assert gtrends._prepTrends([daily.replace("2010-01-31", "31/01/2010")],
+		startDt, 1, 1, 'd') == []
+
+def testBadValue():
+	assert gtrends._prepTrends([daily.replace("50,0", " ,0")], startDt, 1, 1, 'd') == []
+
+def testNoData():
+	assert gtrends._prepTrends([daily.split("Day,")[0]], startDt, 1, 1, 'd') == []
+
+
+#TEST SECTIONS
+
+related = daily.rstrip("\n") + "\n" + "\n".join([
+	"",
+	"Top searches for banana",
+	"banana bread,100",
+	"banana split,45",
+	"",
+	"Rising searches for banana",
+	"banana phone,Breakout",
+	""])
+
+def testSections():
+	sections = []
+	report = gtrends._prepTrends([related], startDt, 1, 1, 'd', sections=sections)
+	assert report == gtrends._prepTrends([daily], startDt, 1, 1, 'd')
+	assert sections == [{"segment": 0, "window": 0, "startDt": startDt,
+		"endDt": datetime.datetime(2010, 3, 1), "sections": {
+			"Top regions for banana": [["Italy", 100]],
+			"Top searches for banana": [["banana bread", 100], ["banana split", 45]],
+			"Rising searches for banana": [["banana phone", "Breakout"]]}}]
+
+def testSectionsAfterFinalMonth():
+	#the series is cut short at the final month, but the sections are still read.
+	sections = {}
+	report, gran = gtrends._parseReport(io.StringIO(u"" + related), (2010, 2), 'd',
+		sections=sections)
+	assert len(report) == 3
+	assert sections["Top regions for banana"] == [["Italy", 100]]
+	assert sections["Rising searches for banana"] == [["banana phone", "Breakout"]]
+
+def testQuotedSection():
+	#labels with commas are quoted, and a section's first row can be data.
+	quoted = daily.rstrip("\n") + "\n" + "\n".join([
+		"",
+		"Top cities for banana",
+		'"Washington, D.C.",100',
+		'"Portland, OR",64',
+		"",
+		"Rising searches for banana",
+		'"banana, bread",+250%',
+		""])
+	sections = {}
+	gtrends._parseReport(io.StringIO(u"" + quoted), (2010, 2), 'd', sections=sections)
+	assert sections["Top cities for banana"] == [["Washington, D.C.", 100],
+		["Portland, OR", 64]]
+	assert sections["Rising searches for banana"] == [["banana, bread", "+250%"]]
+
+def testEmptySection():
+	sections = {}
+	gtrends._parseReport(weekly, (2010, 7), 'w', sections=sections)
+	assert sections == {"Top regions for banana": []}
@@ -0,0 +1,49 @@
+import datetime
+import gtrends
+from _standin import _level
+
+#SETUP
+
+terms = ["term%d" % i for i in range(13)]
+startDt = datetime.datetime(2010, 1, 1)
+endDt = datetime.datetime(2011, 1, 1)
+
+
+#TEST PLANNED PACKING
+
+def testPlannedPacking(server):
+	repeated = terms + ["term1"]
+	requests = server.requests
+	trends = gtrends.collectTrends("user", "secret", repeated, startDt, endDt,
+		packing="planned")
+	planned = server.requests - requests
+	requests = server.requests
+	gtrends.collectTrends("user", "secret", repeated, startDt, endDt)
+	fixed = server.requests - requests
+	assert trends[0] == ["date"] + terms
+	#3 groups x 6 files and 3 probes, against 4 segments x 6 files.
+	assert planned == 21
+	assert fixed == 24
+	#the terms keep their relative popularity.
+	line = [line for line in trends if line[0] == datetime.datetime(2010, 7, 1)][0]
+	ratios = [value / _level(term, "", "", "", datetime.date(2010, 7, 1))
+		for term, value in zip(terms, line[1:])]
+	assert max(ratios) / min(ratios) < 1.1
+
+def testExplainPlanned():
+	plan = gtrends.explainTrends(terms, startDt, endDt, packing="planned")
+	#only the first probe is known before downloading anything.
+	assert plan[1][2] == terms[:5] and plan[1][3] is not None
+	assert [line[2:] for line in plan[2:4]] == [[terms[5:9], None], [terms[9:13], None]]
+	assert all(line[3] is not None for line in plan[4:])
+
+
+#TEST POPULARITY
+
+def testPopularityBounded(server, monkeypatch):
+	monkeypatch.setattr(gtrends, "MAX_POPULARITY", 2)
+	for i in range(3):
+		gtrends._probePopularity("user", "secret", terms[i : i+6], startDt, endDt, "", "",
+			"", "", None, 1, None)
+	assert len(gtrends._popularity) == 2
+	assert all(entry[0] == 0 for entry in gtrends._popularity.values())
@@ -0,0 +1,72 @@
+import os
+import datetime
+import pytest
+import gtrends
+from _reader import TrendReader
+
+#SETUP
+
+def trends(n, terms=("banana", "pie")):
+	data = [["date"] + list(terms)]
+	for i in range(n):
+		data.append([datetime.datetime(2004, 1, 1) + datetime.timedelta(i)] +
+			[float(i*10 + j) for j in range(len(terms))])
+	return data
+
+@pytest.fixture
+def saved(tmpdir):
+	path = str(tmpdir.join("data.csv"))
+	data = trends(1000)
+	gtrends._save(path, data)
+	return path, data
+
+
+#TEST RANGES AND COLUMNS
+
+def testWholeFile(saved):
+	path, data = saved
+	assert TrendReader(path).read() == data
+	assert gtrends.readTrends(path) == gtrends._read(path)
+
+def testRange(saved):
+	path, data = saved
+	reader = TrendReader(path, stride=16)
+	start = datetime.datetime(2005, 3, 7)
+	end = datetime.datetime(2005, 4, 2)
+	expected = [line for line in data[1:] if start <= line[0] < end]
+	assert reader.read(start, end)[1:] == expected
+	assert reader.read(None, datetime.datetime(2004, 1, 1)) == [data[0]]
+	assert reader.read(datetime.datetime(2010, 1, 1)) == [data[0]]
+
+def testColumns(saved):
+	path, data = saved
+	rows = list(TrendReader(path).rows(terms=["pie"]))
+	assert rows[5] == (data[6][0], [data[6][2]])
+	with pytest.raises(KeyError):
+		TrendReader(path).read(terms=["apple"])
+
+def testSummed(tmpdir):
+	path = str(tmpdir.join("data.csv"))
+	data = [["date", "banana", "pie"]] + [line[:2] for line in trends(10, ["banana"])[1:]]
+	gtrends._save(path, data)
+	reader = TrendReader(path)
+	assert reader.terms == ["banana pie"]
+	assert reader.read() == data
+
+
+#TEST INDEX FILE
+
+def testIndexReused(saved):
+	path, data = saved
+	TrendReader(path).read()
+	assert os.path.exists(path + ".idx")
+	reader = TrendReader(path)
+	reader._build = None
+	assert len(reader.read(datetime.datetime(2006, 1, 1))) == 1 + 1000 - 731
+
+def testIndexRebuilt(saved):
+	path, data = saved
+	TrendReader(path).read()
+	gtrends._save(path, trends(500))
+	assert len(TrendReader(path)) == 500
+	assert TrendReader(path).read()[-1] == trends(500)[-1]
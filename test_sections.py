@@ -0,0 +1,42 @@
+import datetime
+import pytest
+import gtrends
+
+#SETUP
+
+startDt = datetime.datetime(2014, 1, 1)
+endDt = datetime.datetime(2014, 7, 1)
+
+
+#TEST SECTIONS
+
+def testNoMoreRequests(server, terms):
+	before = server.requests
+	trends = gtrends.collectTrends("user", "secret", terms, startDt, endDt)
+	plain = server.requests - before
+	before = server.requests
+	trends2, tables = gtrends.collectTrends("user", "secret", terms, startDt, endDt,
+		sections=True)
+	assert server.requests - before == plain
+	assert trends2 == trends
+
+	#a table for each window of each segment, in order.
+	queries, numSegs, numFiles, countMonth = gtrends._planQueries(terms, startDt, endDt,
+		'd', "", "", "", "")
+	assert len(tables) == len(queries)
+	assert [(t["segment"], t["window"]) for t in tables] == \
+		[(s, i) for s in range(numSegs) for i in range(numFiles)]
+	assert tables[1]["startDt"] == datetime.datetime(2014, 3, 1)
+	assert tables[1]["endDt"] == datetime.datetime(2014, 6, 1)
+	#every term of a file has its regions and searches.
+	sections = tables[0]["sections"]
+	for term in terms[:4] + [terms[0]]:
+		assert len(sections["Top regions for " + term]) == 5
+		assert sections["Top searches for " + term][0] == [term + " recipe", 100]
+		assert sections["Rising searches for " + term] == [[term + " news", "Breakout"]]
+	assert "Top regions for grape" in tables[-1]["sections"]
+
+def testFrame(server, terms):
+	frame, tables = gtrends.collectTrends("user", "secret", terms[:2], startDt, endDt,
+		frame=True, sections=True, engine='numpy')
+	assert len(frame) and len(tables) == 3
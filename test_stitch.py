@@ -0,0 +1,70 @@
+import copy
+import random
+import datetime
+import pytest
+import gtrends
+
+np = pytest.importorskip("numpy")
+import _vector
+
+#SETUP
+
+def makeReports(numSegs, numFiles, numTerms, daysPerFile, seed=0):
+	"""Builds _prepTrends style reports, with consecutive windows sharing a line."""
+	rand = random.Random(seed)
+	startDt = datetime.datetime(year=2010, month=1, day=1)
+	reportData = []
+	for seg in range(numSegs):
+		report = []
+		for i in range(numFiles):
+			window = []
+			for j in range(daysPerFile+1):
+				dt = startDt + datetime.timedelta(days=i*daysPerFile+j)
+				window.append([dt] + [rand.choice([0, 1, rand.randint(0, 100)])
+					for k in range(numTerms)])
+			report.append(window)
+		reportData.append(report)
+	#the shared line must hold the same values in both windows.
+	for report in reportData:
+		for i in range(1, numFiles):
+			report[i][0] = list(report[i-1][-1])
+	return reportData
+
+def pythonLevels(reportData):
+	reportData = copy.deepcopy(reportData)
+	merged = gtrends._merge(gtrends._scaleRep(reportData))
+	percs = gtrends._calcPerc(len(merged), merged)
+	return gtrends._reformTrend(percs, merged[0][0])
+
+
+#TEST SAME RESULTS AS LISTS?
+
+def testStitchOneSegment():
+	reportData = makeReports(1, 5, 4, 30)
+	expected = pythonLevels(reportData)
+	dates, levels = _vector.stitch(reportData)
+	assert dates == [line[0] for line in expected]
+	assert np.allclose(levels, [line[1:] for line in expected], rtol=1e-9)
+
+def testStitchManySegments():
+	reportData = makeReports(3, 4, 4, 30, seed=1)
+	expected = pythonLevels(reportData)
+	dates, levels = _vector.stitch(reportData)
+	assert levels.shape == (len(expected), 12)
+	assert np.allclose(levels, [line[1:] for line in expected], rtol=1e-9)
+
+def testNormalize():
+	reportData = makeReports(2, 3, 4, 30, seed=2)
+	expected = gtrends._normalize(pythonLevels(reportData))
+	dates, levels = _vector.stitch(reportData)
+	rows = _vector.toRows(dates, _vector.normalize(levels))
+	for line, expLine in zip(rows, expected):
+		assert line[0] == expLine[0]
+		for value, expValue in zip(line[1:], expLine[1:]):
+			assert abs(value - expValue) <= 0.001
+
+def testSum():
+	reportData = makeReports(2, 3, 4, 30, seed=3)
+	expected = gtrends._calcSum(pythonLevels(reportData))
+	dates, levels = _vector.stitch(reportData)
+	assert np.allclose(_vector.calcSum(levels)[:, 0], [line[1] for line in expected])
@@ -0,0 +1,83 @@
+import os
+import datetime
+import pytest
+np = pytest.importorskip("numpy")
+import gtrends
+from _store import TrendStore, save
+
+#SETUP
+
+def days(start, n):
+	return [datetime.datetime(2010, 1, 1) + datetime.timedelta(start + i) for i in range(n)]
+
+
+#TEST FORMAT
+
+def testRoundTrip(tmpdir):
+	path = str(tmpdir.join("trends.gtr"))
+	values = np.arange(20.0).reshape(10, 2)
+	save(path, days(0, 10), values, ["banana", "pie"], {"geo": "US"})
+	store = TrendStore(path)
+	assert len(store) == 10
+	assert store.terms == ["banana", "pie"]
+	assert store.params == {"geo": "US"}
+	assert (store.values == values).all()
+	assert store.toList()[1] == [datetime.datetime(2010, 1, 1), 0.0, 1.0]
+
+def testMapped(tmpdir):
+	path = str(tmpdir.join("trends.gtr"))
+	save(path, days(0, 10), np.ones((10, 1)), ["banana"])
+	frame = TrendStore(path).frame()
+	assert isinstance(frame.values.base, np.memmap)
+
+def testAppendInPlace(tmpdir):
+	path = str(tmpdir.join("trends.gtr"))
+	store = TrendStore.create(path, days(0, 10), np.ones((10, 1)), ["banana"], capacity=20)
+	size = os.path.getsize(path)
+	store.append(days(10, 5), np.full((5, 1), 2.0))
+	assert os.path.getsize(path) == size
+	reopened = TrendStore(path)
+	assert len(reopened) == 15
+	assert reopened.values[-1, 0] == 2.0
+	assert reopened.toList()[-1][0] == datetime.datetime(2010, 1, 15)
+
+def testAppendGrows(tmpdir):
+	path = str(tmpdir.join("trends.gtr"))
+	store = TrendStore.create(path, days(0, 10), np.ones((10, 1)), ["banana"], capacity=10)
+	store.append(days(10, 5), np.full((5, 1), 2.0))
+	assert store.capacity == 20
+	assert len(TrendStore(path)) == 15
+
+def testAppendOrder(tmpdir):
+	path = str(tmpdir.join("trends.gtr"))
+	store = TrendStore.create(path, days(0, 10), np.ones((10, 1)), ["banana"])
+	with pytest.raises(ValueError):
+		store.append(days(9, 1), np.ones((1, 1)))
+	with pytest.raises(IOError):
+		TrendStore(path).append(days(10, 1), np.ones((1, 1)))
+
+
+#TEST COLLECTTRENDS
+
+def testCollectTrends(server, tmpdir):
+	path = str(tmpdir.join("trends.gtr"))
+	trends = gtrends.collectTrends("user", "secret", ["banana", "pie"],
+		datetime.datetime(2010, 1, 1), datetime.datetime(2010, 6, 1), savePath=path,
+		geo="US")
+	assert TrendStore(path).params["geo"] == "US"
+	assert gtrends._read(path) == trends
+
+def testCollectTrendsSummed(server, tmpdir):
+	path = str(tmpdir.join("trends.gtr"))
+	trends = gtrends.collectTrends("user", "secret", ["banana", "pie"],
+		datetime.datetime(2010, 1, 1), datetime.datetime(2010, 6, 1), savePath=path,
+		sum=True)
+	assert gtrends._read(path) == trends
+
+def testReadTrends(tmpdir):
+	path = str(tmpdir.join("trends.gtr"))
+	save(path, days(0, 10), np.arange(20.0).reshape(10, 2), ["banana", "pie"])
+	data = gtrends.readTrends(path, datetime.datetime(2010, 1, 3), datetime.datetime(2010, 1, 5),
+		terms=["pie"])
+	assert data == [["date", "pie"], [datetime.datetime(2010, 1, 3), 5.0],
+		[datetime.datetime(2010, 1, 4), 7.0]]
@@ -0,0 +1,83 @@
+import os
+import datetime
+import pytest
+import gtrends
+
+#SETUP
+
+startDt = datetime.datetime(2010, 1, 1)
+endDt = datetime.datetime(2011, 1, 1)
+
+def same(tmpdir, terms, granularity='d', **kwargs):
+	batchPath = str(tmpdir.join("batch.csv"))
+	streamPath = str(tmpdir.join("stream.csv"))
+	trends = gtrends.collectTrends("user", "secret", terms, startDt, endDt, granularity,
+		savePath=batchPath, **kwargs)
+	rows = gtrends.collectTrendsStream("user", "secret", terms, startDt, endDt, streamPath,
+		granularity, workers=2, **kwargs)
+	assert rows == len(trends) - 1
+	assert open(streamPath).read() == open(batchPath).read()
+	assert not os.path.exists(streamPath + ".levels")
+
+
+#TEST SAME AS COLLECTTRENDS
+
+def testDaily(server, terms, tmpdir):
+	same(tmpdir, terms)
+
+def testWeekly(server, terms, tmpdir):
+	same(tmpdir, terms, 'w', window=4)
+
+def testSummed(server, terms, tmpdir):
+	same(tmpdir, terms, sum=True)
+
+def testSummedFrame(server, terms, tmpdir):
+	#every way of saving summed data writes the same header.
+	pytest.importorskip("numpy")
+	listPath = str(tmpdir.join("list.csv"))
+	framePath = str(tmpdir.join("frame.csv"))
+	gtrends.collectTrends("user", "secret", terms, startDt, endDt, sum=True, savePath=listPath)
+	gtrends.collectTrends("user", "secret", terms, startDt, endDt, sum=True, engine='numpy',
+		frame=True, savePath=framePath)
+	for path in (listPath, framePath):
+		assert open(path).readline().strip() == "date," + ",".join(terms)
+	listData = gtrends._read(listPath)
+	frameData = gtrends._read(framePath)
+	assert frameData[0] == listData[0] == ["date"] + terms
+	assert all(len(line) == 2 for line in frameData[1:])
+	assert [line[0] for line in frameData] == [line[0] for line in listData]
+	assert max(abs(a[1] - b[1]) for a, b in zip(frameData[1:], listData[1:])) <= 0.001
+
+def testPlanned(server, terms, tmpdir):
+	same(tmpdir, terms, packing='planned')
+
+
+#TEST OUTPUTS
+
+def testLevels(server, terms, tmpdir):
+	path = str(tmpdir.join("levels.csv"))
+	gtrends.collectTrendsStream("user", "secret", terms[:2], startDt, endDt, path,
+		normalize=False)
+	levels = gtrends._read(path)
+	assert levels[1][1:] == [1.0, 1.0]
+	normalized = gtrends._normalize(levels[1:])
+	trends = gtrends.collectTrends("user", "secret", terms[:2], startDt, endDt)
+	assert max(line[1] for line in normalized) <= 100.0
+	assert [line[0] for line in normalized] == [line[0] for line in trends[1:]]
+
+def testStore(server, terms, tmpdir):
+	pytest.importorskip("numpy")
+	path = str(tmpdir.join("stream.gtr"))
+	trends = gtrends.collectTrends("user", "secret", terms, startDt, endDt)
+	gtrends.collectTrendsStream("user", "secret", terms, startDt, endDt, path)
+	store = gtrends.readTrends(path)
+	assert [line[0] for line in store] == [line[0] for line in trends]
+	for line, expected in zip(store[1:], trends[1:]):
+		assert line[1:] == pytest.approx(expected[1:], abs=0.0011)
+
+def testError(server, terms, tmpdir):
+	path = str(tmpdir.join("stream.csv"))
+	server.error_rate = 1.0
+	with pytest.raises(Exception):
+		gtrends.collectTrendsStream("user", "secret", terms, startDt, endDt, path)
+	assert os.listdir(str(tmpdir)) == []
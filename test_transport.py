@@ -0,0 +1,113 @@
+import socket
+import datetime
+import pytest
+import gtrends
+from _login import Downloader
+from _transport import HttpTransport, RecordingTransport, ReplayTransport
+
+#SETUP
+
+pytestmark = pytest.mark.server(login=False)
+
+query = ("http://www.google.com/trends/trendsReport?&q=banana&geo=&cat=&gprop="
+	"&cmpt=q&content=1&export=1&date=1%2F2010%202m")
+
+
+#TEST LOGIN
+
+def testLoginOnce(server):
+	dloader = Downloader("user", "secret", transport=server.transport())
+	dloader.downloadReport(query)
+	dloader.downloadReport(query)
+	assert server.logins == 1
+
+def testBadLogin(server):
+	dloader = Downloader("user", "wrong", transport=server.transport())
+	with pytest.raises(Exception):
+		dloader.downloadReport(query)
+
+def testCookiesReused(server, tmpdir):
+	path = str(tmpdir.join("cookies.txt"))
+	Downloader("user", "secret", path, server.transport()).downloadReport(query)
+	Downloader("user", "secret", path, server.transport()).downloadReport(query)
+	assert server.logins == 1
+
+
+#TEST CONNECTIONS
+
+def testKeepAlive(server):
+	transport = server.transport()
+	dloader = Downloader("user", "secret", transport=transport)
+	for i in range(10):
+		dloader.downloadReport(query)
+	stats = transport.stats()
+	assert stats["requests"] == 4 + 10
+	assert stats["opened"] == server.connections == 1
+	assert stats["reused"] == 13
+
+def testCompressed(server):
+	transport = server.transport()
+	assert "banana" in Downloader("user", "secret", transport=transport).downloadReport(query)
+	assert server.compressed == 5
+	assert transport.stats()["wireBytes"] < transport.stats()["bodyBytes"]
+	plain = HttpTransport(server.url, compress=False)
+	assert Downloader("user", "secret", transport=plain).downloadReport(query) == \
+		Downloader("user", "secret", transport=server.transport()).downloadReport(query)
+	assert plain.stats()["wireBytes"] == plain.stats()["bodyBytes"]
+
+def testClosedByServer(server):
+	transport = server.transport()
+	dloader = Downloader("user", "secret", transport=transport)
+	dloader.downloadReport(query)
+	#the server drops the idle connection, as servers do after a while.
+	for conns in transport._idle.values():
+		for conn in conns:
+			conn.sock.shutdown(socket.SHUT_RDWR)
+	assert "banana" in dloader.downloadReport(query)
+	assert transport.stats()["opened"] == 2
+
+def testThreads(server):
+	transport = HttpTransport(server.url, connections=2)
+	dloader = Downloader("user", "secret", transport=transport)
+	dloader.login()
+	gtrends._fetchAll(dloader, [query]*20, 4)
+	assert transport.stats()["opened"] <= 4
+	assert transport.stats()["idle"] <= 2
+
+
+def testNoProxy(server, monkeypatch):
+	#a proxy which is not there.
+	monkeypatch.setenv("http_proxy", "http://127.0.0.1:9")
+	monkeypatch.setenv("no_proxy", "")
+	with pytest.raises(Exception):
+		Downloader("user", "secret", transport=HttpTransport(server.url)).downloadReport(query)
+	monkeypatch.setenv("no_proxy", "localhost,127.0.0.1")
+	transport = HttpTransport(server.url)
+	assert "banana" in Downloader("user", "secret", transport=transport).downloadReport(query)
+
+#TEST RECORD AND REPLAY
+
+def testReplay(server, tmpdir):
+	path = str(tmpdir)
+	recorded = Downloader("user", "secret",
+		transport=RecordingTransport(path, server.transport())).downloadReport(query)
+	requests = server.requests
+	replayed = Downloader("user", "secret",
+		transport=ReplayTransport(path)).downloadReport(query)
+	assert replayed == recorded
+	assert server.requests == requests
+
+def testReplayMissing(tmpdir):
+	dloader = Downloader("user", "secret", transport=ReplayTransport(str(tmpdir)))
+	with pytest.raises(IOError):
+		dloader.downloadReport(query)
+
+
+#TEST WHOLE PATH
+
+def testCollectTrends(server):
+	trends = gtrends.collectTrends("user", "secret", ["banana", "pie"],
+		datetime.datetime(2010, 1, 1), datetime.datetime(2010, 4, 1), workers=3)
+	assert trends[0] == ["date", "banana", "pie"]
+	assert len(trends) == 1 + 31 + 28 + 31
+	assert max(max(line[1:]) for line in trends[1:]) == 100.0
@@ -0,0 +1,51 @@
+import datetime
+import gtrends
+
+#SETUP
+
+terms = ["banana", "pie"]
+startDt = datetime.datetime(2010, 1, 1)
+endDt = datetime.datetime(2011, 1, 1)
+
+def requests(server, *args, **kwargs):
+	"""Returns the number of files collectTrends() downloads for the arguments."""
+	before = server.requests
+	assert gtrends.collectTrends("user", "secret", terms, *args, **kwargs)
+	return server.requests - before
+
+
+#TEST DEFAULT WINDOWS
+
+def testDefaults():
+	assert gtrends.WINDOWS == {'d': 3, 'w': 60}
+	assert gtrends._planWindows(startDt, endDt, 'd') == (6, 2, "3m")
+	assert gtrends._planWindows(startDt, endDt, 'w') == (1, 59, "60m")
+
+def testDaily(server):
+	#a year of daily data takes 6 files of 3 months, against 12 of 2 months before.
+	assert requests(server, startDt, endDt) == 6
+	assert requests(server, startDt, endDt, window=2) == 12
+
+def testWeekly(server):
+	#10 years of weekly data take 3 files of 5 years, against 24 of 6 months before.
+	weeklyEnd = datetime.datetime(2020, 1, 1)
+	assert requests(server, startDt, weeklyEnd, 'w') == 3
+	assert requests(server, startDt, weeklyEnd, 'w', window=6) == 24
+
+
+#TEST EXPLAIN
+
+def testExplainTrends(server):
+	terms = ["banana", "pie", "mango", "kiwi", "fig", "plum"]
+	plan = gtrends.explainTrends(terms, startDt, endDt)
+	before = server.requests
+	gtrends.collectTrends("user", "secret", terms, startDt, endDt)
+	assert plan[0] == ["date", "months", "terms", "query"]
+	#2 segments x 6 files of 3 months, against 12 files of 2 months before.
+	assert len(plan) - 1 == server.requests - before == 12
+	assert plan[2][0] == datetime.datetime(2010, 3, 1)
+
+def testExplainWeekly():
+	plan = gtrends.explainTrends(terms, startDt, datetime.datetime(2020, 1, 1), 'w')
+	assert [line[:2] for line in plan[1:]] == [[datetime.datetime(2010, 1, 1), 60],
+		[datetime.datetime(2014, 12, 1), 60], [datetime.datetime(2019, 11, 1), 60]]